@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# compare_results.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Compare two results files of the benchmark (run_benchmark.py) stage by stage.  The exit code is 1 when a stage
+of the new results is slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+
+
+def read_results(file_name):
+    """Read a results file; return the commit and the median wall time of each (scenario, action, stage)"""
+
+    with open(file_name, "r", encoding="utf-8") as file:
+        results = json.load(file)
+
+    walls = {}
+    for run in results["runs"]:
+        if run["status"] != "Success":
+            continue
+        walls.setdefault((run["scenario"], run["action"], "total"), []).append(run["wall_s"])
+        for (stage, timing) in run["stages"].items():
+            walls.setdefault((run["scenario"], run["action"], stage), []).append(timing["wall_s"])
+
+    return results["commit"], {key: statistics.median(values) for (key, values) in walls.items()}
+
+
+def main():
+    """Print the comparison and return 1 if there is a regression"""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", help="Results file of the reference commit")
+    parser.add_argument("new", help="Results file to compare")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold (percent)")
+    parser.add_argument("--min-seconds", type=float, default=0.5,
+                        help="Differences smaller than this number of seconds are ignored")
+    args = parser.parse_args()
+
+    (baseline_commit, baseline) = read_results(args.baseline)
+    (new_commit, new) = read_results(args.new)
+    print(f"{'scenario':8} {'action':10} {'stage':20} {baseline_commit:>10} {new_commit:>10} {'change':>8}")
+    regressions = 0
+    for key in sorted(set(baseline) & set(new)):
+        (before, after) = (baseline[key], new[key])
+        change = (after - before) * 100 / before if before > 0 else 0.0
+        regression = change > args.threshold and after - before > args.min_seconds
+        regressions += regression
+        print(f"{key[0]:8} {key[1]:10} {key[2]:20} {before:10.2f} {after:10.2f} {change:+7.1f}%"
+              f"{'  REGRESSION' if regression else ''}")
+
+    for key in sorted(set(baseline) ^ set(new)):
+        print(f"{key[0]:8} {key[1]:10} {key[2]:20} only in {'baseline' if key in baseline else 'new'} results")
+
+    print(f"Regressions: {regressions}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
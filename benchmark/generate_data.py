@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# generate_data.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Generate the synthetic data of the benchmark: a GeoPackage with the vector layers, the English and French QGIS
+project files using the layers and a download package.  Must be run with the Python interpreter of QGIS.
+"""
+
+import argparse
+import os
+import random
+import zipfile
+from osgeo import ogr, osr
+from qgis.core import QgsApplication, QgsCoordinateReferenceSystem, QgsProject, QgsVectorLayer
+
+# Canada Atlas Lambert
+EPSG_CODE = 3978
+
+# Geometry types of the layers (used in turn)
+GEOMETRY_TYPES = (ogr.wkbPoint, ogr.wkbLineString, ogr.wkbPolygon)
+
+# Number of features written in one transaction
+TRANSACTION_SIZE = 100000
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def create_geometry(geometry_type, rnd):
+    """Create a random geometry in the extent of Canada"""
+
+    x = rnd.uniform(-2500000, 3000000)
+    y = rnd.uniform(-1000000, 4000000)
+    if geometry_type == ogr.wkbPoint:
+        geometry = ogr.Geometry(ogr.wkbPoint)
+        geometry.AddPoint_2D(x, y)
+    elif geometry_type == ogr.wkbLineString:
+        geometry = ogr.Geometry(ogr.wkbLineString)
+        for dummy in range(10):
+            geometry.AddPoint_2D(x, y)
+            x += rnd.uniform(-500, 500)
+            y += rnd.uniform(-500, 500)
+    else:
+        ring = ogr.Geometry(ogr.wkbLinearRing)
+        size = rnd.uniform(50, 1000)
+        for (dx, dy) in ((0, 0), (size, 0), (size, size), (0, size), (0, 0)):
+            ring.AddPoint_2D(x + dx, y + dy)
+        geometry = ogr.Geometry(ogr.wkbPolygon)
+        geometry.AddGeometry(ring)
+
+    return geometry
+
+
+def create_layers(gpkg_file_name, nbr_layers, nbr_features, seed=1):
+    """Create a GeoPackage with the layers; the features are distributed between the layers.  Return the name of
+       the layers"""
+
+    rnd = random.Random(seed)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(EPSG_CODE)
+    data_source = ogr.GetDriverByName("GPKG").CreateDataSource(gpkg_file_name)
+    layer_names = []
+    for index in range(nbr_layers):
+        layer_name = f"layer_{index:03d}"
+        geometry_type = GEOMETRY_TYPES[index % len(GEOMETRY_TYPES)]
+        layer = data_source.CreateLayer(layer_name, srs, geometry_type)
+        for (field_name, field_type) in (("name", ogr.OFTString), ("category", ogr.OFTString),
+                                         ("value", ogr.OFTReal), ("year", ogr.OFTInteger)):
+            layer.CreateField(ogr.FieldDefn(field_name, field_type))
+        layer_definition = layer.GetLayerDefn()
+
+        nbr_layer_features = nbr_features // nbr_layers + (1 if index < nbr_features % nbr_layers else 0)
+        layer.StartTransaction()
+        for feature_index in range(nbr_layer_features):
+            feature = ogr.Feature(layer_definition)
+            feature.SetField("name", f"Feature {feature_index}")
+            feature.SetField("category", rnd.choice(("A", "B", "C", "D")))
+            feature.SetField("value", rnd.uniform(0, 1000))
+            feature.SetField("year", rnd.randint(1950, 2025))
+            feature.SetGeometry(create_geometry(geometry_type, rnd))
+            layer.CreateFeature(feature)
+            if (feature_index + 1) % TRANSACTION_SIZE == 0:
+                layer.CommitTransaction()
+                layer.StartTransaction()
+        layer.CommitTransaction()
+        layer_names.append(layer_name)
+
+    data_source = None  # Close the GeoPackage
+
+    return layer_names
+
+
+def create_project(qgs_file_name, gpkg_file_name, layer_names, language):
+    """Create a QGIS project file with the layers of the GeoPackage; the short name is the name of the layer"""
+
+    project = QgsProject()
+    project.setCrs(QgsCoordinateReferenceSystem(f"EPSG:{EPSG_CODE}"))
+    title = "Layer" if language == "EN" else "Couche"
+    for (index, layer_name) in enumerate(layer_names):
+        layer = QgsVectorLayer(f"{gpkg_file_name}|layername={layer_name}", f"{title} {index}", "ogr")
+        layer.setShortName(layer_name)
+        project.addMapLayer(layer)
+    if not project.write(qgs_file_name):
+        raise RuntimeError(f"Unable to write the project file: {qgs_file_name}")
+
+
+def create_download_package(zip_file_name, size_mb, seed=1):
+    """Create a download package (zip file) containing random data (not compressible)"""
+
+    rnd = random.Random(seed)
+    with zipfile.ZipFile(zip_file_name, mode="w") as archive:
+        with archive.open("data.bin", mode="w", force_zip64=True) as member:
+            for dummy in range(size_mb):
+                member.write(rnd.randbytes(CHUNK_SIZE))
+
+
+def generate(data_dir, name, nbr_layers, nbr_features, package_mb):
+    """Generate the data of a scenario in its directory unless it already exists. Return the file names"""
+
+    scenario_dir = os.path.join(data_dir, name)
+    file_names = {"qgis_file_en": os.path.join(scenario_dir, f"{name}_en.qgs"),
+                  "qgis_file_fr": os.path.join(scenario_dir, f"{name}_fr.qgs"),
+                  "download_package": os.path.join(scenario_dir, f"{name}_package.zip")}
+    if all(os.path.isfile(file_name) for file_name in file_names.values()):
+        return file_names
+
+    os.makedirs(scenario_dir, exist_ok=True)
+    gpkg_file_name = os.path.join(scenario_dir, f"{name}.gpkg")
+    if os.path.isfile(gpkg_file_name):
+        os.remove(gpkg_file_name)
+    print(f"Generating {name}: {nbr_layers} layers, {nbr_features} features, {package_mb} MB package")
+    layer_names = create_layers(gpkg_file_name, nbr_layers, nbr_features)
+    create_project(file_names["qgis_file_en"], gpkg_file_name, layer_names, "EN")
+    create_project(file_names["qgis_file_fr"], gpkg_file_name, layer_names, "FR")
+    create_download_package(file_names["download_package"], package_mb)
+
+    return file_names
+
+
+def main():
+    """Generate the data of one scenario"""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    parser.add_argument("--name", required=True, help="Name of the scenario")
+    parser.add_argument("--layers", type=int, default=1, help="Number of vector layers")
+    parser.add_argument("--features", type=int, default=1000, help="Total number of features")
+    parser.add_argument("--package-mb", type=int, default=10, help="Size of the download package (MB)")
+    args = parser.parse_args()
+
+    qgs_app = QgsApplication([], False)
+    qgs_app.initQgis()
+    generate(args.data_dir, args.name, args.layers, args.features, args.package_mb)
+    qgs_app.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# run_benchmark.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Run the benchmark of the publication against the Mockoon stand-in of the DDR (Test environment).  Each action
+(validate, publish, update, unpublish) of each scenario is run headless with qgis_process and timed by stage;
+the results are saved in benchmark/results to be compared between commits (see compare_results.py).
+Must be run with the Python interpreter of QGIS.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from qgis.core import QgsApplication
+
+import generate_data
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Name: (number of layers, number of features, size of the download package in MB)
+SCENARIOS = {
+    "tiny": (1, 1000, 10),
+    "small": (10, 100000, 100),
+    "medium": (100, 1000000, 1000),
+    "large": (500, 10000000, 5000),
+}
+
+# Actions run in order for each scenario: (name, manifest action, validate mode)
+ACTIONS = (("validate", "publish", True),
+           ("publish", "publish", False),
+           ("update", "update", False),
+           ("unpublish", "unpublish", False))
+
+
+def get_commit():
+    """Return the commit of the repository (with a + when the tree is modified)"""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BENCHMARK_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return commit + ("+" if status else "")
+
+
+def write_manifest(manifest_file_name, action, metadata_uuid, file_names):
+    """Write the manifest of one action"""
+
+    with open(manifest_file_name, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["action", "metadata_uuid", "department", "service_web", "service_download",
+                         "qgis_file_en", "qgis_file_fr", "qgs_server_id", "csz_theme", "download_package",
+                         "core_subject_term", "download_info_id", "email"])
+        writer.writerow([action, metadata_uuid, "nrcan", "Yes", "Yes", file_names["qgis_file_en"],
+                         file_names["qgis_file_fr"], "DDR_QGS1", "", file_names["download_package"],
+                         "Abbreviations_Abreviation", "DDR_DOWNLOAD1", ""])
+
+
+def read_stages(timings_dir, metadata_uuid, start_time):
+    """Read the timing report written by the publication; the timings of a stage run many times are added"""
+
+    reports = [file_name for file_name in glob.glob(os.path.join(timings_dir, f"*_{metadata_uuid}.json"))
+               if os.path.getmtime(file_name) >= start_time]
+    if not reports:
+        return {}
+
+    with open(max(reports, key=os.path.getmtime), "r", encoding="utf-8") as file:
+        report = json.load(file)
+    stages = {}
+    for timing in report["stages"]:
+        stage = stages.setdefault(timing["stage"], {"wall_s": 0.0, "cpu_s": 0.0, "read_bytes": 0,
+                                                    "written_bytes": 0, "rss_delta_bytes": 0, "rss_bytes": 0})
+        for key in ("wall_s", "cpu_s", "read_bytes", "written_bytes", "rss_delta_bytes"):
+            stage[key] += timing.get(key) or 0
+        stage["rss_bytes"] = max(stage["rss_bytes"], timing.get("rss_bytes") or 0)
+
+    return stages
+
+
+def run_action(args, work_dir, scenario, action, metadata_uuid, file_names):
+    """Run one action of a scenario with qgis_process and return its result"""
+
+    (name, manifest_action, validate) = action
+    manifest_file_name = os.path.join(work_dir, f"{scenario}_{name}_manifest.csv")
+    results_file_name = os.path.join(work_dir, f"{scenario}_{name}_results.csv")
+    write_manifest(manifest_file_name, manifest_action, metadata_uuid, file_names)
+    command = [args.qgis_process, "run", "pub_ddr_processing:publish_manifest", "--",
+               f"USERNAME={args.username}", f"PASSWORD={args.password}", "ENVIRONMENT=Test",
+               f"MANIFEST={manifest_file_name}", f"RESULTS={results_file_name}", "KEEP_FILES=No",
+               f"Validate={str(validate).lower()}", "PROFILE=Timing report", "BUILD_JOBS=1", "UPLOAD_JOBS=1"]
+
+    start_time = time.time()
+    start_wall = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    wall = time.perf_counter() - start_wall
+
+    status = "Failed"
+    message = process.stderr.strip()[-500:]
+    if os.path.isfile(results_file_name):
+        with open(results_file_name, "r", encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+        if rows:
+            (status, message) = (rows[0]["status"], rows[0]["message"])
+    print(f"{scenario:8} {name:10} {status:8} {wall:10.1f} s")
+
+    return {"scenario": scenario, "action": name, "status": status, "message": message,
+            "wall_s": round(wall, 3), "stages": read_stages(args.timings_dir, metadata_uuid, start_time)}
+
+
+def main():
+    """Generate the data of the scenarios, run the actions and save the results"""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", default="tiny,small",
+                        help=f"Scenarios to run, separated by commas ({', '.join(SCENARIOS)})")
+    parser.add_argument("--data-dir", default=os.path.join(BENCHMARK_DIR, "data"))
+    parser.add_argument("--results-dir", default=os.path.join(BENCHMARK_DIR, "results"))
+    parser.add_argument("--qgis-process", dest="qgis_process", default="qgis_process")
+    parser.add_argument("--timings-dir", default=None,
+                        help="Directory of the timing reports (default: timings directory of the QGIS profile)")
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times each scenario is run")
+    args = parser.parse_args()
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"Unknown scenario: {scenario}")
+
+    qgs_app = QgsApplication([], False)
+    qgs_app.initQgis()
+    if args.timings_dir is None:
+        args.timings_dir = os.path.join(QgsApplication.qgisSettingsDirPath(), "pub_ddr_processing", "timings")
+
+    # The data of a scenario is generated once and reused by the next runs
+    scenario_files = {scenario: generate_data.generate(args.data_dir, scenario, *SCENARIOS[scenario])
+                      for scenario in scenarios}
+    qgs_app.exitQgis()
+
+    work_dir = os.path.join(args.data_dir, "runs")
+    os.makedirs(work_dir, exist_ok=True)
+    runs = []
+    for repeat in range(args.repeat):
+        for scenario in scenarios:
+            # The same UUID is used by all the runs of a scenario so the results can be compared
+            metadata_uuid = str(uuid.uuid5(uuid.NAMESPACE_URL, f"pub_ddr_processing/benchmark/{scenario}"))
+            for action in ACTIONS:
+                run = run_action(args, work_dir, scenario, action, metadata_uuid, scenario_files[scenario])
+                run["repeat"] = repeat
+                runs.append(run)
+
+    commit = get_commit()
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_file_name = os.path.join(args.results_dir,
+                                     f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit.rstrip('+')}.json")
+    with open(results_file_name, "w", encoding="utf-8") as file:
+        json.dump({"commit": commit,
+                   "date": datetime.now().isoformat(timespec="seconds"),
+                   "platform": platform.platform(),
+                   "python": sys.version.split()[0],
+                   "scenarios": {scenario: dict(zip(("layers", "features", "package_mb"), SCENARIOS[scenario]))
+                                 for scenario in scenarios},
+                   "runs": runs}, file, indent=4)
+    print(f"Results: {results_file_name}")
+
+    return 0 if all(run["status"] == "Success" for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
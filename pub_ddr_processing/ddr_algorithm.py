@@ -29,19 +29,60 @@ QGIS Plugin for DDR manipulation
 
 
 import os
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import glob
+import hashlib
 import http.client
+import io
 import json
+import queue
+import re
 import shutil
+import struct
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import threading
 import time
+import uuid
+import xml.sax
 import zipfile
+import zlib
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from pathlib import Path
+from xml.etree import ElementTree
+from xml.sax.saxutils import XMLGenerator
 import inspect
 import requests
+from requests.adapters import HTTPAdapter
 import yaml
 from yaml.loader import SafeLoader
+from osgeo import gdal, ogr
+try:
+    # Optional: the Zstandard compression of the zip file members
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    # Only available on Unix: used to clone (reflink) the staged files
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    # Only available on Unix: peak memory of the process in the timing report
+    import resource
+except ImportError:
+    resource = None
+try:
+    # Optional: I/O and peak memory of the process in the timing report (Windows)
+    import psutil
+except ImportError:
+    psutil = None
 from qgis import processing
 from qgis.PyQt.QtCore import QCoreApplication
 from qgis.PyQt.QtGui import QIcon
@@ -54,7 +95,10 @@ from qgis.core import (Qgis, QgsProcessing, QgsProcessingAlgorithm, QgsProcessin
                        QgsMapLayerStyleManager, QgsReadWriteContext, QgsDataSourceUri,  QgsDataProvider,
                        QgsProviderRegistry, QgsProcessingParameterAuthConfig,  QgsApplication,  QgsAuthMethodConfig,
                        QgsProcessingParameterFile, QgsProcessingParameterDefinition, QgsProcessingParameterBoolean,
-                       QgsProcessingOutputString, QgsProcessingContext, QgsProcessingRegistry)
+                       QgsProcessingParameterFileDestination, QgsVectorLayer, QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransformContext, QgsProcessingParameterNumber, QgsExpression,
+                       QgsProcessingOutputString, QgsProcessingContext, QgsProcessingRegistry, QgsMessageLog,
+                       QgsPathResolver)
 
 PUBLISH = "PUBLISH"
 UNPUBLISH = "UNPUBLISH"
@@ -79,55 +123,199 @@ class ControlFile:
     keep_files: str = None               # Name of the flag to keep the temporary files and directory
     gpkg_layer_counter: int = 0          # Name of the counter of vector layer in the GPKG file
     gpkg_file_name: str = None           # Name of Geopackage containing the vector layers
+    gpkg_pyramids: dict = None           # Generalized copies (table, scale) of the heavy layers by short name
+    http_status: int = None              # HTTP status code of the publication request
+    kept_layers: list = None             # Layers unchanged in the DDR and not sent by a delta update (None: all)
     language: str = None
+    layer_checksums_file: str = None     # Name of the file containing the checksum of each layer
     metadata_uuid: str = None
     out_qgs_project_file_en: str = None  # Name out the output English project file
     out_qgs_project_file_fr: str = None  # Name out the output English project file
     password: str = None                 # Login password
+    profile: str = None                  # Timing report of the stages (No, Timing report, ... and Chrome trace)
     qgs_project_file_en: str = None      # Name of the input English QGIS project file
     qgs_project_file_fr: str = None      # Name of the input French QGIS project file
+    qgs_layers_en: list = None           # Layers read in the English QGIS project file
+    qgs_layers_fr: list = None           # Layers read in the French QGIS project file
     qgs_server_id: str = None
     service_web: bool = None             # Flag for publishing a web service
     service_download: bool = None        # Flag for publishing a download service
-    src_qgs_project_name = None          # Name of the actual project file name
+    timings: list = None                 # Timing of the stages of the publication (see StageProfiler)
     username: str = None                 # Login username
     validate: str = None                 # Is the action in validate mode
     zip_file_name: str = None            # Name of the zip file
 
 
+@dataclass
+class LayerExportJob:
+    """Declare the fields needed to export one vector layer in its own GeoPackage file"""
+
+    layer_name: str = None               # Name of the layer in the QGIS project
+    short_name: str = None               # Name of the table in the GeoPackage file
+    source: str = None                   # Data source URI of the layer
+    provider: str = None                 # Name of the data provider of the layer
+    crs: object = None                   # Coordinate reference system of the layer
+    layer: object = None                 # Layer opened in the main thread when it can't be opened in a thread
+    gpkg_file_name: str = None           # Name of the GeoPackage file containing the exported layer
+    fingerprint: str = None              # Fingerprint of the layer in the layer cache (None: not cacheable)
+    checksum: str = None                 # Checksum of the layer used to compare it with the layer in the DDR
+    cached: bool = False                 # Flag set when the layer is reused from the layer cache
+    pruned_fields: list = None           # Fields not exported (None: all the fields are exported)
+    coordinate_precision: float = None   # Grid size the coordinates are snapped to (0: no snapping)
+    invalid_fids: list = None            # Features whose geometry is invalidated by the snapping (not snapped)
+    pyramid_scale: int = None            # Scale from which the generalized copy of a layer is rendered
+    error: str = None                    # Error message when the export failed
+
+
+@dataclass
+class ProjectLayer:
+    """Declare the fields of a layer read in a QGIS project file"""
+
+    layer_id: str = None                 # Identifier of the layer in the project
+    layer_name: str = None               # Name of the layer
+    short_name: str = None               # Short name of the layer (name of the table in the GeoPackage file)
+    layer_type: str = None               # Type of the layer (vector, raster, ...)
+    geometry: str = None                 # Geometry type of a vector layer
+    source: str = None                   # Data source URI of the layer with absolute paths
+    provider: str = None                 # Name of the data provider of the layer
+    crs_wkt: str = None                  # WKT of the coordinate reference system of the layer
+    index_fields: list = None            # Fields used by the renderer and the labeling (attribute indexes)
+    pruned_fields: list = None           # Fields not needed by the service (not exported when pruning)
+    coordinate_precision: float = None   # Grid size of the coordinates (layer variable ddr_coordinate_precision)
+
+
+@dataclass
+class ZipMember:
+    """Data structure of a member of the zip file"""
+
+    file_name: str = None          # Absolute path of the file to zip
+    arcname: str = None            # Name of the file in the zip file
+    method: int = None             # Compression method (ZipBuilder.STORED, DEFLATED or ZSTANDARD)
+    date_time: tuple = None        # Modification date and time of the file
+    file_size: int = 0             # Size of the file
+    compress_size: int = 0         # Size of the compressed data
+    crc: int = 0                   # CRC-32 of the file
+    data_file: str = None          # File containing the compressed data
+    offset: int = 0                # Offset of the local header in the zip file
+
+
 class UserMessageException(Exception):
     """Exception raised when a message (likely an error message) needs to be sent to the User."""
     pass
 
 
 class LoginToken(object):
-    """This class manages the login token needed to call the different DDR API end points"""
+    """This class manages the login token needed to call the different DDR API end points. The access token is
+       refreshed with the refresh token before it expires"""
+
+    # Number of seconds before the expiry of the access token when the token is refreshed
+    EXPIRY_MARGIN = 60
 
     # Class variable used to verify that the login class has been set
     __initialization_flag = False
 
-    # Class variable used to store the unique token value of the login
+    # Class variables used to store the unique token values of the login and their absolute expiry time
     __token = None
+    __expires_at = None
+    __refresh_at = None
+    __refresh_token = None
+    __refresh_expires_at = None
+
+    # Class variable used to refresh the token only once when many threads need a refresh
+    __lock = threading.Lock()
 
     @staticmethod
-    def set_token(token):
-        """This method sets the token """
+    def set_token(token, expires_in=None, refresh_token=None, refresh_expires_in=None):
+        """This method sets the token and computes when it must be refreshed"""
 
+        now = time.time()
         LoginToken.__token = token
+        if expires_in is not None:
+            LoginToken.__expires_at = now + expires_in
+            LoginToken.__refresh_at = now + max(expires_in - LoginToken.EXPIRY_MARGIN, expires_in / 2)
+        else:
+            LoginToken.__expires_at = None
+            LoginToken.__refresh_at = None
+        LoginToken.__refresh_token = refresh_token
+        if refresh_expires_in is not None:
+            LoginToken.__refresh_expires_at = now + refresh_expires_in
+        else:
+            LoginToken.__refresh_expires_at = None
         LoginToken.__initialization_flag = True
 
+    @staticmethod
+    def get_state():
+        """Return the token values so they can be sent to the worker process"""
+
+        return {"initialization_flag": LoginToken.__initialization_flag,
+                "token": LoginToken.__token,
+                "expires_at": LoginToken.__expires_at,
+                "refresh_at": LoginToken.__refresh_at,
+                "refresh_token": LoginToken.__refresh_token,
+                "refresh_expires_at": LoginToken.__refresh_expires_at}
+
+    @staticmethod
+    def set_state(state):
+        """Set the token values received from another process"""
+
+        with LoginToken.__lock:
+            LoginToken.__initialization_flag = state["initialization_flag"]
+            LoginToken.__token = state["token"]
+            LoginToken.__expires_at = state.get("expires_at")
+            LoginToken.__refresh_at = state["refresh_at"]
+            LoginToken.__refresh_token = state["refresh_token"]
+            LoginToken.__refresh_expires_at = state["refresh_expires_at"]
+
     @staticmethod
     def get_token(feedback):
         """This method allows to get the token. If the token is None than an error is rose because the login  was
-           not done"""
+           not done. The token is refreshed when it is about to expire"""
 
         if not LoginToken.__initialization_flag:
             # The token has hot been initialised (no login)
             Utils.push_info(feedback, f"ERROR: Login first...")
             raise UserMessageException("The user must login first before doing any access to the DDR")
 
+        if LoginToken.__refresh_at is not None and time.time() >= LoginToken.__refresh_at:
+            if LoginToken.can_refresh():
+                LoginToken.refresh_token(feedback, LoginToken.__token)
+            elif LoginToken.__expires_at is not None and time.time() >= LoginToken.__expires_at:
+                raise UserMessageException("The login has expired; the user must login again")
+            # Without refresh token, the access token is used until it expires
+
         return LoginToken.__token
 
+    @staticmethod
+    def can_refresh():
+        """Check if there is a refresh token that is not expired"""
+
+        return LoginToken.__refresh_token is not None and \
+            (LoginToken.__refresh_expires_at is None or time.time() < LoginToken.__refresh_expires_at)
+
+    @staticmethod
+    def refresh_token(feedback, expired_token):
+        """This method gets a new access token from the /refresh end point. Nothing is done if another thread
+           already replaced the expired token"""
+
+        with LoginToken.__lock:
+            if LoginToken.__token != expired_token:
+                return
+
+            if not LoginToken.can_refresh():
+                raise UserMessageException("The login has expired; the user must login again")
+
+            url = DdrApiClient.get_url("/refresh")
+            Utils.push_info(feedback, "INFO: Refreshing the access token")
+            Utils.push_info(feedback, f"INFO: HTTP Post Request: {url}")
+            try:
+                response = DdrApiClient.request("POST", url, feedback, authenticated=False,
+                                                json={"refresh_token": LoginToken.__refresh_token})
+            except requests.exceptions.RequestException as e:
+                raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+
+            if not ResponseCodes.refresh_access_token(feedback, response):
+                raise UserMessageException("Unable to refresh the access token; the user must login again")
+
 
 class DdrInfo(object):
     """This class holds and manages different information extracted from the DDR using the API"""
@@ -148,6 +336,11 @@ class DdrInfo(object):
     __json_servers = None
     __json_department = None
     __dict_environments = None
+    __registries_lock = threading.Lock()
+    __scheduler = {}
+    __layer_pyramids = {}
+    __worker_process = False
+    __delta_update = False
 
     @staticmethod
     def init_project_file():
@@ -167,6 +360,12 @@ class DdrInfo(object):
         else:
             raise UserMessageException(f"The envrionment {environment} is invalid")
 
+    @staticmethod
+    def get_environment():
+        """Get the name of the execution environment"""
+
+        return DdrInfo.__environment
+
     @staticmethod
     def get_http_environment():
         """Get the http address related to an environment"""
@@ -175,14 +374,12 @@ class DdrInfo(object):
 
 
     @staticmethod
-    def add_layer(src_layer, language):
+    def add_layer(short_name, layer_name, language):
         """Validate that the short name is present and not duplicate between the layers"""
 
-        short_name = src_layer.shortName()
-
         # validate that the short name is present
         if short_name is None or short_name == "":
-            raise UserMessageException(f"The short name for layer {src_layer.name()} is missing")
+            raise UserMessageException(f"The short name for layer {layer_name} is missing")
 
         # Validate that the short name is not duplicate
         if language == "EN":
@@ -193,7 +390,7 @@ class DdrInfo(object):
         if short_name not in qgs_layer_name:
             qgs_layer_name.append(short_name)
         else:
-            raise UserMessageException(f"Duplicate short name {short_name} for layer {src_layer.name()}")
+            raise UserMessageException(f"Duplicate short name {short_name} for layer {layer_name}")
 
     @staticmethod
     def load_config_env_yaml():
@@ -209,6 +406,33 @@ class DdrInfo(object):
             DdrInfo.__default_environment = yaml_doc["Default_env"]
             DdrInfo.__default_web_server = yaml_doc["Default_Web_Server"]
             DdrInfo.__default_download_server = yaml_doc["Default_Download_Server"]
+            DdrInfo.__upload_session_threshold = yaml_doc.get("Upload_Session_Threshold_MB", 512) * 1024 * 1024
+            DdrInfo.__upload_part_size = yaml_doc.get("Upload_Part_Size_MB", 64) * 1024 * 1024
+            DdrInfo.__upload_part_retries = yaml_doc.get("Upload_Part_Retries", 3)
+            DdrInfo.__upload_bandwidth_limit = yaml_doc.get("Upload_Bandwidth_Limit_Mbps", 0) * 1000000 / 8
+            DdrInfo.__http_timeout = (yaml_doc.get("Http_Connect_Timeout", 30),
+                                      yaml_doc.get("Http_Read_Timeout", 3600))
+            DdrInfo.__http_verify = yaml_doc.get("Http_Verify_SSL", False)
+            DdrInfo.__http_pool_size = yaml_doc.get("Http_Pool_Size", 10)
+            DdrInfo.__registry_cache_ttl = yaml_doc.get("Registry_Cache_TTL_Hours", {})
+            DdrInfo.__gpkg_export_workers = yaml_doc.get("Gpkg_Export_Workers", 4)
+            DdrInfo.__layer_cache_size = yaml_doc.get("Layer_Cache_Size_MB", 2048) * 1024 * 1024
+            DdrInfo.__layer_cache_databases = yaml_doc.get("Layer_Cache_Databases", False)
+            DdrInfo.__gpkg_optimize = yaml_doc.get("Gpkg_Optimize", True)
+            DdrInfo.__gpkg_page_size = yaml_doc.get("Gpkg_Page_Size", 65536)
+            DdrInfo.__gpkg_attribute_indexes = yaml_doc.get("Gpkg_Attribute_Indexes", True)
+            DdrInfo.__gpkg_prune_fields = yaml_doc.get("Gpkg_Prune_Fields", False)
+            DdrInfo.__coordinate_precision = yaml_doc.get("Coordinate_Precision", {})
+            DdrInfo.__delta_update = yaml_doc.get("Delta_Update", False)
+            DdrInfo.__worker_process = yaml_doc.get("Worker_Process", False)
+            DdrInfo.__worker_python = yaml_doc.get("Worker_Python", "")
+            DdrInfo.__scheduler = yaml_doc.get("Scheduler", {})
+            DdrInfo.__layer_pyramids = yaml_doc.get("Layer_Pyramids", {})
+            DdrInfo.__zip_compression = yaml_doc.get("Zip_Compression", "deflate")
+            DdrInfo.__zip_compression_level = yaml_doc.get("Zip_Compression_Level", 6)
+            DdrInfo.__zip_workers = yaml_doc.get("Zip_Workers", 0)
+            DdrInfo.__zip_streaming = yaml_doc.get("Zip_Streaming", True)
+            DdrInfo.__temp_dir = yaml_doc.get("Temp_Dir", "")
 
     @staticmethod
     def get_default_environment():
@@ -217,16 +441,166 @@ class DdrInfo(object):
         return DdrInfo.__default_environment
 
     @staticmethod
-    def get_environment_lst():
-        """Get the list of environment (string of coma separated)"""
+    def get_upload_session_threshold():
+        """Return the size (bytes) from which a resumable upload session is used"""
 
-        return list(DdrInfo.__dict_environments.keys())
+        return DdrInfo.__upload_session_threshold
+
+    @staticmethod
+    def get_upload_part_size():
+        """Return the size (bytes) of a part of a resumable upload session"""
+
+        return DdrInfo.__upload_part_size
+
+    @staticmethod
+    def get_upload_part_retries():
+        """Return the number of times a part of an upload session is resent"""
+
+        return DdrInfo.__upload_part_retries
+
+    @staticmethod
+    def get_upload_bandwidth_limit():
+        """Return the maximum upload rate (bytes per second) of an upload; 0 when unlimited"""
+
+        return DdrInfo.__upload_bandwidth_limit
+
+    @staticmethod
+    def get_http_timeout():
+        """Return the (connect, read) timeouts in seconds of the HTTP requests"""
+
+        return DdrInfo.__http_timeout
+
+    @staticmethod
+    def get_http_verify():
+        """Return the flag to verify the SSL certificate of the DDR"""
+
+        return DdrInfo.__http_verify
+
+    @staticmethod
+    def get_http_pool_size():
+        """Return the maximum number of connections kept alive in the HTTP connection pool"""
+
+        return DdrInfo.__http_pool_size
+
+    @staticmethod
+    def get_registry_cache_ttl(registry_name):
+        """Return the time to live (seconds) of a registry in the local cache"""
+
+        return DdrInfo.__registry_cache_ttl.get(registry_name, 24) * 3600
+
+    @staticmethod
+    def get_gpkg_export_workers():
+        """Return the number of layers exported at the same time in GeoPackage files"""
+
+        return max(1, DdrInfo.__gpkg_export_workers)
+
+    @staticmethod
+    def get_gpkg_optimize():
+        """Return True when the GeoPackage file is built and optimized for QGIS Server"""
+
+        return DdrInfo.__gpkg_optimize
+
+    @staticmethod
+    def get_gpkg_attribute_indexes():
+        """Return True when the fields used by the styles of the layers are indexed in the GeoPackage file"""
+
+        return DdrInfo.__gpkg_attribute_indexes
+
+    @staticmethod
+    def get_gpkg_prune_fields():
+        """Return True when the fields not needed by the service are not exported in the GeoPackage file"""
+
+        return DdrInfo.__gpkg_prune_fields
+
+    @staticmethod
+    def get_coordinate_precision(geographic):
+        """Return the grid size the coordinates of the layers in a geographic or projected CRS are snapped to"""
+
+        return DdrInfo.__coordinate_precision.get("Geographic" if geographic else "Projected", 0)
+
+    @staticmethod
+    def get_gpkg_page_size():
+        """Return the SQLite page size of the GeoPackage file"""
+
+        return DdrInfo.__gpkg_page_size
+
+    @staticmethod
+    def get_layer_cache_size():
+        """Return the maximum size (bytes) of the layer cache (0: the cache is disabled)"""
+
+        return DdrInfo.__layer_cache_size
+
+    @staticmethod
+    def get_layer_cache_databases():
+        """Return True when the layers of a database are fingerprinted by their number of features and extent"""
+
+        return DdrInfo.__layer_cache_databases
+
+    @staticmethod
+    def get_delta_update():
+        """Return the flag to send only the changed layers when a service is updated"""
+
+        return DdrInfo.__delta_update
+
+    @staticmethod
+    def get_worker_process():
+        """Return the flag to run the publication pipeline in a worker process"""
+
+        return DdrInfo.__worker_process
+
+    @staticmethod
+    def get_worker_python():
+        """Return the Python interpreter used to start the worker process (empty: the one of QGIS)"""
+
+        return DdrInfo.__worker_python
+
+    @staticmethod
+    def get_zip_compression():
+        """Return the compression (deflate or zstd) and the compression level of the zip file members"""
+
+        return DdrInfo.__zip_compression, DdrInfo.__zip_compression_level
+
+    @staticmethod
+    def get_zip_workers():
+        """Return the number of zip file members compressed at the same time"""
+
+        if DdrInfo.__zip_workers <= 0:
+            return os.cpu_count() or 1
+        return DdrInfo.__zip_workers
+
+    @staticmethod
+    def get_zip_streaming():
+        """Return True when the zip file is streamed in the upload instead of being written on disk"""
+
+        return DdrInfo.__zip_streaming
+
+    @staticmethod
+    def get_temp_dir():
+        """Return the directory of the temporary directories (None: the temporary directory of the system)"""
+
+        if not DdrInfo.__temp_dir:
+            return None
+        temp_dir = os.path.expanduser(DdrInfo.__temp_dir)
+        os.makedirs(temp_dir, exist_ok=True)
+        return temp_dir
 
     @staticmethod
-    def get_layer_short_name(src_layer):
-        """Get the short name from the layer"""
+    def get_scheduler_option(name, default):
+        """Return an option of the publication scheduler (Build_Jobs, Upload_Jobs, Retries, Retry_Delay)"""
+
+        return DdrInfo.__scheduler.get(name, default)
+
+    @staticmethod
+    def get_layer_pyramid_option(name, default):
+        """Return an option of the generalized copies of the heavy layers (Scales, Tolerance_Pixels, Min_Size_Mb)"""
+
+        return DdrInfo.__layer_pyramids.get(name, default)
+
+    @staticmethod
+    def get_environment_lst():
+        """Get the list of environment (string of coma separated)"""
 
-        return src_layer.shortName()
+        return list(DdrInfo.__dict_environments.keys())
 
     @staticmethod
     def get_nbr_layers():
@@ -267,6 +641,34 @@ class DdrInfo(object):
             # Bad structure raise an exception and crash
             raise UserMessageException(f"Issue with the JSON response for the departement: {json_department}")
 
+    @staticmethod
+    def add_registries(json_theme, json_department, json_email, json_downloads, json_servers):
+        """Add all the registries read from the DDR at once. If one JSON structure is invalid the previous
+           content is restored so that DdrInfo is never half populated"""
+
+        # The lock prevents the background refresh of the registries from mixing with a login
+        with DdrInfo.__registries_lock:
+            saved_registries = (DdrInfo.__json_theme, DdrInfo.__json_department, DdrInfo.__email,
+                                DdrInfo.__json_downloads, DdrInfo.__json_servers)
+            try:
+                DdrInfo.add_themes(json_theme)
+                DdrInfo.add_departments(json_department)
+                DdrInfo.add_email(json_email)
+                DdrInfo.add_downloads(json_downloads)
+                DdrInfo.add_servers(json_servers)
+            except UserMessageException:
+                (DdrInfo.__json_theme, DdrInfo.__json_department, DdrInfo.__email,
+                 DdrInfo.__json_downloads, DdrInfo.__json_servers) = saved_registries
+                raise
+
+    @staticmethod
+    def get_registries():
+        """Return all the registries in the order of add_registries so they can be sent to the worker process"""
+
+        with DdrInfo.__registries_lock:
+            return (DdrInfo.__json_theme, DdrInfo.__json_department, {"email": DdrInfo.__email},
+                    DdrInfo.__json_downloads, DdrInfo.__json_servers)
+
     @staticmethod
     def get_department_lst():
         """Extract the departments in the form of a list"""
@@ -428,296 +830,2817 @@ class DdrInfo(object):
         return return_val
 
 
-class Utils:
-    """Contains a list of static methods"""
+class DdrApiClient(object):
+    """This class manages the HTTP session shared by all the DDR API calls. The connections to the DDR are kept
+       alive in a connection pool and reused between the calls"""
+
+    # Class variable used to store the unique HTTP session
+    __session = None
 
     @staticmethod
-    def get_date_time():
-        """Extract the current date and time """
+    def get_session():
+        """Create the HTTP session with its connection pool on the first call and return it"""
 
-        now = datetime.now()  # current date and time
-        date_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        if DdrApiClient.__session is None:
+            adapter = HTTPAdapter(pool_connections=DdrInfo.get_http_pool_size(),
+                                  pool_maxsize=DdrInfo.get_http_pool_size())
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.verify = DdrInfo.get_http_verify()
+            session.headers.update({'accept': 'application/json'})
+            DdrApiClient.__session = session
 
-        return date_time
+        return DdrApiClient.__session
 
     @staticmethod
-    def create_json_control_file(ctl_file, feedback):
-        """Creation and writing of the JSON control file"""
+    def get_url(end_point):
+        """Return the URL of an end point in the selected execution environment"""
 
-        # Creation of the JSON control file
-        theme_uuid = DdrInfo.get_theme_uuid(ctl_file.csz_collection_theme)
+        return DdrInfo.get_http_environment() + end_point
 
-        if ctl_file.out_download_package_file not in ["", "-"]:
-            # Get the download package name without the extension
-            download_package_name = Path(ctl_file.out_download_package_file).stem
-        else:
-            download_package_name = ctl_file.out_download_package_file
+    @staticmethod
+    def request(method, url, feedback, authenticated=True, **kwargs):
+        """Send an HTTP request with the shared session. The bearer token is added to the default headers when
+           the end point needs an authentication"""
 
-        if ctl_file.out_qgs_project_file_en not in ["", "-"]:
-            qgs_project_file_en = Path(ctl_file.out_qgs_project_file_en).name
-        else:
-            qgs_project_file_en = ctl_file.out_qgs_project_file_en
+        headers = dict(kwargs.pop('headers', None) or {})
+        if authenticated:
+            token = LoginToken.get_token(feedback)
+            headers['Authorization'] = 'Bearer ' + token
+        kwargs.setdefault('timeout', DdrInfo.get_http_timeout())
 
-        if ctl_file.out_qgs_project_file_fr not in ["", "-"]:
-            qgs_project_file_fr = Path(ctl_file.out_qgs_project_file_fr).name
-        else:
-            qgs_project_file_fr = ctl_file.out_qgs_project_file_fr
+        response = DdrApiClient.get_session().request(method, url, headers=headers, **kwargs)
 
-        if ctl_file.out_qgs_project_file_en not in ["", "-"] or ctl_file.out_qgs_project_file_fr not in ["", "-"]:
-            # Add the name of the file
-            service_parameters = [
-                {
-                    "in_project_filename": qgs_project_file_en,
-                    "language": 'English',
-                    "service_schema_name": ctl_file.department
-                },
-                {
-                    "in_project_filename": qgs_project_file_fr,
-                    "language": 'French',
-                    "service_schema_name": ctl_file.department
-                }
-            ]
-        else:
-            if ctl_file.out_qgs_project_file_en == "-" or ctl_file.out_qgs_project_file_fr == "-":
-                service_parameters = [{}]
-            else:
-                service_parameters = []
+        # When the access token is rejected, the token is refreshed and the request is sent once more if the body
+        # of the request can be sent again
+        data = kwargs.get('data')
+        if authenticated and response.status_code == 401 and LoginToken.can_refresh() and \
+                (data is None or hasattr(data, 'rewind')):
+            Utils.push_info(feedback, "WARNING: The access token is rejected ==> Refreshing the access token")
+            LoginToken.refresh_token(feedback, token)
+            if data is not None:
+                data.rewind()
+            headers['Authorization'] = 'Bearer ' + LoginToken.get_token(feedback)
+            response = DdrApiClient.get_session().request(method, url, headers=headers, **kwargs)
 
-        json_control_file = {
-            "generic_parameters": {
-                "department": ctl_file.department,
-                "download_info_id": ctl_file.download_info_id,
-                "email": ctl_file.email,
-                "metadata_uuid": ctl_file.metadata_uuid,
-                "qgis_server_id": ctl_file.qgs_server_id,
-                "download_package_name": download_package_name,
-                "core_subject_term": ctl_file.core_subject_term,
-                "czs_collection_theme": theme_uuid
-            },
-            "service_parameters": service_parameters
-        }
+        return response
 
-        # Serialize the JSON
-        json_object = json.dumps(json_control_file, indent=4, ensure_ascii=False)
 
-        # Write the JSON document
-        ctl_file.control_file_name = os.path.join(ctl_file.control_file_dir, "ControlFile.json")
-        with open(ctl_file.control_file_name, "w") as outfile:
-            outfile.write(json_object)
+class MessageLogFeedback(object):
+    """This class replaces the processing feedback of a task running in the background. The messages are written
+       in the QGIS message log"""
 
-        Utils.push_info(feedback, f"INFO: Creation of the JSON control file: {ctl_file.control_file_name}")
+    def pushInfo(self, info):  # pylint: disable=invalid-name
+        """Write the message in the QGIS message log"""
 
-        return
+        QgsMessageLog.logMessage(info, "DDR Publication", Qgis.Info)
 
-    @staticmethod
-    def read_csz_themes(ctl_file, feedback):
-        """Read the CSZ themes from the service end point"""
+    def setProgress(self, progress):  # pylint: disable=invalid-name
+        """There is no progress bar for a task running in the background"""
 
-        url = DdrInfo.get_http_environment()
-        url += "/czs_themes"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_csz_theme(feedback, response)
+        pass
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+    def isCanceled(self):  # pylint: disable=invalid-name
+        """A task running in the background cannot be cancelled"""
 
-    @staticmethod
-    def read_ddr_departments(ctl_file, feedback):
-        """Read the DDR departments that the currently logged in User/Publisher has access to
-           from the service endpoint"""
+        return False
 
-        url = DdrInfo.get_http_environment()
-        url += "/ddr_registry_departments"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_ddr_departments(feedback, response)
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+class RegistryCache(object):
+    """This class manages the on-disk cache of the DDR registries (themes, departments, email, downloads and
+       servers). The cache is stored in the QGIS profile directory and is keyed by environment and user"""
 
-    @staticmethod
-    def read_user_email(ctl_file, feedback):
-        """Read the User Email from the service end point"""
+    VERSION = 1
 
-        url = DdrInfo.get_http_environment()
-        url += "/ddr_registry_my_publisher_email"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_user_email(feedback, response)
+    # Class variables used to serialize the access to the cache file and to warm up DdrInfo only once
+    __lock = threading.Lock()
+    __warmed_up = False
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+    @staticmethod
+    def get_file_name():
+        """Return the name of the cache file in the QGIS profile directory"""
+
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "pub_ddr_processing", "registry_cache.json")
 
     @staticmethod
-    def read_downloads(ctl_file, feedback):
-        """Read the  downloads that the currently logged in User/Publisher has access to from the service end point"""
+    def _read():
+        """Read the cache file. An empty cache is returned if the file is missing, corrupted or from another
+           version"""
 
-        url = DdrInfo.get_http_environment()
-        url += "/ddr_registry_downloads"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
         try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_downloads(feedback, response)
+            with open(RegistryCache.get_file_name(), "r", encoding="utf-8") as infile:
+                cache_doc = json.load(infile)
+            if cache_doc.get("version") == RegistryCache.VERSION:
+                return cache_doc
+        except (OSError, ValueError):
+            pass
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+        return {"version": RegistryCache.VERSION, "last_key": None, "entries": {}}
 
     @staticmethod
-    def read_servers(ctl_file, feedback):
-        """Read the Servers from the service end point"""
+    def _write(cache_doc):
+        """Write the cache file"""
 
-        url = DdrInfo.get_http_environment()
-        url += "/ddr_registry_servers"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_servers(feedback, response)
+        file_name = RegistryCache.get_file_name()
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        tmp_file_name = file_name + ".tmp"
+        with open(tmp_file_name, "w", encoding="utf-8") as outfile:
+            json.dump(cache_doc, outfile, ensure_ascii=False)
+        os.replace(tmp_file_name, file_name)
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+    @staticmethod
+    def get_key(username):
+        """Return the cache key of the user in the selected execution environment"""
+
+        return f"{DdrInfo.get_environment()}|{username}"
 
     @staticmethod
-    def create_access_tokens(username, password, ctl_file, feedback):
-        """Authentication of the username/password in order to get the access token
-        """
+    def get_last_key():
+        """Return the cache key of the last login"""
 
-        #import web_pdb; web_pdb.set_trace()
-        Utils.push_info(feedback, f"INFO: Username: {username}")
-        Utils.push_info(feedback, f"INFO: Password: -X-X-X-X-X-X-")
-        url = DdrInfo.get_http_environment() + "/login"
-        headers = {"accept": "application/json",
-                   "Content-type": "application/json",
-                   "charset":"utf-8" }
-        Utils.push_info(feedback, "INFO: Authentication to DDR")
-        Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-        Utils.push_info(feedback, f"INFO: HTTP Headers: {headers}")
-        json_doc = { "password": password,
-                     "username": username}
+        with RegistryCache.__lock:
+            return RegistryCache._read()["last_key"]
 
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.post(url, verify=False, headers=headers, json=json_doc)
+    @staticmethod
+    def get_entries(key):
+        """Return the cache entries (one per registry) of a cache key"""
 
-            ResponseCodes.create_access_token(feedback, response)
+        with RegistryCache.__lock:
+            return RegistryCache._read()["entries"].get(key, {})
 
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+    @staticmethod
+    def set_entries(key, entries):
+        """Store the cache entries of a cache key and make it the last login"""
 
-        return
+        with RegistryCache.__lock:
+            cache_doc = RegistryCache._read()
+            cache_doc["entries"][key] = entries
+            cache_doc["last_key"] = key
+            RegistryCache._write(cache_doc)
 
     @staticmethod
-    def copy_qgis_project_file(ctl_file, feedback):
-        """Creates a copy of the French and English QGIS project files"""
-
-        def read_write_qgs(feedback, qgs_file_name, languange):
-            """Read and write the project file in a the temporary folder
-               Force project property to be relative path
-               Extract the name of the layers
-            """
-
-            # Read the QGIS project
-            qgs_project = QgsProject.instance()
-            qgs_project.read(qgs_file_name)
-            qgs_file = Path(qgs_file_name).name
-            out_qgs_project_file = os.path.join(ctl_file.control_file_dir, qgs_file)
-            qgs_project.write(out_qgs_project_file)  # Write the project in the new directory
-            # Force the project properties "Save Paths" to be Relative
-            qgs_project.writeEntryBool("Paths", "Absolute", False)
-            qgs_project.write(out_qgs_project_file)  # Rewrite the project properties with the new relative path
-            Utils.push_info(feedback, "INFO: QGIS project file save as: ", out_qgs_project_file)
+    def create_entry(json_response, response):
+        """Create a cache entry from a registry response with its validators (ETag, Last-Modified)"""
 
-            qgs_project = QgsProject.instance()
-            for src_layer in qgs_project.mapLayers().values():
-                # Adding the name of the layers with the language
-                DdrInfo.add_layer(src_layer, languange)
+        return {"data": json_response,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time()}
 
-            return out_qgs_project_file
+    @staticmethod
+    def revalidate_entry(entry):
+        """Return the cache entry revalidated by the DDR (304 Not Modified)"""
 
-        qgs_project = QgsProject.instance()
+        return {**entry, "fetched_at": time.time()}
 
-        # Validate that the present QGIS project is saved before the processing
-        if qgs_project.isDirty():
-            raise UserMessageException("The QGIS project file must be saved before starting the DDR publication")
+    @staticmethod
+    def get_validator_headers(entry):
+        """Return the headers of a conditional request for a cache entry"""
 
-        # Save the name of the actual QGS project file
-        ctl_file.src_qgs_project_name = qgs_project.fileName()
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
 
-        # Clear or Close  the actual QGS project
-        qgs_project.clear()
+        return headers
 
-        # Processing the French QGIS project file
-        ctl_file.out_qgs_project_file_fr = read_write_qgs(feedback, ctl_file.qgs_project_file_fr, "FR")
+    @staticmethod
+    def is_fresh(registry_name, entry):
+        """Check if the cache entry of a registry is still within its time to live"""
 
-        # Processing the English QGIS project file
-        ctl_file.out_qgs_project_file_en = read_write_qgs(feedback, ctl_file.qgs_project_file_en, "EN")
+        return time.time() - entry.get("fetched_at", 0) < DdrInfo.get_registry_cache_ttl(registry_name)
 
     @staticmethod
-    def copy_layer_gpkg(ctl_file, feedback):
-        """Copy the selected layers in the GeoPackage file"""
+    def warm_up():
+        """Populate DdrInfo with the registries of the last login so the menus are filled before any login"""
 
-        ctl_file.gpkg_file_name = os.path.join(ctl_file.control_file_dir, "qgis_vector_layers.gpkg")
-        qgs_project = QgsProject.instance()
-
-        total = DdrInfo.get_nbr_layers()  # Total number of layers to process
-        # Loop over each selected layers
-        for i, src_layer in enumerate(qgs_project.mapLayers().values()):
-            transform_context = QgsProject.instance().transformContext()
-            if src_layer.isSpatial():
-                if src_layer.type() == QgsMapLayer.VectorLayer:
-                    # Only copy vector layer
-                    ctl_file.gpkg_layer_counter += 1  # Update the counter of vector layer
-                    options = QgsVectorFileWriter.SaveVectorOptions()
-                    options.layerName = DdrInfo.get_layer_short_name(src_layer)
-                    options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer if Path(
-                        ctl_file.gpkg_file_name).exists() else QgsVectorFileWriter.CreateOrOverwriteFile
-                    options.feedback = None
-                    Utils.push_info(feedback, f"INFO: Copying layer: {src_layer.name()} ({str(i+1)}/{str(total)})")
-
-                    error, err1, err2, err3 = QgsVectorFileWriter.writeAsVectorFormatV3(layer=src_layer,
-                                              fileName=ctl_file.gpkg_file_name,
-                                              transformContext=transform_context,
-                                              options=options)
+        if RegistryCache.__warmed_up:
+            return
+        RegistryCache.__warmed_up = True
 
-                else:
-                    Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not vector ==> Not transferred")
-            else:
-                Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not spatial ==> transferred")
+        with RegistryCache.__lock:
+            cache_doc = RegistryCache._read()
+        entries = cache_doc["entries"].get(cache_doc["last_key"], {})
+        if all(registry_name in entries for registry_name in Utils.get_ddr_registries()):
+            try:
+                Utils.add_ddr_registries(entries)
+            except UserMessageException:
+                # A bad cache entry is simply ignored; the registries will be read at login
+                pass
+
+
+class LayerCache(object):
+    """This class manages the on-disk cache of the exported layers. Each layer is stored in its own GeoPackage
+       file named after the fingerprint of the layer so an unchanged layer is never exported twice. The cache is
+       stored in the QGIS profile directory and the least recently used files are evicted"""
+
+    VERSION = 1
+
+    # Class variable used to serialize the eviction of the files
+    __lock = threading.Lock()
 
     @staticmethod
-    def manage_service_web(process_type, ctl_file, feedback):
-        """
-        This method manages this operations needeed to process a service web.
-        """
+    def get_dir():
+        """Return the directory of the cache in the QGIS profile directory"""
 
-        if ctl_file.service_web:  # if web_service is selected
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "pub_ddr_processing", "layer_cache")
 
-            if process_type in [PUBLISH, UPDATE]:
+    @staticmethod
+    def get_file_name(fingerprint):
+        """Return the name of the cache file of a fingerprint"""
 
-                # Copy the QGIS project file (.qgs)
-                Utils.copy_qgis_project_file(ctl_file, feedback)
+        return os.path.join(LayerCache.get_dir(), f"{fingerprint}.gpkg")
 
-                # Copy the selected layers in the GPKG file
-                Utils.copy_layer_gpkg(ctl_file, feedback)
+    @staticmethod
+    def is_enabled():
+        """Return True when the exported layers are kept in the cache"""
 
-                # Set the layer data source
-                Utils.set_layer_data_source(ctl_file, feedback)
+        return DdrInfo.get_layer_cache_size() > 0
 
-            else:
-                # When we "unpublish" a service we must put "-" as the file name
+    @staticmethod
+    def get_fingerprint(src_layer, short_name, pruned_fields=None, coordinate_precision=None):
+        """Compute the fingerprint of a vector layer from its source, the version of its data, its subset string,
+           its CRS, its fields not exported and its coordinate precision. The fingerprint is also the checksum of
+           the layer for the delta updates, even when the cache is disabled. None is returned when the layer can't
+           be fingerprinted"""
+
+        provider = src_layer.providerType()
+        if provider not in Utils.THREAD_SAFE_PROVIDERS:
+            # The content of memory layers lives only in the QGIS session
+            return None
+
+        # Use the modification time of the files of a file based layer (ex.: .shp, .dbf, .gpkg-wal)
+        # otherwise the number of features and the extent reported by the provider
+        path = QgsProviderRegistry.instance().decodeUri(provider, src_layer.source()).get("path")
+        if path and os.path.isfile(path):
+            path = Path(path)
+            data_version = sorted(f"{file.name}|{file.stat().st_mtime_ns}|{file.stat().st_size}"
+                                  for file in path.parent.glob(f"{glob.escape(path.stem)}.*") if file.is_file())
+        elif not DdrInfo.get_layer_cache_databases():
+            # An edit of the attributes of a database layer changes neither its number of features nor its extent
+            return None
+        else:
+            data_version = f"{src_layer.featureCount()}|{src_layer.extent().toString()}"
+
+        layer_key = {"version": LayerCache.VERSION,
+                     "source": src_layer.source(),
+                     "provider": provider,
+                     "data_version": data_version,
+                     "subset": src_layer.subsetString(),
+                     "crs": src_layer.crs().toWkt(),
+                     "short_name": short_name}
+        if pruned_fields:
+            layer_key["pruned_fields"] = sorted(pruned_fields)
+        if coordinate_precision:
+            layer_key["coordinate_precision"] = coordinate_precision
+
+        return hashlib.sha256(json.dumps(layer_key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fetch(fingerprint, file_name):
+        """Copy the cached GeoPackage file of a fingerprint. Return False when the layer is not in the cache"""
+
+        cache_file_name = LayerCache.get_file_name(fingerprint)
+        try:
+            # The file is not linked because the file of the cache must not change when the export is modified
+            Utils.stage_file(cache_file_name, file_name, link=False)
+            os.utime(cache_file_name)  # Mark the file as recently used
+        except OSError:
+            return False
+
+        return True
+
+    @staticmethod
+    def store(fingerprint, file_name):
+        """Copy an exported GeoPackage file in the cache and evict the least recently used files"""
+
+        cache_file_name = LayerCache.get_file_name(fingerprint)
+        try:
+            os.makedirs(LayerCache.get_dir(), exist_ok=True)
+            tmp_file_name = f"{cache_file_name}.{threading.get_ident()}.tmp"
+            Utils.stage_file(file_name, tmp_file_name, link=False)
+            os.replace(tmp_file_name, cache_file_name)
+        except OSError:
+            # The cache is only an optimization
+            return
+
+        LayerCache.evict()
+
+    @staticmethod
+    def evict():
+        """Delete the least recently used files until the cache is smaller than its maximum size"""
+
+        with LayerCache.__lock:
+            try:
+                files = [file for file in Path(LayerCache.get_dir()).glob("*.gpkg") if file.is_file()]
+                files = sorted(((file.stat().st_mtime, file.stat().st_size, file) for file in files),
+                               key=lambda item: item[0])
+            except OSError:
+                return
+            cache_size = sum(size for dummy, size, dummy_file in files)
+            for dummy, size, file in files:
+                if cache_size <= DdrInfo.get_layer_cache_size():
+                    break
+                try:
+                    file.unlink()
+                    cache_size -= size
+                except OSError:
+                    pass
+
+
+class ProjectFileProcessor(xml.sax.handler.ContentHandler):
+    """This class reads and rewrites a QGIS project file (.qgs) as a stream of XML events without loading the
+       layers in QGIS. The user's project is never touched and only one <maplayer> element is kept in memory at
+       a time"""
+
+    DOCTYPE = "<!DOCTYPE qgis PUBLIC 'http://mrcc.com/qgis.dtd' 'SYSTEM'>"
+
+    def __init__(self, out_file, layer_sources, qgs_file_name, layer_pyramids=None):
+        super().__init__()
+        self._writer = XMLGenerator(out_file, encoding="utf-8", short_empty_elements=True)
+        self._layer_sources = layer_sources  # New (data source, provider) of the layers by layer id
+        self._layer_pyramids = layer_pyramids or {}  # Generalized copies (short name, source, scale) by layer id
+        self._qgs_file_name = qgs_file_name  # The relative paths are resolved from the project file
+        self._copied_element = None          # (Depth, name, attributes) of the layer reference being copied
+        self._item_text = None               # Layer id of the <custom-order> item being read
+        self._stack = []                     # Name of the opened elements
+        self._layer_events = None            # Events of the <maplayer> element being read
+        self._paths_absolute = False         # Flag set when the "Save Paths" property is written
+
+    @staticmethod
+    def get_absolute_source(source, provider, qgs_file_name):
+        """Convert the relative file path of a data source into an absolute path like QgsProject.read. The path
+           is decoded by the data provider so it is also resolved within a provider URI (ex.: file:./x.csv?...,
+           dbname='./db.sqlite', /vsizip/./a.zip/x.shp, path|layername=x)"""
+
+        provider_registry = QgsProviderRegistry.instance()
+        parts = provider_registry.decodeUri(provider, source)
+        path = parts.get("path")
+        if not path:
+            return source
+
+        absolute_path = QgsPathResolver(qgs_file_name).readPath(path)
+        if absolute_path == path:
+            return source
+        parts["path"] = absolute_path
+
+        return provider_registry.encodeUri(provider, parts)
+
+    @staticmethod
+    def read_layers(qgs_file_name, language):
+        """Read the layers of a project file, validate their short name and return them"""
+
+        layers = []
+        linked_layer_ids = set()  # Layers joined or in a relation with another layer
+        stack = []
+        try:
+            for event, element in ElementTree.iterparse(qgs_file_name, events=("start", "end")):
+                if event == "start":
+                    stack.append(element)
+                    continue
+                stack.pop()
+                if element.tag == "maplayer" and len(stack) == 2 and stack[1].tag == "projectlayers":
+                    source = element.findtext("datasource", "")
+                    provider = element.findtext("provider", "")
+                    layer = ProjectLayer(layer_id=element.findtext("id", ""),
+                                         layer_name=element.findtext("layername", ""),
+                                         short_name=element.findtext("shortname", ""),
+                                         layer_type=element.get("type"),
+                                         geometry=element.get("geometry"),
+                                         source=ProjectFileProcessor.get_absolute_source(source, provider,
+                                                                                         qgs_file_name),
+                                         provider=provider,
+                                         crs_wkt=element.findtext("srs/spatialrefsys/wkt", ""),
+                                         index_fields=ProjectFileProcessor.get_index_fields(element))
+                    layer.pruned_fields = ProjectFileProcessor.get_pruned_fields(element, layer.index_fields)
+                    layer.coordinate_precision = ProjectFileProcessor.get_coordinate_precision(element)
+                    linked_layer_ids.update(join.get("joinLayerId") for join in element.iterfind("vectorjoins/join"))
+                    # Adding the name of the layers with the language
+                    DdrInfo.add_layer(layer.short_name, layer.layer_name, language)
+                    layers.append(layer)
+                    element.clear()
+                elif element.tag == "relation" and len(stack) == 2 and stack[1].tag == "relations":
+                    linked_layer_ids.update((element.get("referencingLayer"), element.get("referencedLayer")))
+                elif len(stack) == 1:
+                    # Free the memory of the elements already read
+                    stack[0].clear()
+        except (OSError, ElementTree.ParseError) as e:
+            raise UserMessageException(f"Unable to read the QGIS project file: {qgs_file_name}: {str(e)}")
+
+        for layer in layers:
+            if layer.layer_id in linked_layer_ids:
+                # The fields of a joined layer or a layer in a relation are used by the other layers
+                layer.pruned_fields = []
+
+        return layers
+
+    @staticmethod
+    def get_expression_fields(expression):
+        """Return the fields referenced by an expression; an expression that does not parse is a field name"""
+
+        if not expression or expression == "ELSE":
+            return set()
+        qgs_expression = QgsExpression(expression)
+        if qgs_expression.hasParserError():
+            return {expression}
+
+        return {field for field in qgs_expression.referencedColumns() if field != QgsFeatureRequest.ALL_ATTRIBUTES}
+
+    @staticmethod
+    def get_index_fields(element):
+        """Return the fields used by the renderer (categorized and graduated attribute, rule filters) and by the
+           labeling (label expression, rule filters) of a layer element"""
+
+        fields = set()
+        renderer = element.find("renderer-v2")
+        if renderer is not None:
+            fields |= ProjectFileProcessor.get_expression_fields(renderer.get("attr"))
+            for rule in renderer.iter("rule"):
+                fields |= ProjectFileProcessor.get_expression_fields(rule.get("filter"))
+        labeling = element.find("labeling")
+        if labeling is not None:
+            for rule in labeling.iter("rule"):
+                fields |= ProjectFileProcessor.get_expression_fields(rule.get("filter"))
+            for text_style in labeling.iter("text-style"):
+                fields |= ProjectFileProcessor.get_expression_fields(text_style.get("fieldName"))
+
+        return sorted(fields)
+
+    @staticmethod
+    def get_layer_variable(element, name):
+        """Return the value of a variable of a layer element (None when the variable is not defined)"""
+
+        names = [option.get("value") for option in
+                 element.iterfind("customproperties/Option/Option[@name='variableNames']/Option")]
+        values = [option.get("value") for option in
+                  element.iterfind("customproperties/Option/Option[@name='variableValues']/Option")]
+        if not names:
+            # Before QGIS 3.20 the custom properties are property elements
+            for (key, variables) in (("variableNames", names), ("variableValues", values)):
+                for prop in element.iterfind(f"customproperties/property[@key='{key}']"):
+                    variables += [value.text for value in prop.iterfind("value")] or [prop.get("value")]
+
+        return dict(zip(names, values)).get(name)
+
+    @staticmethod
+    def get_coordinate_precision(element):
+        """Return the coordinate precision of a layer set by its variable ddr_coordinate_precision (None: the
+           precision of config_env.yaml is used)"""
+
+        value = ProjectFileProcessor.get_layer_variable(element, "ddr_coordinate_precision")
+        try:
+            return float(value) if value not in (None, "") else None
+        except ValueError:
+            raise UserMessageException(f"Invalid coordinate precision of the layer "
+                                       f"{element.findtext('layername', '')}: {value}")
+
+    @staticmethod
+    def get_pruned_fields(element, index_fields):
+        """Return the fields of a layer element that the service does not need: the fields hidden from WMS and
+           WFS (GetFeatureInfo and GetFeature return the other fields) that are not used by the renderer, the
+           labeling, the map tip, the display expression, the data defined properties, the virtual fields or
+           the joins"""
+
+        hidden_fields = set()
+        for field in element.iterfind("fieldConfiguration/field"):
+            flags = field.get("configurationFlags", "")
+            if "HideFromWms" in flags and "HideFromWfs" in flags:
+                hidden_fields.add(field.get("name"))
+        # Before QGIS 3.16 the excluded attributes are listed by service
+        hidden_fields |= {attribute.text for attribute in element.iterfind("excludeAttributesWMS/attribute")} & \
+                         {attribute.text for attribute in element.iterfind("excludeAttributesWFS/attribute")}
+        if not hidden_fields:
+            return []
+
+        used_fields = set(index_fields)
+        for expression in re.findall(r"\[%(.*?)%\]", element.findtext("mapTip", ""), re.DOTALL):
+            used_fields |= ProjectFileProcessor.get_expression_fields(expression.strip())
+        used_fields |= ProjectFileProcessor.get_expression_fields(element.findtext("previewExpression", ""))
+        for option in element.iter("Option"):
+            # Data defined properties of the symbols and the labels
+            if option.get("name") in ("expression", "field"):
+                used_fields |= ProjectFileProcessor.get_expression_fields(option.get("value"))
+        for field in element.iterfind("expressionfields/field"):
+            used_fields |= ProjectFileProcessor.get_expression_fields(field.get("expression"))
+        for join in element.iterfind("vectorjoins/join"):
+            used_fields.add(join.get("targetFieldName"))
+
+        return sorted(hidden_fields - used_fields)
+
+    @staticmethod
+    def rewrite(qgs_file_name, out_qgs_file_name, layer_sources, layer_pyramids=None):
+        """Write a copy of the project file with the new data source of the layers and relative paths. The
+           generalized copies of a layer are added after the layer with a scale based visibility"""
+
+        try:
+            with open(out_qgs_file_name, "w", encoding="utf-8", newline="") as out_file:
+                parser = xml.sax.make_parser()
+                parser.setFeature(xml.sax.handler.feature_external_ges, False)
+                parser.setContentHandler(ProjectFileProcessor(out_file, layer_sources, os.path.abspath(qgs_file_name),
+                                                             layer_pyramids))
+                parser.parse(qgs_file_name)
+        except (OSError, xml.sax.SAXException) as e:
+            raise UserMessageException(f"Unable to rewrite the QGIS project file: {qgs_file_name}: {str(e)}")
+
+    def startDocument(self):
+        self._writer.startDocument()
+        self._writer.ignorableWhitespace(ProjectFileProcessor.DOCTYPE + "\n")
+
+    def endDocument(self):
+        self._writer.endDocument()
+
+    def startElement(self, name, attrs):
+        self._stack.append(name)
+        attrs = dict(attrs)
+        if self._layer_events is not None:
+            self._layer_events.append(("start", name, attrs))
+            return
+        if name == "maplayer" and self._stack[-2:-1] == ["projectlayers"]:
+            # Keep the events of the layer until its id is known
+            self._layer_events = [("start", name, attrs)]
+            return
+        if name == "layer-tree-layer" and attrs.get("id") in self._layer_sources:
+            (attrs["source"], attrs["providerKey"]) = self._layer_sources[attrs["id"]]
+        if attrs.get("id") in self._layer_pyramids and \
+                (name == "layer-tree-layer" or (name == "layer" and self._stack[-2:-1] == ["layerorder"])):
+            # The generalized copies are added after the reference to the layer
+            self._copied_element = (len(self._stack), name, attrs)
+        elif name == "item" and self._stack[-2:-1] == ["custom-order"]:
+            self._item_text = ""
+        self._writer.startElement(name, attrs)
+        if self._stack[-3:] == ["properties", "Paths", "Absolute"]:
+            # Force the project properties "Save Paths" to be Relative
+            self._writer.characters("false")
+            self._paths_absolute = True
+
+    def endElement(self, name):
+        if self._layer_events is not None:
+            self._layer_events.append(("end", name, None))
+            if name == "maplayer" and self._stack[-2:-1] == ["projectlayers"]:
+                self._write_layer()
+        else:
+            if self._stack == ["qgis", "properties"] and not self._paths_absolute:
+                self._writer.startElement("Paths", {})
+                self._writer.startElement("Absolute", {"type": "bool"})
+                self._writer.characters("false")
+                self._writer.endElement("Absolute")
+                self._writer.endElement("Paths")
+            self._writer.endElement(name)
+            if self._copied_element is not None and self._copied_element[0] == len(self._stack):
+                self._write_references(self._copied_element[1], self._copied_element[2])
+                self._copied_element = None
+            elif self._item_text is not None:
+                if self._item_text in self._layer_pyramids:
+                    self._write_references(name, {}, self._item_text)
+                self._item_text = None
+        self._stack.pop()
+
+    def characters(self, content):
+        if self._layer_events is not None:
+            self._layer_events.append(("text", None, content))
+            return
+        if self._item_text is not None:
+            self._item_text += content
+        if self._stack[-3:] != ["properties", "Paths", "Absolute"]:
+            self._writer.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+    def _write_layer(self):
+        """Write the buffered <maplayer> element with its new data source and provider"""
+
+        events = self._layer_events
+        self._layer_events = None
+
+        # Read the text of the direct children of the layer
+        texts = {}
+        depth = 0
+        for (kind, name, value) in events:
+            if kind == "start":
+                depth += 1
+                if depth == 2:
+                    child = name
+                    texts.setdefault(child, "")
+            elif kind == "end":
+                depth -= 1
+            elif depth == 2:
+                texts[child] += value
+
+        provider = texts.get("provider", "")
+        source = ProjectFileProcessor.get_absolute_source(texts.get("datasource", ""), provider, self._qgs_file_name)
+        layer_id = texts.get("id", "")
+        (source, provider) = self._layer_sources.get(layer_id, (source, provider))
+        pyramids = self._layer_pyramids.get(layer_id, [])
+        attrs = events[0][2]
+        if pyramids:
+            # The layer is rendered below the scale of its first generalized copy
+            attrs = ProjectFileProcessor.get_scale_attributes(events[0][2], 0, pyramids[0][2])
+        self._write_events(events, attrs, {"datasource": source, "provider": provider})
+
+        for (index, (short_name, pyramid_source, scale)) in enumerate(pyramids):
+            # Each generalized copy is rendered from its scale to the scale of the next copy
+            next_scale = pyramids[index + 1][2] if index + 1 < len(pyramids) else None
+            attrs = ProjectFileProcessor.get_scale_attributes(events[0][2], scale, next_scale)
+            self._write_events(events, attrs, {"id": f"{layer_id}_{short_name}",
+                                               "datasource": pyramid_source,
+                                               "provider": "ogr",
+                                               "shortname": short_name,
+                                               "layername": f"{texts.get('layername', '')} (1:{scale})"})
+
+    @staticmethod
+    def get_scale_attributes(attrs, lower_scale, upper_scale):
+        """Return the attributes of a <maplayer> element visible from a scale (denominator) up to another scale
+           (None: no limit) within the scale range set by the user. An empty range is never visible"""
+
+        if attrs.get("hasScaleBasedVisibilityFlag") == "1":
+            lower_scale = max(lower_scale, float(attrs.get("maxScale") or 0))
+            if float(attrs.get("minScale") or 0) > 0:
+                upper_scale = min(upper_scale or float("inf"), float(attrs["minScale"]))
+        if upper_scale is not None:
+            upper_scale = max(upper_scale, lower_scale)
+
+        # In QGIS, minScale is the most zoomed out scale and maxScale the most zoomed in scale (0: no limit)
+        return dict(attrs, hasScaleBasedVisibilityFlag="1", maxScale=f"{lower_scale:.15g}",
+                    minScale=f"{upper_scale:.15g}" if upper_scale is not None else "0")
+
+    def _write_references(self, name, attrs, item_text=None):
+        """Write the references to the generalized copies of a layer in the layer tree and the layer order"""
+
+        layer_id = item_text if item_text is not None else attrs["id"]
+        for (short_name, source, scale) in self._layer_pyramids[layer_id]:
+            copy_id = f"{layer_id}_{short_name}"
+            if name == "layer-tree-layer":
+                copy_attrs = dict(attrs, id=copy_id, name=f"{attrs.get('name', '')} (1:{scale})", source=source,
+                                  providerKey="ogr")
+            else:
+                copy_attrs = dict(attrs, id=copy_id) if item_text is None else attrs
+            self._writer.startElement(name, copy_attrs)
+            if item_text is not None:
+                self._writer.characters(copy_id)
+            self._writer.endElement(name)
+
+    def _write_events(self, events, attrs, replaced_texts):
+        """Write the events of a <maplayer> element with new attributes and new texts of its children"""
+
+        depth = 0
+        skip_text = False
+        for (kind, name, value) in events:
+            if kind == "start":
+                self._writer.startElement(name, attrs if depth == 0 else value)
+                depth += 1
+                if depth == 2 and name in replaced_texts:
+                    self._writer.characters(replaced_texts[name])
+                    skip_text = True
+            elif kind == "end":
+                self._writer.endElement(name)
+                depth -= 1
+                skip_text = False
+            elif not skip_text:
+                self._writer.characters(value)
+
+
+class UploadMonitor(object):
+    """This class follows the bytes sent by an upload: it reports the progress, the throughput and the remaining
+       time, limits the bandwidth used and aborts the upload (and its connection) when the user cancels"""
+
+    REPORT_INTERVAL = 10  # Seconds between two throughput messages
+
+    def __init__(self, feedback, total_size, report_progress=True):
+
+        self.feedback = feedback
+        self.total_size = total_size
+        self.report_progress = report_progress
+        self.bandwidth_limit = DdrInfo.get_upload_bandwidth_limit()
+        self.reset()
+
+    def reset(self):
+        """Restart the monitoring when the upload is resent"""
+
+        self._start = time.perf_counter()
+        self._next_report = self._start + UploadMonitor.REPORT_INTERVAL
+        self._bytes_sent = 0
+        self._progress = -1
+
+    def _check_canceled(self):
+        """Raising an exception while the body is read closes the connection and stops the upload"""
+
+        if self.feedback.isCanceled():
+            raise UserMessageException("The upload is canceled")
+
+    def update(self, nbr_bytes):
+        """Account the bytes about to be sent; wait when the upload is faster than the bandwidth limit"""
+
+        self._check_canceled()
+        self._bytes_sent += nbr_bytes
+        now = time.perf_counter()
+        if self.bandwidth_limit > 0:
+            # Token bucket refilled at the bandwidth limit: wait until the bytes are available
+            delay = self._bytes_sent / self.bandwidth_limit - (now - self._start)
+            while delay > 0:
+                time.sleep(min(delay, .5))
+                self._check_canceled()
+                now = time.perf_counter()
+                delay = self._bytes_sent / self.bandwidth_limit - (now - self._start)
+
+        if self.report_progress and self.total_size > 0:
+            progress = int(self._bytes_sent * 100 / self.total_size)
+            if progress != self._progress:
+                self._progress = progress
+                self.feedback.setProgress(progress)
+
+        if now >= self._next_report:
+            self._next_report = now + UploadMonitor.REPORT_INTERVAL
+            rate = self._bytes_sent / (now - self._start)
+            eta = time.strftime("%H:%M:%S", time.gmtime((self.total_size - self._bytes_sent) / rate)) \
+                if rate > 0 else "-"
+            Utils.push_info(self.feedback, f"INFO: Uploaded {self._bytes_sent / 1024 / 1024:.1f}/"
+                                           f"{self.total_size / 1024 / 1024:.1f} MB "
+                                           f"({self._bytes_sent * 100 / max(self.total_size, 1):.0f}%) at "
+                                           f"{rate / 1024 / 1024:.2f} MB/s, remaining time: {eta}")
+
+
+class MultipartZipEncoder(object):
+    """This class streams a multipart/form-data body containing the zip file.  The zip file is read in fixed size
+       chunks so it is never loaded completely in memory and the number of bytes sent is reported in the progress bar"""
+
+    CHUNK_SIZE = 1024 * 1024  # Maximum number of bytes read from the zip file at once
+
+    def __init__(self, zip_file_name, feedback, fields=None, file_field='zip_file'):
+
+        self.feedback = feedback
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        # Create the multipart header (form fields and file header) and the multipart trailer
+        header = ""
+        for name, value in (fields or {}).items():
+            header += f"--{self.boundary}\r\n"
+            header += f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            header += f"{value}\r\n"
+        header += f"--{self.boundary}\r\n"
+        header += f'Content-Disposition: form-data; name="{file_field}"; filename="{Path(zip_file_name).name}"\r\n'
+        header += "Content-Type: application/zip\r\n\r\n"
+        trailer = f"\r\n--{self.boundary}--\r\n"
+
+        self._header = header.encode('utf-8')
+        self._trailer = trailer.encode('utf-8')
+        self._zip_file = ZipBuilder.open(zip_file_name)
+        self._len = len(self._header) + ZipBuilder.get_size(zip_file_name) + len(self._trailer)
+        self._monitor = UploadMonitor(feedback, self._len)
+        self.rewind()
+
+    def __len__(self):
+        """Total length of the multipart body; used by requests to set the Content-Length header"""
+
+        return self._len
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    def rewind(self):
+        """Restart the multipart body from the beginning so the request can be sent again"""
+
+        self._zip_file.seek(0)
+        self._parts = [io.BytesIO(self._header), self._zip_file, io.BytesIO(self._trailer)]
+        self._monitor.reset()
+
+    def read(self, size=-1):
+        """Read the next chunk of the multipart body. The chunk is never bigger than CHUNK_SIZE"""
+
+        if size is None or size < 0 or size > MultipartZipEncoder.CHUNK_SIZE:
+            size = MultipartZipEncoder.CHUNK_SIZE
+
+        chunk = b""
+        while self._parts and len(chunk) < size:
+            data = self._parts[0].read(size - len(chunk))
+            if data:
+                chunk += data
+            else:
+                # The current part is exhausted move to the next one
+                self._parts.pop(0)
+
+        # Report the progress, limit the bandwidth and stop the upload when canceled
+        self._monitor.update(len(chunk))
+
+        return chunk
+
+    def close(self):
+        """Close the zip file handle"""
+
+        self._parts = []
+        self._zip_file.close()
+
+
+class FilePartReader(object):
+    """This class reads a part (a slice) of a zip file in fixed size chunks"""
+
+    def __init__(self, file_name, offset, size, feedback):
+
+        self._file = ZipBuilder.open(file_name)
+        self._offset = offset
+        self._size = size
+        # The progress is reported by part by the upload session
+        self._monitor = UploadMonitor(feedback, size, report_progress=False)
+        self.rewind()
+
+    def __len__(self):
+        """Length of the part; used by requests to set the Content-Length header"""
+
+        return self._size
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.close()
+
+    def rewind(self):
+        """Restart the part from the beginning so the request can be sent again"""
+
+        self._file.seek(self._offset)
+        self._remaining = self._size
+        self._monitor.reset()
+
+    def read(self, size=-1):
+        """Read the next chunk of the part. The chunk is never bigger than MultipartZipEncoder.CHUNK_SIZE"""
+
+        if size is None or size < 0 or size > MultipartZipEncoder.CHUNK_SIZE:
+            size = MultipartZipEncoder.CHUNK_SIZE
+        chunk = self._file.read(min(size, self._remaining))
+        self._remaining -= len(chunk)
+        self._monitor.update(len(chunk))
+
+        return chunk
+
+    def close(self):
+        """Close the file handle"""
+
+        self._file.close()
+
+
+class UploadSession(object):
+    """This class manages a resumable upload session. The zip file is split in parts with their own SHA-256
+       checksum and the state of the session is saved in the temporary directory so that an interrupted upload
+       only resends the missing parts"""
+
+    SESSION_FILE_NAME = "upload_session.json"
+    VERSION = 1
+
+    def __init__(self, ctl_file, process_type, feedback):
+
+        self.ctl_file = ctl_file
+        self.process_type = process_type
+        self.feedback = feedback
+        self.session_file_name = os.path.join(ctl_file.control_file_dir, UploadSession.SESSION_FILE_NAME)
+        self.state = None
+
+    @staticmethod
+    def is_needed(ctl_file):
+        """Check if the zip file is big enough to be sent with a resumable upload session"""
+
+        return ZipBuilder.get_size(ctl_file.zip_file_name) >= DdrInfo.get_upload_session_threshold()
+
+    @staticmethod
+    def read_process_type(control_file_dir):
+        """Read the process type (PUBLISH, UPDATE) of the upload session saved in a temporary directory"""
+
+        session_file_name = os.path.join(control_file_dir, UploadSession.SESSION_FILE_NAME)
+        try:
+            with open(session_file_name, "r") as infile:
+                state = json.load(infile)
+            return state["operation"].upper()
+        except (OSError, ValueError, KeyError):
+            raise UserMessageException(f"No resumable upload session found in: {control_file_dir}")
+
+    def _save(self):
+        """Write the state of the upload session in the temporary directory"""
+
+        tmp_file_name = self.session_file_name + ".tmp"
+        with open(tmp_file_name, "w") as outfile:
+            json.dump(self.state, outfile, indent=4)
+        os.replace(tmp_file_name, self.session_file_name)
+
+    def _compute_parts(self):
+        """Split the zip file in parts and compute the SHA-256 of each part and of the whole file"""
+
+        part_size = DdrInfo.get_upload_part_size()
+        file_hash = hashlib.sha256()
+        parts = []
+        offset = 0
+        with ZipBuilder.open(self.ctl_file.zip_file_name) as zip_file:
+            while True:
+                part_hash = hashlib.sha256()
+                size = 0
+                while size < part_size:
+                    data = zip_file.read(min(MultipartZipEncoder.CHUNK_SIZE, part_size - size))
+                    if not data:
+                        break
+                    part_hash.update(data)
+                    file_hash.update(data)
+                    size += len(data)
+                if size == 0:
+                    break
+                parts.append({"index": len(parts), "offset": offset, "size": size, "sha256": part_hash.hexdigest()})
+                offset += size
+
+        return file_hash.hexdigest(), part_size, parts
+
+    def load(self):
+        """Load the state of a previous upload session. Return False if there is no usable upload session"""
+
+        if not os.path.isfile(self.session_file_name):
+            return False
+
+        try:
+            with open(self.session_file_name, "r") as infile:
+                state = json.load(infile)
+        except (OSError, ValueError) as e:
+            # The file can be truncated when QGIS was stopped while the session was saved
+            Utils.push_info(self.feedback, f"WARNING: Unable to read the saved upload session: {str(e)} ==> "
+                                           f"A new upload session is created")
+            return False
+
+        if not isinstance(state, dict) or \
+                state.get("version") != UploadSession.VERSION or \
+                state.get("operation") != self.process_type.lower() or \
+                state.get("environment") != DdrInfo.get_http_environment() or \
+                state.get("file_size") != ZipBuilder.get_size(self.ctl_file.zip_file_name):
+            Utils.push_info(self.feedback, "WARNING: The saved upload session does not match the zip file ==> "
+                                           "A new upload session is created")
+            return False
+
+        self.state = state
+        return True
+
+    def create(self):
+        """Create a new upload session in the DDR. Return False if the DDR does not support upload sessions"""
+
+        Utils.push_info(self.feedback, "INFO: Computing the SHA-256 checksum of the upload parts")
+        sha256, part_size, parts = self._compute_parts()
+        json_doc = {"operation": self.process_type.lower(),
+                    "file_name": Path(self.ctl_file.zip_file_name).name,
+                    "file_size": ZipBuilder.get_size(self.ctl_file.zip_file_name),
+                    "sha256": sha256,
+                    "part_size": part_size,
+                    "parts": [{"index": part["index"], "size": part["size"], "sha256": part["sha256"]}
+                              for part in parts]}
+
+        url = DdrApiClient.get_url("/upload_sessions")
+        Utils.push_info(self.feedback, f"INFO: HTTP Post Request: {url}")
+        response = DdrApiClient.request("POST", url, self.feedback, json=json_doc)
+        json_response = ResponseCodes.create_upload_session(self.feedback, response)
+        if json_response is None:
+            return False
+
+        self.state = {"version": UploadSession.VERSION,
+                      "environment": DdrInfo.get_http_environment(),
+                      "session_id": json_response["session_id"],
+                      "received_parts": json_response.get("received_parts", []),
+                      **json_doc}
+        for part, state_part in zip(parts, self.state["parts"]):
+            state_part["offset"] = part["offset"]
+        self._save()
+        Utils.push_info(self.feedback, f"INFO: Upload session created: {self.state['session_id']} "
+                                       f"({len(parts)} parts)")
+
+        return True
+
+    def refresh(self):
+        """Read from the DDR the list of parts already received. Return False if the session no longer exists"""
+
+        url = DdrApiClient.get_url(f"/upload_sessions/{self.state['session_id']}")
+        Utils.push_info(self.feedback, f"INFO: HTTP Get Request: {url}")
+        response = DdrApiClient.request("GET", url, self.feedback)
+        json_response = ResponseCodes.read_upload_session(self.feedback, response)
+        if json_response is None:
+            return False
+
+        self.state["received_parts"] = sorted(set(json_response.get("received_parts", [])))
+        self._save()
+
+        return True
+
+    def _send_part(self, part):
+        """Send one part of the zip file. Return True if the DDR received the part with a valid checksum"""
+
+        url = DdrApiClient.get_url(f"/upload_sessions/{self.state['session_id']}/parts/{part['index']}")
+        headers = {'Content-Type': 'application/octet-stream',
+                   'X-Part-SHA256': part['sha256']}
+        with FilePartReader(self.ctl_file.zip_file_name, part['offset'], part['size'], self.feedback) as reader:
+            response = DdrApiClient.request("PUT", url, self.feedback, data=reader, headers=headers)
+
+        return ResponseCodes.upload_session_part(self.feedback, response, part['index'])
+
+    def send_missing_parts(self):
+        """Send the parts not yet received by the DDR; each part is resent a few times before giving up"""
+
+        retries = DdrInfo.get_upload_part_retries()
+        nbr_parts = len(self.state["parts"])
+        for part in self.state["parts"]:
+            if part["index"] in self.state["received_parts"]:
+                continue
+            for attempt in range(retries + 1):
+                try:
+                    if self._send_part(part):
+                        break
+                except requests.exceptions.RequestException as e:
+                    Utils.push_info(self.feedback, f"WARNING: Unable to send part {part['index']}: {str(e)}")
+                if attempt < retries:
+                    time.sleep(2 ** attempt)  # Wait a little bit before resending the part
+            else:
+                raise UserMessageException(f"Unable to send part {part['index']} of the upload session")
+
+            self.state["received_parts"].append(part["index"])
+            self._save()
+            Utils.push_info(self.feedback, f"INFO: Part sent ({len(self.state['received_parts'])}/{nbr_parts})")
+            self.feedback.setProgress(int(len(self.state["received_parts"]) * 100 / nbr_parts))
+
+    def complete(self):
+        """Ask the DDR to assemble the parts and to process the operation"""
+
+        url = DdrApiClient.get_url(f"/upload_sessions/{self.state['session_id']}/complete")
+        Utils.push_info(self.feedback, f"INFO: HTTP Post Request: {url}")
+
+        return DdrApiClient.request("POST", url, self.feedback, json={"operation": self.process_type.lower()})
+
+    def upload(self):
+        """Upload the zip file using a resumable upload session. Return the response of the completion request
+           or None if the DDR does not support upload sessions"""
+
+        if self.load() and self.refresh():
+            Utils.push_info(self.feedback, f"INFO: Resuming upload session: {self.state['session_id']}")
+        elif not self.create():
+            return None
+
+        try:
+            self.send_missing_parts()
+            response = self.complete()
+        except (requests.exceptions.RequestException, UserMessageException):
+            # Keep the temporary directory so the upload can be resumed later
+            self.ctl_file.keep_files = "Yes"
+            try:
+                # A streamed zip file is written in the temporary directory: the resume must not depend on the
+                # download package of the user that can be modified or moved in the meantime
+                if ZipBuilder.materialize(self.ctl_file.zip_file_name):
+                    Utils.push_info(self.feedback, f"INFO: Zip file written for the resume: "
+                                                   f"{self.ctl_file.zip_file_name}")
+            except (OSError, UserMessageException) as e:
+                Utils.push_info(self.feedback, f"WARNING: Unable to write the zip file for the resume: {str(e)}. "
+                                               f"The download package must stay unchanged until the upload is "
+                                               f"resumed")
+            Utils.push_info(self.feedback, f"WARNING: The upload is suspended; the temporary directory "
+                                           f"{self.ctl_file.control_file_dir} is kept. Use the tool "
+                                           f"'Resume an interrupted upload' to send the missing parts")
+            raise
+
+        return response
+
+
+class BatchManifest(object):
+    """This class reads the manifest of a batch publication. The manifest is a CSV file (one item per row) or a
+       JSON file (list of items) where each item describes one publication"""
+
+    # Name of the columns of the manifest
+    COLUMNS = ["action", "metadata_uuid", "department", "service_web", "service_download", "qgis_file_en",
+               "qgis_file_fr", "qgs_server_id", "csz_theme", "download_package", "core_subject_term",
+               "download_info_id", "email"]
+
+    # Name of the columns of the results file
+    RESULT_COLUMNS = ["item", "action", "metadata_uuid", "status", "http_status", "message", "duration"]
+
+    # Process type of the action column
+    ACTIONS = {"publish": PUBLISH, "update": UPDATE, "unpublish": UNPUBLISH}
+
+    @staticmethod
+    def _to_bool(value):
+        """Convert a Yes/No, True/False or 1/0 value of the manifest"""
+
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in ("yes", "y", "true", "1", "oui")
+
+    @staticmethod
+    def _to_path(manifest_dir, value):
+        """Resolve a file path of the manifest relative to the directory of the manifest"""
+
+        if value == "":
+            return ""
+        return os.path.normpath(os.path.join(manifest_dir, os.path.expanduser(value)))
+
+    @staticmethod
+    def read(manifest_file):
+        """Read the manifest and return the list of items with all the columns filled"""
+
+        try:
+            if manifest_file.lower().endswith(".json"):
+                with open(manifest_file, "r", encoding="utf-8") as file:
+                    rows = json.load(file)
+                if isinstance(rows, dict):
+                    rows = rows.get("items", [])
+            else:
+                with open(manifest_file, "r", encoding="utf-8-sig", newline="") as file:
+                    rows = list(csv.DictReader(file))
+        except (OSError, ValueError, csv.Error) as e:
+            raise UserMessageException(f"Unable to read the manifest file: {manifest_file}: {str(e)}")
+
+        manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+        items = []
+        for row in rows:
+            row = {str(key).strip().lower(): ("" if value is None else value) for key, value in row.items()}
+            item = {column: (row.get(column, "").strip() if isinstance(row.get(column, ""), str)
+                             else row.get(column)) for column in BatchManifest.COLUMNS}
+            action = str(item["action"]).lower()
+            if action not in BatchManifest.ACTIONS:
+                raise UserMessageException(f"Unknown action '{item['action']}' in the manifest for the metadata "
+                                           f"UUID: {item['metadata_uuid']}")
+            item["action"] = action
+            for column in ("qgis_file_en", "qgis_file_fr", "download_package"):
+                item[column] = BatchManifest._to_path(manifest_dir, item[column])
+            # When the service columns are empty, the services are deduced from the files of the item
+            if item["service_web"] == "":
+                item["service_web"] = item["qgis_file_en"] != "" or item["qgis_file_fr"] != ""
+            if item["service_download"] == "":
+                item["service_download"] = item["download_package"] != ""
+            item["service_web"] = BatchManifest._to_bool(item["service_web"])
+            item["service_download"] = BatchManifest._to_bool(item["service_download"])
+            items.append(item)
+
+        if not items:
+            raise UserMessageException(f"The manifest file is empty: {manifest_file}")
+
+        return items
+
+    @staticmethod
+    def get_parameters(item, email, keep_files, validate, profile):
+        """Convert an item of the manifest into the parameters of the publish, update or unpublish algorithm"""
+
+        return {
+            'DEPARTMENT': item["department"],
+            'METADATA_UUID': item["metadata_uuid"],
+            'SERVICE_WEB': item["service_web"],
+            'SERVICE_DOWNLOAD': item["service_download"],
+            'QGIS_FILE_EN': item["qgis_file_en"],
+            'QGIS_FILE_FR': item["qgis_file_fr"],
+            'CSZ_THEMES': item["csz_theme"],
+            'QGS_SERVER_ID': item["qgs_server_id"],
+            'DOWNLOAD_PACKAGE': item["download_package"],
+            'CORE_SUBJECT_TERM': item["core_subject_term"],
+            'DOWNLOAD_INFO_ID': item["download_info_id"],
+            'EMAIL': item["email"] if item["email"] else email,
+            'KEEP_FILES': keep_files,
+            'Validate': validate,
+            'PROFILE': profile
+        }
+
+
+class DdrWorker(object):
+    """This class runs the publication pipeline (copy of the project files and layers, zip file and upload) in a
+       headless worker process (ddr_worker.py) with its own QgsApplication. The worker receives the job as one
+       JSON line on its standard input and sends back its log lines, progress and result as JSON lines"""
+
+    # Number of seconds given to the worker to stop after a cancel before it is killed
+    CANCEL_GRACE_PERIOD = 10
+
+    @staticmethod
+    def get_script():
+        """Return the name of the worker script"""
+
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "ddr_worker.py")
+
+    @staticmethod
+    def get_python_executable():
+        """Return the Python interpreter of QGIS. In the QGIS desktop sys.executable can be the QGIS binary"""
+
+        if DdrInfo.get_worker_python():
+            return DdrInfo.get_worker_python()
+
+        if Path(sys.executable).name.lower().startswith("python"):
+            return sys.executable
+
+        for directory in (sys.exec_prefix, os.path.join(sys.exec_prefix, "bin")):
+            for name in ("python3.exe", "python.exe", "python3", "python"):
+                python = os.path.join(directory, name)
+                if os.path.isfile(python):
+                    return python
+
+        raise UserMessageException("Unable to find the Python interpreter of QGIS; set Worker_Python in "
+                                   "config_env.yaml")
+
+    @staticmethod
+    def create_job(process_type, ctl_file, stage):
+        """Create the job sent to the worker process"""
+
+        return {"process_type": process_type,
+                "stage": stage,
+                "ctl_file": asdict(ctl_file),
+                "environment": DdrInfo.get_environment(),
+                "registries": DdrInfo.get_registries(),
+                "token": LoginToken.get_state(),
+                "prefix_path": QgsApplication.prefixPath(),
+                "settings_dir": QgsApplication.qgisSettingsDirPath()}
+
+    @staticmethod
+    def _read_lines(stream, put):
+        """Read the lines of a stream of the worker until the worker closes it"""
+
+        for line in stream:
+            put(line)
+        put(None)
+
+    @staticmethod
+    def _send(process, message):
+        """Send a message to the worker process"""
+
+        try:
+            process.stdin.write(json.dumps(message) + "\n")
+            process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            # The worker is already stopped (broken pipe or standard input already closed)
+            pass
+
+    @staticmethod
+    def run(process_type, ctl_file, feedback, stage=None):
+        """Run the publication pipeline (or one stage of it) in the worker process and wait for its result"""
+
+        env = dict(os.environ)
+        env["QT_QPA_PLATFORM"] = "offscreen"
+        Utils.push_info(feedback, "INFO: Starting the publication worker process")
+        try:
+            process = subprocess.Popen([DdrWorker.get_python_executable(), DdrWorker.get_script()],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       env=env, encoding="utf-8",
+                                       creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        except OSError as e:
+            raise UserMessageException(f"Unable to start the publication worker process: {str(e)}")
+
+        messages = queue.Queue()
+        stderr_lines = collections.deque(maxlen=20)
+        threading.Thread(target=DdrWorker._read_lines, args=(process.stdout, messages.put), daemon=True).start()
+        threading.Thread(target=DdrWorker._read_lines, args=(process.stderr, stderr_lines.append),
+                         daemon=True).start()
+        DdrWorker._send(process, DdrWorker.create_job(process_type, ctl_file, stage))
+
+        result = None
+        cancel_time = None
+        killed = False
+        while True:
+            # The cancel and the grace period are checked on every message as a busy worker sends its log lines
+            # and its progress more often than the timeout of the queue
+            if feedback.isCanceled() and cancel_time is None:
+                Utils.push_info(feedback, "WARNING: Canceling the publication worker process")
+                DdrWorker._send(process, {"type": "cancel"})
+                cancel_time = time.monotonic()
+            elif cancel_time is not None and not killed and \
+                    time.monotonic() - cancel_time > DdrWorker.CANCEL_GRACE_PERIOD:
+                Utils.push_info(feedback, "WARNING: The publication worker process does not stop ==> Killed")
+                process.kill()
+                killed = True
+            try:
+                line = messages.get(timeout=.5)
+            except queue.Empty:
+                continue
+
+            if line is None:
+                # The worker closed its standard output
+                break
+            try:
+                message = json.loads(line)
+            except ValueError:
+                feedback.pushInfo(line.rstrip())
+                continue
+            if message["type"] == "info":
+                feedback.pushInfo(message["message"])
+            elif message["type"] == "progress":
+                feedback.setProgress(message["value"])
+            elif message["type"] == "result":
+                result = message
+        process.wait()
+
+        if result is None:
+            if cancel_time is not None:
+                Utils.delete_dir_file(ctl_file, feedback)
+                raise UserMessageException("The publication is canceled")
+            stderr = "".join(line for line in stderr_lines if line is not None)
+            raise UserMessageException(f"The publication worker process stopped unexpectedly "
+                                       f"(exit code: {process.returncode}): {stderr}")
+
+        # Copy back the result of the worker (the refreshed token and the control file)
+        LoginToken.set_state(result["token"])
+        for (name, value) in result["ctl_file"].items():
+            if name not in ("qgs_layers_en", "qgs_layers_fr"):
+                setattr(ctl_file, name, value)
+        if result["error"] is not None:
+            raise UserMessageException(result["error"])
+
+
+class ZipBuilder(object):
+    """This class builds the zip file sent to the DDR. The members are compressed in parallel in temporary files
+       then the zip file is assembled sequentially (with the zip64 extensions for the big files). The files
+       already compressed (download package, images...) are stored as is"""
+
+    # Compression methods of the zip format
+    STORED = 0
+    DEFLATED = 8
+    ZSTANDARD = 93
+
+    # Extension of the files already compressed
+    STORED_EXTENSIONS = (".zip", ".7z", ".gz", ".bz2", ".xz", ".zst", ".png", ".jpg", ".jpeg")
+
+    CHUNK_SIZE = 1024 * 1024
+    ZIP64_LIMIT = 0xFFFFFFFF
+
+    def __init__(self, work_dir, compression="deflate", level=6, workers=1):
+        if compression == "deflate":
+            self.method = ZipBuilder.DEFLATED
+        elif compression == "zstd":
+            self.method = ZipBuilder.ZSTANDARD
+        else:
+            raise UserMessageException(f"Unknown zip compression: {compression}")
+        self.level = level
+        self.workers = workers
+        self.parts_dir = os.path.join(work_dir, "zip_parts")
+        self.members = []
+
+    @staticmethod
+    def is_available(compression):
+        """Return True when the compression can be used (the zstandard package is optional)"""
+
+        return compression != "zstd" or zstandard is not None
+
+    def add(self, file_name, arcname):
+        """Add a file to the zip file"""
+
+        method = self.method
+        if Path(file_name).suffix.lower() in ZipBuilder.STORED_EXTENSIONS:
+            method = ZipBuilder.STORED
+        date_time = time.localtime(os.path.getmtime(file_name))[0:6]
+        if date_time[0] < 1980:
+            date_time = (1980, 1, 1, 0, 0, 0)
+        self.members.append(ZipMember(file_name=file_name, arcname=arcname, method=method, date_time=date_time,
+                                      file_size=os.path.getsize(file_name)))
+
+    def _get_compressor(self, method):
+        """Return a compressor object of the method"""
+
+        if method == ZipBuilder.ZSTANDARD:
+            return zstandard.ZstdCompressor(level=self.level).compressobj()
+        return zlib.compressobj(self.level, zlib.DEFLATED, -15)
+
+    def compress_member(self, index, member):
+        """Compute the CRC-32 of a member and compress it in a temporary file (zlib and zstandard release the GIL
+           so the members are compressed in parallel)"""
+
+        crc = 0
+        if member.method == ZipBuilder.STORED:
+            with open(member.file_name, "rb") as in_file:
+                for chunk in iter(lambda: in_file.read(ZipBuilder.CHUNK_SIZE), b""):
+                    crc = zlib.crc32(chunk, crc)
+        else:
+            member.data_file = os.path.join(self.parts_dir, f"{index}.part")
+            compressor = self._get_compressor(member.method)
+            with open(member.file_name, "rb") as in_file, open(member.data_file, "wb") as out_file:
+                for chunk in iter(lambda: in_file.read(ZipBuilder.CHUNK_SIZE), b""):
+                    crc = zlib.crc32(chunk, crc)
+                    out_file.write(compressor.compress(chunk))
+                out_file.write(compressor.flush())
+            member.compress_size = os.path.getsize(member.data_file)
+            if member.compress_size >= member.file_size:
+                # The file does not compress; store it
+                os.remove(member.data_file)
+                member.method = ZipBuilder.STORED
+                member.data_file = None
+        if member.method == ZipBuilder.STORED:
+            member.data_file = member.file_name
+            member.compress_size = member.file_size
+        member.crc = crc
+
+    def compress(self):
+        """Compress all the members in parallel"""
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.compress_member, index, member)
+                       for index, member in enumerate(self.members)]
+            for future in futures:
+                future.result()
+
+    @staticmethod
+    def _get_dos_date_time(date_time):
+        """Convert the date and time in the MS-DOS format of the zip file"""
+
+        (year, month, day, hour, minute, second) = date_time
+        return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+    @staticmethod
+    def _get_version(method, zip64):
+        """Return the version of the zip format needed to extract the member"""
+
+        if method == ZipBuilder.ZSTANDARD:
+            return 63
+        return 45 if zip64 else 20
+
+    @staticmethod
+    def get_local_header(member):
+        """Return the local header of a member"""
+
+        zip64 = member.file_size >= ZipBuilder.ZIP64_LIMIT or member.compress_size >= ZipBuilder.ZIP64_LIMIT
+        extra = struct.pack("<HHQQ", 1, 16, member.file_size, member.compress_size) if zip64 else b""
+        arcname = member.arcname.encode("utf-8")
+        (dos_date, dos_time) = ZipBuilder._get_dos_date_time(member.date_time)
+        return struct.pack("<IHHHHHIIIHH", 0x04034b50, ZipBuilder._get_version(member.method, zip64),
+                           0 if arcname.isascii() else 0x800, member.method, dos_time, dos_date, member.crc,
+                           ZipBuilder.ZIP64_LIMIT if zip64 else member.compress_size,
+                           ZipBuilder.ZIP64_LIMIT if zip64 else member.file_size,
+                           len(arcname), len(extra)) + arcname + extra
+
+    @staticmethod
+    def get_central_header(member):
+        """Return the header of a member in the central directory"""
+
+        fields = []
+        (file_size, compress_size, offset) = (member.file_size, member.compress_size, member.offset)
+        if file_size >= ZipBuilder.ZIP64_LIMIT:
+            fields.append(file_size)
+            file_size = ZipBuilder.ZIP64_LIMIT
+        if compress_size >= ZipBuilder.ZIP64_LIMIT:
+            fields.append(compress_size)
+            compress_size = ZipBuilder.ZIP64_LIMIT
+        if offset >= ZipBuilder.ZIP64_LIMIT:
+            fields.append(offset)
+            offset = ZipBuilder.ZIP64_LIMIT
+        extra = struct.pack(f"<HH{len(fields)}Q", 1, 8 * len(fields), *fields) if fields else b""
+        arcname = member.arcname.encode("utf-8")
+        (dos_date, dos_time) = ZipBuilder._get_dos_date_time(member.date_time)
+        version = ZipBuilder._get_version(member.method, bool(fields))
+        return struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, version, version,
+                           0 if arcname.isascii() else 0x800, member.method, dos_time, dos_date, member.crc,
+                           compress_size, file_size, len(arcname), len(extra), 0, 0, 0, 0o644 << 16,
+                           offset) + arcname + extra
+
+    def get_end_records(self, cd_offset, cd_size):
+        """Return the end of central directory records (with the zip64 records when needed)"""
+
+        nbr_members = len(self.members)
+        records = b""
+        if nbr_members >= 0xFFFF or cd_offset >= ZipBuilder.ZIP64_LIMIT or cd_size >= ZipBuilder.ZIP64_LIMIT:
+            records += struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, nbr_members, nbr_members,
+                                   cd_size, cd_offset)
+            records += struct.pack("<IIQI", 0x07064b50, 0, cd_offset + cd_size, 1)
+        records += struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, min(nbr_members, 0xFFFF), min(nbr_members, 0xFFFF),
+                               min(cd_size, ZipBuilder.ZIP64_LIMIT), min(cd_offset, ZipBuilder.ZIP64_LIMIT), 0)
+        return records
+
+    def write(self, zip_file_name):
+        """Assemble the zip file from the compressed members"""
+
+        with open(zip_file_name, "wb") as out_file:
+            for member in self.members:
+                member.offset = out_file.tell()
+                out_file.write(ZipBuilder.get_local_header(member))
+                with open(member.data_file, "rb") as in_file:
+                    shutil.copyfileobj(in_file, out_file, ZipBuilder.CHUNK_SIZE)
+            cd_offset = out_file.tell()
+            for member in self.members:
+                out_file.write(ZipBuilder.get_central_header(member))
+            cd_size = out_file.tell() - cd_offset
+            out_file.write(self.get_end_records(cd_offset, cd_size))
+
+    def get_layout(self):
+        """Return the segments of the zip file: the headers (bytes) and the data of the members (file name, size)"""
+
+        segments = []
+        offset = 0
+        for member in self.members:
+            member.offset = offset
+            header = ZipBuilder.get_local_header(member)
+            segments += [header, (member.data_file, member.compress_size)]
+            offset += len(header) + member.compress_size
+        central_directory = b"".join(ZipBuilder.get_central_header(member) for member in self.members)
+        segments.append(central_directory + self.get_end_records(offset, len(central_directory)))
+
+        return segments
+
+    def write_layout(self, zip_file_name):
+        """Write the layout of the zip file instead of the zip file. ZipBuilder.open streams the zip file from
+           its layout: the members are read where they are (the download package is never copied)"""
+
+        layout = [{"data": segment.hex()} if isinstance(segment, bytes) else
+                  {"file_name": segment[0], "size": segment[1]} for segment in self.get_layout()]
+        with open(zip_file_name + ZipStream.LAYOUT_EXTENSION, "w", encoding="utf-8") as file:
+            json.dump(layout, file, ensure_ascii=False)
+
+    @staticmethod
+    def open(zip_file_name):
+        """Open the zip file or stream it from its layout"""
+
+        if os.path.isfile(zip_file_name):
+            return open(zip_file_name, "rb")
+        return ZipStream(zip_file_name + ZipStream.LAYOUT_EXTENSION)
+
+    @staticmethod
+    def materialize(zip_file_name):
+        """Write the zip file streamed from its layout so it no longer depends on the files of the user (the
+           download package) nor on the compressed members. Return True when the zip file is written"""
+
+        if os.path.isfile(zip_file_name):
+            return False
+
+        tmp_file_name = zip_file_name + ".tmp"
+        with ZipStream(zip_file_name + ZipStream.LAYOUT_EXTENSION) as zip_stream, \
+                open(tmp_file_name, "wb") as out_file:
+            shutil.copyfileobj(zip_stream, out_file, Utils.COPY_CHUNK_SIZE)
+        os.replace(tmp_file_name, zip_file_name)
+        os.remove(zip_file_name + ZipStream.LAYOUT_EXTENSION)
+
+        return True
+
+    @staticmethod
+    def get_size(zip_file_name):
+        """Return the size of the zip file written or streamed"""
+
+        if os.path.isfile(zip_file_name):
+            return os.path.getsize(zip_file_name)
+        with ZipStream(zip_file_name + ZipStream.LAYOUT_EXTENSION) as zip_stream:
+            return len(zip_stream)
+
+    def cleanup(self):
+        """Delete the compressed members"""
+
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+
+class ZipStream(io.RawIOBase):
+    """This class reads a zip file generated on the fly from its layout (see ZipBuilder.write_layout). The
+       stream is seekable so a request can be resent and an upload session can read any of its parts"""
+
+    LAYOUT_EXTENSION = ".layout.json"
+
+    def __init__(self, layout_file_name):
+        super().__init__()
+        try:
+            with open(layout_file_name, "r", encoding="utf-8") as file:
+                layout = json.load(file)
+        except (OSError, ValueError) as e:
+            raise UserMessageException(f"Unable to read the layout of the zip file: {layout_file_name}: {str(e)}")
+
+        # Each segment is a header (bytes) or the data of a member (file name) with its offset in the zip file
+        self._segments = []
+        self._size = 0
+        for segment in layout:
+            if "data" in segment:
+                data = bytes.fromhex(segment["data"])
+                self._segments.append((self._size, len(data), data))
+                self._size += len(data)
+            else:
+                if not os.path.isfile(segment["file_name"]) or \
+                        os.path.getsize(segment["file_name"]) != segment["size"]:
+                    raise UserMessageException(f"The file was modified after the creation of the zip file: "
+                                               f"{segment['file_name']}")
+                self._segments.append((self._size, segment["size"], segment["file_name"]))
+                self._size += segment["size"]
+        self._position = 0
+        self._file = None
+        self._file_name = None
+
+    def __len__(self):
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def _read_segment(self, segment, offset, size):
+        """Read the data of a segment from an offset"""
+
+        (dummy, dummy, data) = segment
+        if isinstance(data, bytes):
+            return data[offset:offset + size]
+        if self._file_name != data:
+            # Only the file of the member being read is open
+            if self._file is not None:
+                self._file.close()
+            self._file = open(data, "rb")
+            self._file_name = data
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._size - self._position
+        chunks = []
+        for segment in self._segments:
+            (start, length, dummy) = segment
+            if size <= 0:
+                break
+            if start + length <= self._position:
+                continue
+            chunk = self._read_segment(segment, self._position - start, min(size, start + length - self._position))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+
+        return b"".join(chunks)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_name = None
+        super().close()
+
+
+class StageProfiler(object):
+    """This class measures the stages of a publication: wall time, CPU time, bytes read and written, memory (RSS)
+       at the end of the stage and its change during the stage, and peak memory of the whole process. The timings
+       are kept in the control file (so they come back from the worker process) and written in a JSON report and
+       optionally in a Chrome trace (chrome://tracing or Perfetto).
+       The CPU and I/O are the counters of the process: they include the other jobs running at the same time"""
+
+    PROFILE_OPTIONS = ['No', 'Timing report', 'Timing report and Chrome trace']
+
+    @staticmethod
+    def _get_io_counters():
+        """Return the number of bytes read and written by the process or None when not available"""
+
+        try:
+            with open("/proc/self/io", "r") as file:
+                counters = dict(line.split(":") for line in file.read().splitlines() if ":" in line)
+            return int(counters["rchar"]), int(counters["wchar"])
+        except (OSError, KeyError, ValueError):
+            pass
+        if psutil is not None:
+            counters = psutil.Process().io_counters()
+            return counters.read_bytes, counters.write_bytes
+
+        return None
+
+    @staticmethod
+    def _get_rss():
+        """Return the current memory (bytes) of the process or None when not available"""
+
+        try:
+            with open("/proc/self/statm", "r") as file:
+                return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError, AttributeError):
+            pass
+        if psutil is not None:
+            return psutil.Process().memory_info().rss
+
+        return None
+
+    @staticmethod
+    def _get_peak_rss():
+        """Return the peak memory (bytes) of the process since its start (the high-water mark of all the stages)
+           or None when not available"""
+
+        if resource is not None:
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak_rss if sys.platform == "darwin" else peak_rss * 1024  # Kilobytes on Linux
+        if psutil is not None:
+            return getattr(psutil.Process().memory_info(), "peak_wset", None)
+
+        return None
+
+    @staticmethod
+    def is_enabled(ctl_file):
+        """Return True when the stages are measured"""
+
+        return ctl_file.profile not in (None, "", StageProfiler.PROFILE_OPTIONS[0])
+
+    @staticmethod
+    @contextlib.contextmanager
+    def stage(ctl_file, name):
+        """Measure the stage executed in the with block"""
+
+        if not StageProfiler.is_enabled(ctl_file):
+            yield
+            return
+
+        start_time = time.time()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_io = StageProfiler._get_io_counters()
+        start_rss = StageProfiler._get_rss()
+        try:
+            yield
+        finally:
+            end_io = StageProfiler._get_io_counters()
+            end_rss = StageProfiler._get_rss()
+            timing = {"stage": name,
+                      "start": start_time,
+                      "wall_s": round(time.perf_counter() - start_wall, 6),
+                      "cpu_s": round(time.process_time() - start_cpu, 6),
+                      "read_bytes": end_io[0] - start_io[0] if start_io and end_io else None,
+                      "written_bytes": end_io[1] - start_io[1] if start_io and end_io else None,
+                      "rss_bytes": end_rss,
+                      "rss_delta_bytes": end_rss - start_rss if start_rss is not None and end_rss is not None
+                      else None,
+                      "process_peak_rss_bytes": StageProfiler._get_peak_rss(),
+                      "pid": os.getpid(),
+                      "tid": threading.get_ident()}
+            if ctl_file.timings is None:
+                ctl_file.timings = []
+            ctl_file.timings.append(timing)
+
+    @staticmethod
+    def write_report(ctl_file, feedback):
+        """Write the timing report (and the Chrome trace) in the QGIS profile directory"""
+
+        if not StageProfiler.is_enabled(ctl_file) or not ctl_file.timings:
+            return
+
+        report_dir = os.path.join(QgsApplication.qgisSettingsDirPath(), "pub_ddr_processing", "timings")
+        base_name = os.path.join(report_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{ctl_file.metadata_uuid}")
+        timings = sorted(ctl_file.timings, key=lambda timing: timing["start"])
+        report = {"metadata_uuid": ctl_file.metadata_uuid,
+                  "environment": DdrInfo.get_http_environment(),
+                  "http_status": ctl_file.http_status,
+                  "wall_s": round(max(timing["start"] + timing["wall_s"] for timing in timings) -
+                                  timings[0]["start"], 6),
+                  "stages": timings}
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            with open(base_name + ".json", "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=4)
+            Utils.push_info(feedback, "INFO: Timing report: ", base_name + ".json")
+
+            if ctl_file.profile == StageProfiler.PROFILE_OPTIONS[2]:
+                events = [{"name": timing["stage"], "cat": "publication", "ph": "X",
+                           "ts": int((timing["start"] - timings[0]["start"]) * 1000000),
+                           "dur": int(timing["wall_s"] * 1000000), "pid": timing["pid"], "tid": timing["tid"],
+                           "args": {key: value for (key, value) in timing.items()
+                                    if key not in ("stage", "start", "pid", "tid")}}
+                          for timing in timings]
+                with open(base_name + ".trace.json", "w", encoding="utf-8") as file:
+                    json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+                Utils.push_info(feedback, "INFO: Chrome trace: ", base_name + ".trace.json")
+        except OSError as e:
+            # The timing report is only for diagnostic
+            Utils.push_info(feedback, f"WARNING: Unable to write the timing report: {str(e)}")
+
+
+class JobQueue(object):
+    """This class stores the publication jobs and their status in a SQLite database in the QGIS profile
+       directory so the outcome of each job is kept even if QGIS is closed. The unfinished jobs of a batch can be
+       queued again to resume the batch"""
+
+    # Status of a job
+    QUEUED = "Queued"
+    BUILDING = "Building"
+    UPLOADING = "Uploading"
+    SUCCESS = "Success"
+    FAILED = "Failed"
+    CANCELED = "Canceled"
+
+    # Class variable used to serialize the writes in the database
+    __lock = threading.Lock()
+
+    def __init__(self, file_name=None):
+        self.file_name = file_name or os.path.join(QgsApplication.qgisSettingsDirPath(), "pub_ddr_processing",
+                                                   "jobs.sqlite")
+        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                                      job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                      batch TEXT NOT NULL,
+                                      item INTEGER NOT NULL,
+                                      action TEXT NOT NULL,
+                                      metadata_uuid TEXT,
+                                      parameters TEXT NOT NULL,
+                                      status TEXT NOT NULL,
+                                      attempts INTEGER NOT NULL DEFAULT 0,
+                                      http_status INTEGER,
+                                      message TEXT,
+                                      created_at TEXT NOT NULL,
+                                      updated_at TEXT NOT NULL)""")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Open a connection (each thread uses its own connection), commit the transaction and close it"""
+
+        connection = sqlite3.connect(self.file_name, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add_jobs(self, batch, jobs):
+        """Add the jobs (item, action, metadata UUID, parameters) of a batch and return their id"""
+
+        now = datetime.now().isoformat(timespec="seconds")
+        job_ids = []
+        with JobQueue.__lock, self._transaction() as connection:
+            for (item, action, metadata_uuid, parameters) in jobs:
+                cursor = connection.execute(
+                    "INSERT INTO jobs (batch, item, action, metadata_uuid, parameters, status, created_at, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch, item, action, metadata_uuid, json.dumps(parameters), JobQueue.QUEUED, now, now))
+                job_ids.append(cursor.lastrowid)
+
+        return job_ids
+
+    def update(self, job_id, **fields):
+        """Update the status, attempts, http_status or message of a job"""
+
+        fields["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with JobQueue.__lock, self._transaction() as connection:
+            connection.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get_job(self, job_id):
+        """Return a job as a dictionary"""
+
+        with self._transaction() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+        return dict(row)
+
+    def get_jobs(self, batch, status=None):
+        """Return the jobs of a batch (optionally with a given status) in the order of the items"""
+
+        query = "SELECT * FROM jobs WHERE batch = ?"
+        arguments = [batch]
+        if status is not None:
+            query += " AND status = ?"
+            arguments.append(status)
+        with self._transaction() as connection:
+            rows = connection.execute(query + " ORDER BY item", arguments).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_last_batch(self, prefix):
+        """Return the id of the last batch starting with a prefix (None when there is no such batch)"""
+
+        with self._transaction() as connection:
+            row = connection.execute("SELECT batch FROM jobs WHERE substr(batch, 1, length(?)) = ? "
+                                     "ORDER BY job_id DESC LIMIT 1", (prefix, prefix)).fetchone()
+
+        return row["batch"] if row is not None else None
+
+    def requeue_jobs(self, batch):
+        """Queue again the unfinished jobs of a batch (queued, interrupted, failed or canceled) and return them"""
+
+        now = datetime.now().isoformat(timespec="seconds")
+        with JobQueue.__lock, self._transaction() as connection:
+            connection.execute("UPDATE jobs SET status = ?, attempts = 0, message = NULL, updated_at = ? "
+                               "WHERE batch = ? AND status <> ?", (JobQueue.QUEUED, now, batch, JobQueue.SUCCESS))
+
+        return self.get_jobs(batch, JobQueue.QUEUED)
+
+
+class JobFeedback(object):
+    """This class prefixes the log lines of a job and serializes the access to the feedback of the algorithm
+       used by all the jobs"""
+
+    __lock = threading.Lock()
+
+    def __init__(self, feedback, prefix):
+        self._feedback = feedback
+        self._prefix = prefix
+
+    def pushInfo(self, info):  # pylint: disable=invalid-name
+        with JobFeedback.__lock:
+            self._feedback.pushInfo(f"[{self._prefix}] {info}")
+
+    def setProgress(self, progress):  # pylint: disable=invalid-name
+        # The progress of the algorithm is the number of jobs done
+        pass
+
+    def isCanceled(self):  # pylint: disable=invalid-name
+        return self._feedback.isCanceled()
+
+
+class JobScheduler(object):
+    """This class runs the jobs of a batch a few at a time. The build stage (CPU and disk) and the send stage
+       (network) of the jobs have their own limit so the export of a job overlaps the upload of another one.
+       A failed job is retried with an exponential backoff"""
+
+    def __init__(self, job_queue, feedback, build_jobs, upload_jobs):
+        self.job_queue = job_queue
+        self.feedback = feedback
+        self.build_jobs = build_jobs
+        self.upload_jobs = upload_jobs
+        self.retries = DdrInfo.get_scheduler_option("Retries", 2)
+        self.retry_delay = DdrInfo.get_scheduler_option("Retry_Delay", 30)
+        if not DdrInfo.get_worker_process() and self.build_jobs > 1:
+            # Without the worker process, the layers of the projects are stored in DdrInfo
+            Utils.push_info(feedback, "WARNING: The worker process is disabled ==> One build at a time")
+            self.build_jobs = 1
+        self._build_semaphore = threading.Semaphore(self.build_jobs)
+        self._upload_semaphore = threading.Semaphore(self.upload_jobs)
+
+    @staticmethod
+    def is_retryable(http_status):
+        """Only the errors of the server (or no response at all) are retried; a rejected request is not. The
+           errors of the build stage are never retried (see run_job)"""
+
+        return http_status is None or http_status >= 500
+
+    def _wait(self, delay):
+        """Wait before the next attempt; return False when the batch is canceled"""
+
+        end_time = time.monotonic() + delay
+        while time.monotonic() < end_time:
+            if self.feedback.isCanceled():
+                return False
+            time.sleep(.5)
+
+        return True
+
+    def run_job(self, job_id, algorithm_class, process_type, on_done):
+        """Run the build and send stages of a job with retries"""
+
+        job = self.job_queue.get_job(job_id)
+        parameters = json.loads(job["parameters"])
+        feedback = JobFeedback(self.feedback, f"Item {job['item']}")
+        for attempt in range(1, self.retries + 2):
+            if self.feedback.isCanceled():
+                self.job_queue.update(job_id, status=JobQueue.CANCELED)
+                break
+
+            ctl_file = None
+            http_status = None
+            sending = False
+            try:
+                with self._build_semaphore:
+                    self.job_queue.update(job_id, status=JobQueue.BUILDING, attempts=attempt)
+                    # Each job reads its parameters with its own instance of the algorithm and context
+                    algorithm = algorithm_class().create()
+                    ctl_file = Utils.create_control_file(algorithm, parameters, QgsProcessingContext(), feedback)
+                    Utils.run_stage(process_type, ctl_file, feedback, "build")
+                with self._upload_semaphore:
+                    self.job_queue.update(job_id, status=JobQueue.UPLOADING)
+                    sending = True
+                    Utils.run_stage(process_type, ctl_file, feedback, "send")
+                http_status = ctl_file.http_status
+                if http_status in (200, 204):
+                    self.job_queue.update(job_id, status=JobQueue.SUCCESS, http_status=http_status, message="")
+                    break
+                message = "The DDR rejected the request (see the log)"
+            except UserMessageException as e:
+                message = str(e)
+            except Exception as e:
+                # An unexpected error on one job must not stop the other jobs
+                message = f"{type(e).__name__}: {str(e)}"
+
+            if ctl_file is not None:
+                http_status = ctl_file.http_status
+                if http_status is None:
+                    # The package was not sent; delete it before the next attempt
+                    Utils.delete_dir_file(ctl_file, feedback)
+            self.job_queue.update(job_id, status=JobQueue.FAILED, http_status=http_status, message=message)
+            Utils.push_info(feedback, f"ERROR: Attempt {attempt}: {message}")
+            # A failed build (invalid layer, missing file, bad parameter...) fails again; only the transport errors
+            # and the errors of the server while sending are retried
+            if attempt > self.retries or not sending or not self.is_retryable(http_status):
+                break
+            delay = self.retry_delay * 2 ** (attempt - 1)
+            Utils.push_info(feedback, f"WARNING: Retrying in {delay} seconds")
+            if not self._wait(delay):
+                self.job_queue.update(job_id, status=JobQueue.CANCELED)
+                break
+
+        on_done(self.job_queue.get_job(job_id))
+
+    def run(self, jobs, on_done):
+        """Run the jobs (job id, algorithm class, process type) and call on_done with each finished job"""
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.build_jobs + self.upload_jobs) as executor:
+            futures = [executor.submit(self.run_job, job_id, algorithm_class, process_type, on_done)
+                       for (job_id, algorithm_class, process_type) in jobs]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+
+
+class Utils:
+    """Contains a list of static methods"""
+
+    @staticmethod
+    def get_date_time():
+        """Extract the current date and time """
+
+        now = datetime.now()  # current date and time
+        date_time = now.strftime("%Y-%m-%d %H:%M:%S")
+
+        return date_time
+
+    @staticmethod
+    def create_json_control_file(ctl_file, feedback):
+        """Creation and writing of the JSON control file"""
+
+        # Creation of the JSON control file
+        theme_uuid = DdrInfo.get_theme_uuid(ctl_file.csz_collection_theme)
+
+        if ctl_file.out_download_package_file not in ["", "-"]:
+            # Get the download package name without the extension
+            download_package_name = Path(ctl_file.out_download_package_file).stem
+        else:
+            download_package_name = ctl_file.out_download_package_file
+
+        if ctl_file.out_qgs_project_file_en not in ["", "-"]:
+            qgs_project_file_en = Path(ctl_file.out_qgs_project_file_en).name
+        else:
+            qgs_project_file_en = ctl_file.out_qgs_project_file_en
+
+        if ctl_file.out_qgs_project_file_fr not in ["", "-"]:
+            qgs_project_file_fr = Path(ctl_file.out_qgs_project_file_fr).name
+        else:
+            qgs_project_file_fr = ctl_file.out_qgs_project_file_fr
+
+        if ctl_file.out_qgs_project_file_en not in ["", "-"] or ctl_file.out_qgs_project_file_fr not in ["", "-"]:
+            # Add the name of the file
+            service_parameters = [
+                {
+                    "in_project_filename": qgs_project_file_en,
+                    "language": 'English',
+                    "service_schema_name": ctl_file.department
+                },
+                {
+                    "in_project_filename": qgs_project_file_fr,
+                    "language": 'French',
+                    "service_schema_name": ctl_file.department
+                }
+            ]
+        else:
+            if ctl_file.out_qgs_project_file_en == "-" or ctl_file.out_qgs_project_file_fr == "-":
+                service_parameters = [{}]
+            else:
+                service_parameters = []
+
+        json_control_file = {
+            "generic_parameters": {
+                "department": ctl_file.department,
+                "download_info_id": ctl_file.download_info_id,
+                "email": ctl_file.email,
+                "metadata_uuid": ctl_file.metadata_uuid,
+                "qgis_server_id": ctl_file.qgs_server_id,
+                "download_package_name": download_package_name,
+                "core_subject_term": ctl_file.core_subject_term,
+                "czs_collection_theme": theme_uuid
+            },
+            "service_parameters": service_parameters
+        }
+        if ctl_file.kept_layers is not None:
+            # Delta update: the GeoPackage file only contains the changed layers; the DDR keeps the other layers
+            json_control_file["delta_update"] = {"kept_layers": ctl_file.kept_layers}
+
+        # Serialize the JSON
+        json_object = json.dumps(json_control_file, indent=4, ensure_ascii=False)
+
+        # Write the JSON document
+        ctl_file.control_file_name = os.path.join(ctl_file.control_file_dir, "ControlFile.json")
+        with open(ctl_file.control_file_name, "w") as outfile:
+            outfile.write(json_object)
+
+        Utils.push_info(feedback, f"INFO: Creation of the JSON control file: {ctl_file.control_file_name}")
+
+        return
+
+    @staticmethod
+    def get_ddr_registries():
+        """Return the end point and the response code manager of each DDR registry"""
+
+        return {"themes": ("/czs_themes", ResponseCodes.read_csz_theme),
+                "departments": ("/ddr_registry_departments", ResponseCodes.read_ddr_departments),
+                "email": ("/ddr_registry_my_publisher_email", ResponseCodes.read_user_email),
+                "downloads": ("/ddr_registry_downloads", ResponseCodes.read_downloads),
+                "servers": ("/ddr_registry_servers", ResponseCodes.read_servers)}
+
+    @staticmethod
+    def add_ddr_registries(entries):
+        """Add the registries of the cache entries in DdrInfo"""
+
+        DdrInfo.add_registries(entries["themes"]["data"], entries["departments"]["data"], entries["email"]["data"],
+                               entries["downloads"]["data"], entries["servers"]["data"])
+
+    @staticmethod
+    def fetch_ddr_registries(registry_names, cache_entries, feedback):
+        """Send concurrently the GET requests of the registries. A conditional request is sent for the registries
+           already in the cache. Return the new cache entries or raise an exception if one of the requests failed"""
+
+        ddr_registries = Utils.get_ddr_registries()
+
+        # Only the HTTP requests are executed in the threads; the messages are logged in the calling thread
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(registry_names)) as executor:
+            futures = []
+            for registry_name in registry_names:
+                url = DdrApiClient.get_url(ddr_registries[registry_name][0])
+                headers = RegistryCache.get_validator_headers(cache_entries.get(registry_name))
+                Utils.push_info(feedback, f"INFO: HTTP Get Request: {url}")
+                futures.append(executor.submit(DdrApiClient.request, "GET", url, feedback, headers=headers))
+
+        new_entries = {}
+        failed_registries = []
+        for registry_name, future in zip(registry_names, futures):
+            end_point, response_code = ddr_registries[registry_name]
+            try:
+                response = future.result()
+                if response.status_code == 304 and registry_name in cache_entries:
+                    Utils.push_info(feedback, f"INFO: Status code: 304 - {end_point} not modified ==> cache used")
+                    new_entries[registry_name] = RegistryCache.revalidate_entry(cache_entries[registry_name])
+                else:
+                    json_response = response_code(feedback, response)
+                    if json_response is not None:
+                        new_entries[registry_name] = RegistryCache.create_entry(json_response, response)
+            except requests.exceptions.RequestException as e:
+                Utils.push_info(feedback, f"ERROR: Major problem with the DDR Publication API: {end_point}")
+            if registry_name not in new_entries:
+                failed_registries.append(end_point)
+
+        if failed_registries:
+            raise UserMessageException(f"Unable to read the DDR registries: {', '.join(failed_registries)}")
+
+        return new_entries
+
+    @staticmethod
+    def refresh_ddr_registries(cache_key, registry_names, cache_entries):
+        """Revalidate the stale registries in the background and update DdrInfo and the cache"""
+
+        feedback = MessageLogFeedback()
+        try:
+            entries = {**cache_entries, **Utils.fetch_ddr_registries(registry_names, cache_entries, feedback)}
+            if RegistryCache.get_last_key() == cache_key:
+                # Only update DdrInfo if there was no other login in the meantime
+                Utils.add_ddr_registries(entries)
+                RegistryCache.set_entries(cache_key, entries)
+        except (UserMessageException, requests.exceptions.RequestException) as e:
+            Utils.push_info(feedback, f"ERROR: Background refresh of the DDR registries: {str(e)}")
+
+    @staticmethod
+    def read_ddr_registries(ctl_file, feedback):
+        """Read the CSZ themes, the departments, the user email, the downloads and the servers from the service
+           end points or from the local cache. The requests are sent concurrently and the results are added to
+           DdrInfo only when all the requests are successful"""
+
+        # Validate the login before starting the threads
+        LoginToken.get_token(feedback)
+
+        registry_names = list(Utils.get_ddr_registries())
+        cache_key = RegistryCache.get_key(ctl_file.username)
+        cache_entries = RegistryCache.get_entries(cache_key)
+
+        if all(registry_name in cache_entries for registry_name in registry_names):
+            # Warm cache: the registries are used right away and the stale ones are revalidated in the background
+            Utils.push_info(feedback, "INFO: DDR registries read from the local cache")
+            Utils.add_ddr_registries(cache_entries)
+            RegistryCache.set_entries(cache_key, cache_entries)
+            stale_names = [registry_name for registry_name in registry_names
+                           if not RegistryCache.is_fresh(registry_name, cache_entries[registry_name])]
+            if stale_names:
+                Utils.push_info(feedback, f"INFO: Revalidating in the background: {', '.join(stale_names)}")
+                threading.Thread(target=Utils.refresh_ddr_registries,
+                                 args=(cache_key, stale_names, cache_entries), daemon=True).start()
+        else:
+            # Cold cache: the registries are read from the DDR
+            new_entries = Utils.fetch_ddr_registries(registry_names, cache_entries, feedback)
+            Utils.add_ddr_registries(new_entries)
+            RegistryCache.set_entries(cache_key, new_entries)
+
+    @staticmethod
+    def create_access_tokens(username, password, ctl_file, feedback):
+        """Authentication of the username/password in order to get the access token
+        """
+
+        Utils.push_info(feedback, f"INFO: Username: {username}")
+        Utils.push_info(feedback, f"INFO: Password: -X-X-X-X-X-X-")
+        url = DdrApiClient.get_url("/login")
+        headers = {"accept": "application/json",
+                   "Content-type": "application/json",
+                   "charset":"utf-8" }
+        Utils.push_info(feedback, "INFO: Authentication to DDR")
+        Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
+        Utils.push_info(feedback, f"INFO: HTTP Headers: {headers}")
+        json_doc = { "password": password,
+                     "username": username}
+
+        try:
+            Utils.push_info(feedback, f"INFO: HTTP Post Request: {url}")
+            response = DdrApiClient.request("POST", url, feedback, authenticated=False, headers=headers,
+                                            json=json_doc)
+
+            ResponseCodes.create_access_token(feedback, response)
+
+        except requests.exceptions.RequestException as e:
+            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+
+        return
+
+    @staticmethod
+    def copy_qgis_project_file(ctl_file, feedback):
+        """Read the layers of the French and English QGIS project files and set the name of the project files in
+           the temporary folder. The project files are read as XML and the user's project is not touched"""
+
+        ctl_file.out_qgs_project_file_en = os.path.join(ctl_file.control_file_dir,
+                                                        Path(ctl_file.qgs_project_file_en).name)
+        ctl_file.out_qgs_project_file_fr = os.path.join(ctl_file.control_file_dir,
+                                                        Path(ctl_file.qgs_project_file_fr).name)
+
+        ctl_file.qgs_layers_en = ProjectFileProcessor.read_layers(ctl_file.qgs_project_file_en, "EN")
+        Utils.push_info(feedback, "INFO: QGIS project file read: ", ctl_file.qgs_project_file_en)
+        ctl_file.qgs_layers_fr = ProjectFileProcessor.read_layers(ctl_file.qgs_project_file_fr, "FR")
+        Utils.push_info(feedback, "INFO: QGIS project file read: ", ctl_file.qgs_project_file_fr)
+
+    # Data providers that can open a copy of the layer in a worker thread
+    THREAD_SAFE_PROVIDERS = ("ogr", "postgres", "spatialite", "delimitedtext")
+
+    # Request code of the ioctl cloning a file (Linux FICLONE)
+    FICLONE = 0x40049409
+
+    # Number of bytes copied at once when a file is staged
+    COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+    # Number of features read before they are updated when the coordinates are snapped
+    SNAP_BATCH_SIZE = 10000
+
+    # Size of a pixel (meter) of the standardized rendering of QGIS Server and number of meters in a degree
+    PIXEL_SIZE = 0.00028
+    METERS_PER_DEGREE = 111320
+
+    @staticmethod
+    def export_layer_gpkg(job, transform_context):
+        """Export one vector layer in its own GeoPackage file. The layers of a thread safe provider are opened
+           in the worker thread as a QGIS layer can only be used in the thread that created it"""
+
+        src_layer = job.layer
+        if src_layer is None:
+            src_layer = QgsVectorLayer(job.source, job.short_name, job.provider)
+        if not src_layer.isValid():
+            job.error = f"Unable to open the layer: {job.layer_name}"
+            return job
+        if job.crs is not None and job.crs.isValid():
+            src_layer.setCrs(job.crs)
+        if job.coordinate_precision is None:
+            job.coordinate_precision = DdrInfo.get_coordinate_precision(src_layer.crs().isGeographic())
+
+        # Reuse the layer from the layer cache when it is unchanged since its last export
+        job.fingerprint = LayerCache.get_fingerprint(src_layer, job.short_name, job.pruned_fields,
+                                                     job.coordinate_precision)
+        if job.fingerprint is not None and LayerCache.is_enabled() and \
+                LayerCache.fetch(job.fingerprint, job.gpkg_file_name):
+            job.cached = True
+            job.checksum = job.fingerprint
+            return job
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.layerName = job.short_name
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
+        options.feedback = None
+        if DdrInfo.get_gpkg_optimize():
+            # The spatial index is created once all the layers are merged (see optimize_gpkg_file)
+            options.layerOptions = ["SPATIAL_INDEX=NO"]
+        if job.pruned_fields:
+            # Only export the fields needed by the service
+            options.attributes = [index for (index, field) in enumerate(src_layer.fields())
+                                  if field.name() not in job.pruned_fields]
+            options.skipAttributeCreation = not options.attributes
+        with Utils.gpkg_bulk_mode():
+            error, error_message, dummy1, dummy2 = QgsVectorFileWriter.writeAsVectorFormatV3(
+                                                       layer=src_layer,
+                                                       fileName=job.gpkg_file_name,
+                                                       transformContext=transform_context,
+                                                       options=options)
+        if error != QgsVectorFileWriter.NoError:
+            job.error = f"Unable to copy the layer: {job.layer_name}: {error_message}"
+            return job
+
+        if job.coordinate_precision:
+            job.invalid_fids = Utils.snap_layer_coordinates(job)
+            if job.invalid_fids is None:
+                job.error = f"Unable to snap the coordinates of the layer: {job.layer_name}: {gdal.GetLastErrorMsg()}"
+                return job
+
+        if job.fingerprint is None:
+            job.checksum = Utils.get_layer_checksum(job.gpkg_file_name, job.short_name)
+        else:
+            job.checksum = job.fingerprint
+            if LayerCache.is_enabled():
+                # Keep the exported layer in the layer cache for the next publications
+                LayerCache.store(job.fingerprint, job.gpkg_file_name)
+
+        return job
+
+    @staticmethod
+    def snap_layer_coordinates(job):
+        """Snap the coordinates of the exported layer to a grid. Snapped coordinates have fewer significant digits
+           so the GeoPackage file compresses better in the zip file. A geometry invalidated (or collapsed) by the
+           snapping keeps its original coordinates; the id of these features is returned (None on error)"""
+
+        precision = job.coordinate_precision
+        invalid_fids = []
+        with Utils.gpkg_bulk_mode():
+            data_source = gdal.OpenEx(job.gpkg_file_name, gdal.OF_VECTOR | gdal.OF_UPDATE)
+            if data_source is None:
+                return None
+            layer = data_source.GetLayerByName(job.short_name)
+            fid_column = (layer.GetFIDColumn() or "fid").replace('"', '""')
+            table_name = job.short_name.replace('"', '""')
+            min_fid = Utils._execute_sql(data_source, f'SELECT MIN("{fid_column}") FROM "{table_name}"')
+            max_fid = Utils._execute_sql(data_source, f'SELECT MAX("{fid_column}") FROM "{table_name}"')
+            if min_fid is None:
+                # Empty layer
+                return invalid_fids
+
+            data_source.StartTransaction()
+            for start_fid in range(min_fid, max_fid + 1, Utils.SNAP_BATCH_SIZE):
+                # The features are read by batch and updated once the batch is read
+                layer.SetAttributeFilter(f'"{fid_column}" >= {start_fid} AND '
+                                         f'"{fid_column}" < {start_fid + Utils.SNAP_BATCH_SIZE}')
+                features = []
+                for feature in layer:
+                    ogr_geometry = feature.GetGeometryRef()
+                    if ogr_geometry is None:
+                        continue
+                    geometry = QgsGeometry()
+                    geometry.fromWkb(bytes(ogr_geometry.ExportToIsoWkb()))
+                    snapped_geometry = geometry.snappedToGrid(precision, precision)
+                    if snapped_geometry.isNull() or \
+                            (not snapped_geometry.isGeosValid() and geometry.isGeosValid()):
+                        invalid_fids.append(feature.GetFID())
+                        continue
+                    feature.SetGeometryDirectly(ogr.CreateGeometryFromWkb(bytes(snapped_geometry.asWkb())))
+                    features.append(feature)
+                for feature in features:
+                    layer.SetFeature(feature)
+            layer.SetAttributeFilter(None)
+            data_source.CommitTransaction()
+            data_source = None  # Close the GeoPackage file
+
+        return invalid_fids
+
+    @staticmethod
+    def get_layer_checksum(file_name, layer_name):
+        """Compute the SHA-256 checksum of the content of an exported layer: its fields, its CRS and the geometry
+           and attributes of its features in the order of their id. The bytes of the GeoPackage file can't be used
+           as they change at each export (time stamps, page layout). None is returned on error"""
+
+        data_source = gdal.OpenEx(file_name, gdal.OF_VECTOR)
+        layer = data_source.GetLayerByName(layer_name) if data_source is not None else None
+        if layer is None:
+            return None
+
+        sha256 = hashlib.sha256()
+        layer_definition = layer.GetLayerDefn()
+        srs = layer.GetSpatialRef()
+        schema = {"fields": [(layer_definition.GetFieldDefn(index).GetName(),
+                              layer_definition.GetFieldDefn(index).GetTypeName())
+                             for index in range(layer_definition.GetFieldCount())],
+                  "geometry_type": layer.GetGeomType(),
+                  "crs": srs.ExportToWkt() if srs is not None else ""}
+        sha256.update(json.dumps(schema).encode("utf-8"))
+        for feature in layer:
+            geometry = feature.GetGeometryRef()
+            sha256.update(bytes(geometry.ExportToIsoWkb()) if geometry is not None else b"")
+            sha256.update(json.dumps([feature.GetFID(), feature.items()], default=str).encode("utf-8"))
+        data_source = None  # Close the GeoPackage file
+
+        return sha256.hexdigest()
+
+    @staticmethod
+    def write_layer_checksums(ctl_file, jobs, feedback):
+        """Write the checksum of each layer in the LayerChecksums.json file"""
+
+        layers = [{"name": job.short_name, "checksum": job.checksum} for job in jobs]
+        ctl_file.layer_checksums_file = os.path.join(ctl_file.control_file_dir, "LayerChecksums.json")
+        with open(ctl_file.layer_checksums_file, "w", encoding="utf-8") as outfile:
+            json.dump({"layers": layers}, outfile, indent=4, ensure_ascii=False)
+
+        Utils.push_info(feedback, f"INFO: Creation of the layer checksums file: {ctl_file.layer_checksums_file}")
+
+    @staticmethod
+    def compare_layer_checksums(ctl_file, feedback):
+        """Ask the DDR which layers of the service are unchanged with the /compare end point. Return the set of
+           unchanged layers or None when the DDR can't tell (the full update is then done)"""
+
+        # The compare package contains only the control file and the checksum of each layer
+        Utils.create_json_control_file(ctl_file, feedback)
+        compare_zip_file_name = os.path.join(ctl_file.control_file_dir, "ddr_compare.zip")
+        with zipfile.ZipFile(compare_zip_file_name, mode="w") as archive:
+            archive.write(ctl_file.control_file_name, arcname=Path(ctl_file.control_file_name).name)
+            archive.write(ctl_file.layer_checksums_file, arcname=Path(ctl_file.layer_checksums_file).name)
+
+        url = DdrApiClient.get_url("/compare")
+        headers = {'accept': 'application/json'}
+        Utils.push_info(feedback, "INFO: Comparing the layers with the layers in the DDR")
+        Utils.push_info(feedback, f"INFO: HTTP Post Request: {url}")
+        try:
+            with MultipartZipEncoder(compare_zip_file_name, feedback) as encoder:
+                headers['Content-Type'] = encoder.content_type
+                response = DdrApiClient.request("POST", url, feedback, data=encoder, headers=headers)
+            json_response = ResponseCodes.compare_layer_checksums(feedback, response)
+        except requests.exceptions.RequestException:
+            Utils.push_info(feedback, f"WARNING: Unable to reach the DDR Publication API: {url}")
+            json_response = None
+        finally:
+            os.remove(compare_zip_file_name)
+
+        # Only keep the layers that have the same checksum in the DDR
+        try:
+            ddr_checksums = {layer["name"]: layer["checksum"] for layer in json_response["layers"]}
+            with open(ctl_file.layer_checksums_file, "r", encoding="utf-8") as infile:
+                checksums = json.load(infile)["layers"]
+        except (KeyError, TypeError):
+            Utils.push_info(feedback, "WARNING: The response of the DDR can't be used to compare the layers ==> "
+                                      "All the layers are sent")
+            return None
+
+        return {layer["name"] for layer in checksums
+                if layer["checksum"] is not None and ddr_checksums.get(layer["name"]) == layer["checksum"]}
+
+    @staticmethod
+    @contextlib.contextmanager
+    def gpkg_bulk_mode():
+        """Build the GeoPackage files of the thread with a large page size and without journal (the files are
+           temporary until the zip file is created)"""
+
+        if not DdrInfo.get_gpkg_optimize():
+            yield
+            return
+
+        options = {"OGR_SQLITE_PRAGMA": f"page_size={DdrInfo.get_gpkg_page_size()},journal_mode=OFF,"
+                                        f"synchronous=OFF",
+                   "OGR_SQLITE_CACHE": "128"}
+        previous_options = {key: gdal.GetThreadLocalConfigOption(key, None) for key in options}
+        for (key, value) in options.items():
+            gdal.SetThreadLocalConfigOption(key, value)
+        try:
+            yield
+        finally:
+            for (key, value) in previous_options.items():
+                gdal.SetThreadLocalConfigOption(key, value)
+
+    @staticmethod
+    def _execute_sql(data_source, sql):
+        """Execute a SQL statement in a GDAL data source and return the first value of the result"""
+
+        result_layer = data_source.ExecuteSQL(sql)
+        if result_layer is None:
+            return None
+        feature = result_layer.GetNextFeature()
+        value = feature.GetField(0) if feature is not None else None
+        data_source.ReleaseResultSet(result_layer)
+
+        return value
+
+    @staticmethod
+    def create_attribute_indexes(ctl_file, feedback):
+        """Index the fields used by the renderer and the labeling of the layers in the English and French project
+           files so QGIS Server does not scan the whole table to filter the features"""
+
+        index_fields = {}
+        for layer in (ctl_file.qgs_layers_en or []) + (ctl_file.qgs_layers_fr or []):
+            index_fields.setdefault(layer.short_name, set()).update(layer.index_fields or [])
+        for (short_name, pyramids) in (ctl_file.gpkg_pyramids or {}).items():
+            # The styles of the generalized copies are the styles of their layer
+            for (pyramid_name, _) in pyramids:
+                index_fields[pyramid_name] = index_fields.get(short_name, set())
+
+        data_source = gdal.OpenEx(ctl_file.gpkg_file_name, gdal.OF_VECTOR | gdal.OF_UPDATE)
+        if data_source is None:
+            raise UserMessageException(f"Unable to open the GeoPackage file: {ctl_file.gpkg_file_name}")
+        for (short_name, fields) in sorted(index_fields.items()):
+            layer = data_source.GetLayerByName(short_name)
+            if layer is None or not fields:
+                # Layer not sent by a delta update or without field to index
+                continue
+            layer_definition = layer.GetLayerDefn()
+            indexed_fields = [field for field in sorted(fields) if layer_definition.GetFieldIndex(field) >= 0]
+            table_name = short_name.replace('"', '""')
+            for field in indexed_fields:
+                column_name = field.replace('"', '""')
+                Utils._execute_sql(data_source, f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_{column_name}" ON '
+                                                f'"{table_name}" ("{column_name}")')
+            Utils.push_info(feedback, f"INFO: Attribute indexes of the layer {short_name}: "
+                                      f"{', '.join(indexed_fields) if indexed_fields else '-'}")
+            ignored_fields = sorted(fields - set(indexed_fields))
+            if ignored_fields:
+                Utils.push_info(feedback, f"WARNING: Fields not found in the layer {short_name}: "
+                                          f"{', '.join(ignored_fields)}")
+        data_source = None  # Close the GeoPackage file
+
+    @staticmethod
+    def optimize_gpkg_file(ctl_file, feedback):
+        """Optimize the GeoPackage file for QGIS Server: create the spatial indexes after the bulk load, fill the
+           feature count of the layers, compute the statistics of the query planner (ANALYZE) and compact the file
+           (VACUUM)"""
+
+        size_before = os.path.getsize(ctl_file.gpkg_file_name)
+        with Utils.gpkg_bulk_mode():
+            data_source = gdal.OpenEx(ctl_file.gpkg_file_name, gdal.OF_VECTOR | gdal.OF_UPDATE)
+            if data_source is None:
+                raise UserMessageException(f"Unable to open the GeoPackage file: {ctl_file.gpkg_file_name}")
+            for index in range(data_source.GetLayerCount()):
+                layer = data_source.GetLayerByIndex(index)
+                table_name = layer.GetName().replace("'", "''")
+                geometry_column = layer.GetGeometryColumn().replace("'", "''")
+                if geometry_column and \
+                        not Utils._execute_sql(data_source, f"SELECT HasSpatialIndex('{table_name}', "
+                                                            f"'{geometry_column}')"):
+                    Utils._execute_sql(data_source, f"SELECT CreateSpatialIndex('{table_name}', "
+                                                    f"'{geometry_column}')")
+                # The feature count is read by QGIS Server without counting the features
+                Utils._execute_sql(data_source, f"UPDATE gpkg_ogr_contents SET feature_count = "
+                                                f"{layer.GetFeatureCount()} WHERE lower(table_name) = "
+                                                f"lower('{table_name}')")
+            Utils._execute_sql(data_source, "ANALYZE")
+            Utils._execute_sql(data_source, "VACUUM")
+            data_source = None  # Close the GeoPackage file
+
+        size_after = os.path.getsize(ctl_file.gpkg_file_name)
+        Utils.push_info(feedback, f"INFO: GeoPackage file optimized: {size_before / 1024 / 1024:.1f} MB ==> "
+                                  f"{size_after / 1024 / 1024:.1f} MB")
+
+    @staticmethod
+    def plan_layer_pyramids(ctl_file, jobs, feedback):
+        """Select the heavy line and polygon layers and name the generalized copy of each of their levels. The
+           copies of all the layers are planned (even the layers not sent by a delta update) so the project files
+           always use the copies. The plan of a layer is added to its checksum: a layer is sent again with its
+           copies when its plan changes (new scales or tolerance, layer crossing the minimum size...)"""
+
+        ctl_file.gpkg_pyramids = {}
+        scales = sorted(DdrInfo.get_layer_pyramid_option("Scales", None) or [])
+        if not scales:
+            return
+
+        min_size = DdrInfo.get_layer_pyramid_option("Min_Size_Mb", 10) * 1024 * 1024
+        geometries = {layer.short_name: layer.geometry for layer in ctl_file.qgs_layers_en}
+        for job in jobs:
+            if geometries.get(job.short_name) in ("Line", "Polygon") and \
+                    os.path.getsize(job.gpkg_file_name) >= min_size:
+                ctl_file.gpkg_pyramids[job.short_name] = [(f"{job.short_name}_gen{level}", scale)
+                                                          for (level, scale) in enumerate(scales, 1)]
+                plan = json.dumps({"scales": scales,
+                                   "tolerance_pixels": DdrInfo.get_layer_pyramid_option("Tolerance_Pixels", 1)})
+                job.checksum = hashlib.sha256(f"{job.checksum}|{plan}".encode("utf-8")).hexdigest()
+                Utils.push_info(feedback, f"INFO: Layer: {job.layer_name} generalized at the scales: "
+                                          f"{', '.join(f'1:{scale}' for scale in scales)}")
+
+    @staticmethod
+    def build_layer_pyramid(job):
+        """Write the generalized copy of a layer in its own GeoPackage file. The simplification tolerance is a
+           number of pixels at the scale from which the copy is rendered"""
+
+        (file_name, _, layer_name) = job.source.partition("|layername=")
+        tolerance = job.pyramid_scale * Utils.PIXEL_SIZE * DdrInfo.get_layer_pyramid_option("Tolerance_Pixels", 1)
+        layer_options = ["SPATIAL_INDEX=NO"] if DdrInfo.get_gpkg_optimize() else []
+        with Utils.gpkg_bulk_mode():
+            src_ds = gdal.OpenEx(file_name, gdal.OF_VECTOR)
+            src_layer = src_ds.GetLayerByName(layer_name) if src_ds is not None else None
+            if src_layer is None:
+                job.error = f"Unable to read the layer: {job.layer_name}: {gdal.GetLastErrorMsg()}"
+                return job
+            # The tolerance is converted in the units of the CRS of the layer
+            srs = src_layer.GetSpatialRef()
+            if srs is not None and srs.IsGeographic():
+                tolerance /= Utils.METERS_PER_DEGREE
+            elif srs is not None:
+                tolerance /= srs.GetLinearUnits() or 1
+            options = gdal.VectorTranslateOptions(format="GPKG", layers=[layer_name], layerName=job.short_name,
+                                                  simplifyTolerance=tolerance, layerCreationOptions=layer_options)
+            dst_ds = gdal.VectorTranslate(job.gpkg_file_name, src_ds, options=options)
+            if dst_ds is None:
+                job.error = f"Unable to generalize the layer: {job.layer_name}: {gdal.GetLastErrorMsg()}"
+            dst_ds = None  # Close the GeoPackage files
+            src_ds = None
+
+        return job
+
+    @staticmethod
+    def build_layer_pyramids(ctl_file, jobs, feedback):
+        """Build the generalized copies of the layers by a pool of threads (one task per layer and level).
+           Return the export jobs of the copies"""
+
+        pyramid_jobs = []
+        for job in jobs:
+            for (level, (short_name, scale)) in enumerate(ctl_file.gpkg_pyramids.get(job.short_name, []), 1):
+                pyramid_jobs.append(LayerExportJob(layer_name=f"{job.layer_name} (1:{scale})",
+                                                   short_name=short_name,
+                                                   source=f"{job.gpkg_file_name}|layername={job.short_name}",
+                                                   provider="ogr",
+                                                   gpkg_file_name=f"{os.path.splitext(job.gpkg_file_name)[0]}"
+                                                                  f"_gen{level}.gpkg",
+                                                   pyramid_scale=scale))
+        if not pyramid_jobs:
+            return pyramid_jobs
+
+        nbr_done = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=DdrInfo.get_gpkg_export_workers()) as executor:
+            futures = [executor.submit(Utils.build_layer_pyramid, job) for job in pyramid_jobs]
+            for future in concurrent.futures.as_completed(futures):
+                nbr_done += 1
+                Utils.push_info(feedback, f"INFO: Generalizing layer: {future.result().layer_name} "
+                                          f"({nbr_done}/{len(pyramid_jobs)})")
+
+        errors = [job.error for job in pyramid_jobs if job.error is not None]
+        if errors:
+            for error in errors:
+                Utils.push_info(feedback, f"ERROR: {error}")
+            raise UserMessageException(f"Unable to generalize {len(errors)} layer(s) in the GeoPackage file")
+
+        return pyramid_jobs
+
+    @staticmethod
+    def merge_gpkg_files(ctl_file, jobs, feedback):
+        """Merge the GeoPackage file of each layer in the final GeoPackage file. The file of the first layer
+           becomes the final file and the other layers are copied in one transaction"""
+
+        os.replace(jobs[0].gpkg_file_name, ctl_file.gpkg_file_name)
+        if len(jobs) == 1:
+            return
+
+        Utils.push_info(feedback, f"INFO: Merging {len(jobs)} layers in the GeoPackage file")
+        layer_options = ["SPATIAL_INDEX=NO"] if DdrInfo.get_gpkg_optimize() else []
+        with Utils.gpkg_bulk_mode():
+            dst_ds = gdal.OpenEx(ctl_file.gpkg_file_name, gdal.OF_VECTOR | gdal.OF_UPDATE)
+            if dst_ds is None:
+                raise UserMessageException(f"Unable to open the GeoPackage file: {ctl_file.gpkg_file_name}")
+            dst_ds.StartTransaction()
+            for job in jobs[1:]:
+                src_ds = gdal.OpenEx(job.gpkg_file_name, gdal.OF_VECTOR)
+                dst_layer = None
+                if src_ds is not None:
+                    dst_layer = dst_ds.CopyLayer(src_ds.GetLayerByName(job.short_name), job.short_name,
+                                                 layer_options)
+                src_ds = None
+                if dst_layer is None:
+                    dst_ds.RollbackTransaction()
+                    dst_ds = None
+                    raise UserMessageException(f"Unable to merge the layer {job.layer_name} in the GeoPackage "
+                                               f"file: {gdal.GetLastErrorMsg()}")
+            dst_ds.CommitTransaction()
+            dst_ds = None  # Close the GeoPackage file
+
+    @staticmethod
+    def copy_layer_gpkg(process_type, ctl_file, feedback):
+        """Copy the selected layers in the GeoPackage file. Each layer is exported in its own GeoPackage file by a
+           pool of threads then the files are merged in the final GeoPackage file"""
+
+        ctl_file.gpkg_file_name = os.path.join(ctl_file.control_file_dir, "qgis_vector_layers.gpkg")
+        transform_context = QgsCoordinateTransformContext()
+        export_dir = tempfile.mkdtemp(prefix='gpkg_', dir=ctl_file.control_file_dir)
+
+        # A field is pruned when neither the English nor the French service needs it
+        pruned_fields = {}
+        if DdrInfo.get_gpkg_prune_fields():
+            for layer in ctl_file.qgs_layers_en + (ctl_file.qgs_layers_fr or []):
+                fields = set(layer.pruned_fields or [])
+                pruned_fields[layer.short_name] = pruned_fields.get(layer.short_name, fields) & fields
+
+        # Create the export job of each vector layer of the English project
+        jobs = []
+        for layer in ctl_file.qgs_layers_en:
+            if layer.layer_type != "vector":
+                Utils.push_info(feedback, f"WARNING: Layer: {layer.layer_name} is not vector ==> Not transferred")
+            elif layer.geometry == "No geometry":
+                Utils.push_info(feedback, f"WARNING: Layer: {layer.layer_name} is not spatial ==> transferred")
+            else:
+                # Only copy vector layer
+                ctl_file.gpkg_layer_counter += 1  # Update the counter of vector layer
+                job = LayerExportJob(layer_name=layer.layer_name,
+                                     short_name=layer.short_name,
+                                     source=layer.source,
+                                     provider=layer.provider,
+                                     crs=QgsCoordinateReferenceSystem.fromWkt(layer.crs_wkt) if layer.crs_wkt
+                                     else None,
+                                     gpkg_file_name=os.path.join(export_dir,
+                                                                 f"layer_{ctl_file.gpkg_layer_counter}.gpkg"),
+                                     pruned_fields=sorted(pruned_fields.get(layer.short_name, [])) or None,
+                                     coordinate_precision=layer.coordinate_precision)
+                if job.pruned_fields:
+                    Utils.push_info(feedback, f"INFO: Layer: {layer.layer_name} fields not exported: "
+                                              f"{', '.join(job.pruned_fields)}")
+                if layer.provider not in Utils.THREAD_SAFE_PROVIDERS:
+                    # Memory and other providers are opened and exported in the main thread
+                    job.layer = QgsVectorLayer(layer.source, layer.short_name, layer.provider)
+                jobs.append(job)
+
+        if not jobs:
+            shutil.rmtree(export_dir, ignore_errors=True)
+            return
+
+        def _push_progress(job):
+            if job.cached:
+                Utils.push_info(feedback, f"INFO: Layer: {job.layer_name} is unchanged ==> "
+                                          f"Reused from the layer cache ({nbr_done}/{total})")
+            else:
+                Utils.push_info(feedback, f"INFO: Copying layer: {job.layer_name} ({nbr_done}/{total})")
+            if job.invalid_fids:
+                Utils.push_info(feedback, f"WARNING: Layer: {job.layer_name}: {len(job.invalid_fids)} geometries "
+                                          f"invalid once snapped to {job.coordinate_precision} ==> Not snapped "
+                                          f"(fid: {', '.join(str(fid) for fid in job.invalid_fids[:10])}"
+                                          f"{', ...' if len(job.invalid_fids) > 10 else ''})")
+
+        # Export the layers opened in the main thread and the other layers in the pool of threads
+        total = len(jobs)
+        nbr_done = 0
+        workers = DdrInfo.get_gpkg_export_workers()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(Utils.export_layer_gpkg, job, transform_context)
+                       for job in jobs if job.layer is None]
+            for job in jobs:
+                if job.layer is not None:
+                    Utils.export_layer_gpkg(job, transform_context)
+                    nbr_done += 1
+                    _push_progress(job)
+            for future in concurrent.futures.as_completed(futures):
+                nbr_done += 1
+                _push_progress(future.result())
+
+        errors = [job.error for job in jobs if job.error is not None]
+        if errors:
+            for error in errors:
+                Utils.push_info(feedback, f"ERROR: {error}")
+            raise UserMessageException(f"Unable to copy {len(errors)} layer(s) in the GeoPackage file")
+
+        Utils.plan_layer_pyramids(ctl_file, jobs, feedback)
+        Utils.write_layer_checksums(ctl_file, jobs, feedback)
+
+        if process_type == UPDATE and DdrInfo.get_delta_update() and not ctl_file.validate:
+            # Only send the layers that are changed in the DDR
+            unchanged_layers = Utils.compare_layer_checksums(ctl_file, feedback)
+            if unchanged_layers and all(job.short_name in unchanged_layers for job in jobs):
+                # An empty GeoPackage file would look like a service without vector layers
+                Utils.push_info(feedback, "INFO: All the layers are unchanged in the DDR ==> All the layers are sent")
+            elif unchanged_layers:
+                # The control file lists the layers (and their generalized copies) the DDR must keep
+                ctl_file.kept_layers = []
+                for job in jobs:
+                    if job.short_name in unchanged_layers:
+                        Utils.push_info(feedback, f"INFO: Layer: {job.layer_name} is unchanged in the DDR ==> "
+                                                  f"Not transferred")
+                        ctl_file.kept_layers.append(job.short_name)
+                        ctl_file.kept_layers += [short_name for (short_name, dummy)
+                                                 in ctl_file.gpkg_pyramids.get(job.short_name, [])]
+                jobs = [job for job in jobs if job.short_name not in unchanged_layers]
+                ctl_file.gpkg_layer_counter = len(jobs)
+
+        # Build the generalized copies of the heavy layers and merge the files of the layers and of the copies in
+        # the final GeoPackage file
+        jobs += Utils.build_layer_pyramids(ctl_file, jobs, feedback)
+        Utils.merge_gpkg_files(ctl_file, jobs, feedback)
+        shutil.rmtree(export_dir, ignore_errors=True)
+        if DdrInfo.get_gpkg_attribute_indexes():
+            Utils.create_attribute_indexes(ctl_file, feedback)
+        if DdrInfo.get_gpkg_optimize():
+            Utils.optimize_gpkg_file(ctl_file, feedback)
+
+    @staticmethod
+    def manage_service_web(process_type, ctl_file, feedback):
+        """
+        This method manages this operations needeed to process a service web.
+        """
+
+        if ctl_file.service_web:  # if web_service is selected
+
+            if process_type in [PUBLISH, UPDATE]:
+
+                # Read the layers of the QGIS project files (.qgs)
+                with StageProfiler.stage(ctl_file, "qgs_copy"):
+                    Utils.copy_qgis_project_file(ctl_file, feedback)
+
+                # Copy the selected layers in the GPKG file
+                with StageProfiler.stage(ctl_file, "gpkg_export"):
+                    Utils.copy_layer_gpkg(process_type, ctl_file, feedback)
+
+                # Set the layer data source in the English and French project files
+                with StageProfiler.stage(ctl_file, "datasource_rewrite"):
+                    Utils.set_layer_data_source(ctl_file, feedback)
+
+            else:
+                # When we "unpublish" a service we must put "-" as the file name
                 ctl_file.qgs_project_file_en = "-"
                 ctl_file.qgs_project_file_fr = "-"
                 ctl_file.out_qgs_project_file_en = "-"
@@ -730,6 +3653,160 @@ class Utils:
             ctl_file.out_qgs_project_file_fr = ""
 
 
+    @staticmethod
+    def get_threading_flags(flags):
+        """Add FlagNoThreading to the flags of a publication algorithm when the pipeline runs in the process of
+           QGIS, like the other algorithms of the plugin: QGIS is then busy until the publication ends (the layers
+           are still exported by a pool of threads). The algorithm runs in a background thread and QGIS stays
+           responsive only with the opt-in worker process (Worker_Process in config_env.yaml)"""
+
+        if not DdrInfo.get_worker_process():
+            flags |= QgsProcessingAlgorithm.FlagNoThreading
+
+        return flags
+
+    @staticmethod
+    def create_control_file(self, parameters, context, feedback):
+        """Create the control file data structure from the parameters of the algorithm and its temporary
+           directory"""
+
+        # Init the project files by resetting the layers structures
+        DdrInfo.init_project_file()
+
+        # Create the control file data structure
+        ctl_file = ControlFile()
+
+        # Extract the parameters
+        UtilsGui.read_parameters(self, ctl_file, parameters, context)
+
+        # Create temporary directory
+        with StageProfiler.stage(ctl_file, "temp_dir"):
+            ctl_file.control_file_dir = tempfile.mkdtemp(prefix='qgis_', dir=DdrInfo.get_temp_dir())
+        Utils.push_info(feedback, "INFO: Temporary directory created: ", ctl_file.control_file_dir)
+
+        return ctl_file
+
+    @staticmethod
+    def run_stage(process_type, ctl_file, feedback, stage=None):
+        """Run the publication pipeline or one of its stage ("build" or "send") in the worker process or in the
+           QGIS process"""
+
+        completed = False
+        try:
+            if DdrInfo.get_worker_process():
+                # Run the publication in a worker process so QGIS stays responsive
+                DdrWorker.run(process_type, ctl_file, feedback, stage)
+            else:
+                Utils.run_pipeline(process_type, ctl_file, feedback, stage)
+            completed = True
+        finally:
+            if stage != "build" or not completed:
+                # Write the timing report when the publication is done or failed
+                StageProfiler.write_report(ctl_file, feedback)
+
+    @staticmethod
+    def run_pipeline(process_type, ctl_file, feedback, stage=None):
+        """Run the publication pipeline: the build stage creates the zip file and the send stage sends it to the
+           DDR. Both stages are run when no stage is given. The pipeline does not use the QGIS project so it can
+           run in the worker process"""
+
+        if stage in (None, "build"):
+            Utils.build_package(process_type, ctl_file, feedback)
+        if stage in (None, "send"):
+            Utils.send_package(process_type, ctl_file, feedback)
+
+    @staticmethod
+    def build_package(process_type, ctl_file, feedback):
+        """Copy the project files, the layers and the download package and create the zip file"""
+
+        # Copy the download package file in temp repository
+        with StageProfiler.stage(ctl_file, "download_copy"):
+            Utils.copy_download_package_file(process_type, ctl_file, feedback)
+
+        # Manage the project file information
+        with StageProfiler.stage(ctl_file, "manage_service_web"):
+            Utils.manage_service_web(process_type, ctl_file, feedback)
+
+        # Creation of the JSON control file
+        with StageProfiler.stage(ctl_file, "control_file"):
+            Utils.create_json_control_file(ctl_file, feedback)
+
+        # Creation of the ZIP file
+        with StageProfiler.stage(ctl_file, "zip"):
+            Utils.create_zip_file(ctl_file, feedback)
+
+    @staticmethod
+    def send_package(process_type, ctl_file, feedback):
+        """Validate, publish, unpublish or update the zip file in the DDR"""
+
+        with StageProfiler.stage(ctl_file, "upload"):
+            # Validate the project file
+            if ctl_file.validate:
+                # The action is executed in validate mode
+                Utils.validate_project_file(ctl_file, process_type, None, None, feedback)
+            elif process_type == PUBLISH:
+                # Publish the project file
+                DdrPublishService.publish_project_file(ctl_file, None, None, feedback)
+            elif process_type == UNPUBLISH:
+                # Unpublish the project file
+                DdrUnpublishService.unpublish_project_file(ctl_file, None, None, feedback)
+            elif process_type == "UPDATE":
+                # Update the project file
+                DdrUpdateService.update_project_file(ctl_file, None, None, feedback)
+            else:
+                raise UserMessageException(f"Internal error. Unknown Process Type: {process_type}")
+
+        # Deleting the temporary directory and files
+        with StageProfiler.stage(ctl_file, "cleanup"):
+            Utils.delete_dir_file(ctl_file, feedback)
+
+    @staticmethod
+    def reflink_file(src_file_name, dst_file_name):
+        """Clone a file with a reflink (copy on write clone on XFS, Btrfs...). Return False when the file system
+           does not support the reflinks"""
+
+        if fcntl is None:
+            return False
+        try:
+            with open(src_file_name, "rb") as in_file, open(dst_file_name, "wb") as out_file:
+                fcntl.ioctl(out_file.fileno(), Utils.FICLONE, in_file.fileno())
+        except OSError:
+            # Reflinks not supported by the file system
+            if os.path.isfile(dst_file_name):
+                os.remove(dst_file_name)
+            return False
+
+        return True
+
+    @staticmethod
+    def stage_file(src_file_name, dst_file_name, link=False, feedback=None):
+        """Stage a file in the temporary directory with the cheapest method available: a hard link (only for the
+           files created by the plugin as the link shares the bytes with the original), a reflink or a chunked
+           copy reporting its progress. Return the method used"""
+
+        if link:
+            try:
+                os.link(src_file_name, dst_file_name)
+                return "hard link"
+            except OSError:
+                # Different file systems or links not supported
+                pass
+
+        if Utils.reflink_file(src_file_name, dst_file_name):
+            return "reflink"
+
+        file_size = os.path.getsize(src_file_name)
+        copied = 0
+        with open(src_file_name, "rb") as in_file, open(dst_file_name, "wb") as out_file:
+            for chunk in iter(lambda: in_file.read(Utils.COPY_CHUNK_SIZE), b""):
+                out_file.write(chunk)
+                copied += len(chunk)
+                if feedback is not None and file_size > 0:
+                    feedback.setProgress(int(copied * 100 / file_size))
+        shutil.copymode(src_file_name, dst_file_name)
+
+        return "copy"
+
     @staticmethod
     def copy_download_package_file(process_type, ctl_file, feedback):
         """Copy the download package file in the temp repository
@@ -742,9 +3819,23 @@ class Utils:
                 download_package_in = Path(ctl_file.download_package_file)
                 download_package_name = download_package_in.name
                 ctl_file.out_download_package_file =  os.path.join(ctl_file.control_file_dir, download_package_name)
-                shutil.copy(str(download_package_in), ctl_file.out_download_package_file)
-
-                Utils.push_info(feedback, f"INFO: Copying the download package {ctl_file.download_package_file} in the temp repository {ctl_file.control_file_dir}")
+                if Utils.is_zip_streamed(ctl_file):
+                    # A clone of the download package isolates the upload from an edit of the file of the user;
+                    # without reflinks the download package is streamed from its location (no copy)
+                    if not Utils.reflink_file(str(download_package_in), ctl_file.out_download_package_file):
+                        ctl_file.out_download_package_file = str(download_package_in.resolve())
+                    Utils.push_info(feedback, f"INFO: The download package {ctl_file.download_package_file} is "
+                                              f"streamed in the zip file")
+                    return
+                try:
+                    # The download package is never hard linked: an edit of the original would change the package
+                    method = Utils.stage_file(str(download_package_in), ctl_file.out_download_package_file,
+                                              feedback=feedback)
+                except OSError as e:
+                    raise UserMessageException(f"Unable to copy the download package: {str(e)}")
+
+                Utils.push_info(feedback, f"INFO: Copying the download package {ctl_file.download_package_file} in "
+                                          f"the temp repository {ctl_file.control_file_dir} ({method})")
             else:
                 # Put "-" as the file name when UNPUBLISH is selected
                 ctl_file.download_package_file = "-"
@@ -757,77 +3848,83 @@ class Utils:
 
     @staticmethod
     def set_layer_data_source(ctl_file, feedback):
+        """Write the project files in the temporary folder with the vector layers reading the GeoPackage file"""
+
+        gpkg_file = Path(ctl_file.gpkg_file_name).name
+        for (layers, qgs_file_name, out_qgs_file_name) in \
+                ((ctl_file.qgs_layers_en, ctl_file.qgs_project_file_en, ctl_file.out_qgs_project_file_en),
+                 (ctl_file.qgs_layers_fr, ctl_file.qgs_project_file_fr, ctl_file.out_qgs_project_file_fr)):
+            # Use the newly created GPKG file (relative path) to set the data source of the vector layers
+            layer_sources = {layer.layer_id: (f"./{gpkg_file}|layername={layer.short_name}", "ogr")
+                             for layer in layers if layer.layer_type == "vector"}
+            # Switch to the generalized copies of the heavy layers at small scales
+            layer_pyramids = {layer.layer_id: [(short_name, f"./{gpkg_file}|layername={short_name}", scale)
+                                               for (short_name, scale) in
+                                               (ctl_file.gpkg_pyramids or {})[layer.short_name]]
+                              for layer in layers if layer.short_name in (ctl_file.gpkg_pyramids or {})}
+            ProjectFileProcessor.rewrite(qgs_file_name, out_qgs_file_name, layer_sources, layer_pyramids)
+            Utils.push_info(feedback, "INFO: QGIS project file save as: ", out_qgs_file_name)
+
+    @staticmethod
+    def is_zip_streamed(ctl_file):
+        """Return True when the zip file is streamed in the upload. The zip file is written on disk when the
+           temporary files are kept (debug mode)"""
 
-        def _set_layer():
-
-            # Use the newly created GPKG file to set the data source of the QGIS project file
-            provider_options = QgsDataProvider.ProviderOptions()
-            provider_options.transformContext = qgs_project.transformContext()
-            # Loop over each layer
-            for i, src_layer in enumerate(qgs_project.mapLayers().values()):
-                if src_layer.type() == QgsMapLayer.VectorLayer:
-                    # Only process vector layer
-                    if src_layer.type() == QgsMapLayer.VectorLayer:
-
-                        qgs_layer_name = src_layer.name()
-                        gpkg_layer_name = DdrInfo.get_layer_short_name(src_layer)
-                        uri = QgsProviderRegistry.instance().encodeUri('ogr',
-                                                                       {'path': ctl_file.gpkg_file_name,
-                                                                        'layerName': gpkg_layer_name})
-                        src_layer.setDataSource(uri, qgs_layer_name, "ogr", provider_options)
-
-        qgs_project = QgsProject.instance()
-        _set_layer()
-        qgs_project.write(ctl_file.out_qgs_project_file_en)
-        qgs_project.clear()
-        if ctl_file.qgs_project_file_fr  != "":
-            qgs_project.read(ctl_file.out_qgs_project_file_fr)
-            _set_layer()
-            qgs_project.write(ctl_file.out_qgs_project_file_fr)
+        return DdrInfo.get_zip_streaming() and ctl_file.keep_files != "Yes"
 
     @staticmethod
     def create_zip_file(ctl_file, feedback):
         """Create the zip file in the working directory"""
 
-        # Change working directory to the temporary directory
-        current_dir = os.getcwd()  # Save current directory
-        os.chdir(ctl_file.control_file_dir)
-
-        # Create the zip file
-        lst_file_to_zip = [Path(ctl_file.control_file_name).name]
+        lst_file_to_zip = [ctl_file.control_file_name]
 
         #Append the needed files
         # When the file contains "-" it means that there is no file to copy
         if ctl_file.service_web:  # The service web is selected
             if ctl_file.out_qgs_project_file_en != "-":
-                lst_file_to_zip.append(Path(ctl_file.out_qgs_project_file_en).name)
+                lst_file_to_zip.append(ctl_file.out_qgs_project_file_en)
             if ctl_file.out_qgs_project_file_fr != "-":
-                lst_file_to_zip.append(Path(ctl_file.out_qgs_project_file_fr).name)
+                lst_file_to_zip.append(ctl_file.out_qgs_project_file_fr)
         if ctl_file.gpkg_layer_counter >= 1:
             # Add the GPKG file to the ZIP file if vector layers are present
-            lst_file_to_zip.append(Path(ctl_file.gpkg_file_name).name)
+            lst_file_to_zip.append(ctl_file.gpkg_file_name)
+        if ctl_file.layer_checksums_file is not None:
+            # Add the checksums of the layers so the DDR can compare the layers of the next update
+            lst_file_to_zip.append(ctl_file.layer_checksums_file)
         if ctl_file.service_download:  # The service download is selected
             if ctl_file.download_package_file != "-":
-                lst_file_to_zip.append(Path(ctl_file.download_package_file).name)
-            
-        ctl_file.zip_file_name = os.path.join(ctl_file.control_file_dir, "ddr_publish.zip")
-        Utils.push_info(feedback, f"INFO: Creating the zip file: {ctl_file.zip_file_name}")
-        with zipfile.ZipFile(ctl_file.zip_file_name, mode="w") as archive:
-            for file_to_zip in lst_file_to_zip:
-                archive.write(file_to_zip)
-
-        # Reset to the current directory
-        os.chdir(current_dir)
+                lst_file_to_zip.append(ctl_file.out_download_package_file)
 
-    @staticmethod
-    def restore_original_project_file(ctl_file, feedback):
-        """Restore the original project file"""
+        (compression, level) = DdrInfo.get_zip_compression()
+        if not ZipBuilder.is_available(compression):
+            Utils.push_info(feedback, "WARNING: The package zstandard is not installed ==> deflate compression")
+            compression = "deflate"
 
-        qgs_project = QgsProject.instance()
+        ctl_file.zip_file_name = os.path.join(ctl_file.control_file_dir, "ddr_publish.zip")
+        zip_streamed = Utils.is_zip_streamed(ctl_file)
+        if zip_streamed:
+            Utils.push_info(feedback, f"INFO: Preparing the zip file streamed in the upload: {ctl_file.zip_file_name}")
+        else:
+            Utils.push_info(feedback, f"INFO: Creating the zip file: {ctl_file.zip_file_name}")
+        zip_builder = ZipBuilder(ctl_file.control_file_dir, compression, level, DdrInfo.get_zip_workers())
+        try:
+            for file_to_zip in lst_file_to_zip:
+                zip_builder.add(file_to_zip, Path(file_to_zip).name)
+            zip_builder.compress()
+            if zip_streamed:
+                # The compressed members are kept until the upload is done
+                zip_builder.write_layout(ctl_file.zip_file_name)
+            else:
+                zip_builder.write(ctl_file.zip_file_name)
+                zip_builder.cleanup()
+        except OSError as e:
+            zip_builder.cleanup()
+            raise UserMessageException(f"Unable to create the zip file: {ctl_file.zip_file_name}: {str(e)}")
 
-        # Reopen the original project file
-        Utils.push_info(feedback, f"INFO: Restoring original project file (.qgs): {ctl_file.src_qgs_project_name}")
-        qgs_project.read(ctl_file.src_qgs_project_name)
+        file_size = sum(member.file_size for member in zip_builder.members)
+        zip_size = ZipBuilder.get_size(ctl_file.zip_file_name)
+        Utils.push_info(feedback, f"INFO: Zip file size: {zip_size / 1024 / 1024:.1f} MB (files: "
+                                  f"{file_size / 1024 / 1024:.1f} MB)")
 
     @staticmethod
     def delete_dir_file(ctl_file, feedback):
@@ -875,18 +3972,12 @@ class Utils:
         """
 
 #        import web_pdb; web_pdb.set_trace()
-        url = DdrInfo.get_http_environment()
-        url += "/validate"
+        url = DdrApiClient.get_url("/validate")
         headers = {'accept': 'application/json',
-                   'charset': 'utf-8',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)
-                }
+                   'charset': 'utf-8'}
         data = {
             'operation': process_type.lower()
         }
-        files = {
-            'zip_file': open(ctl_file.zip_file_name, 'rb')
-        }
 
         Utils.push_info(feedback, "INFO: Validating project")
         Utils.push_info(feedback, "INFO: HTTP Headers: ", headers)
@@ -894,7 +3985,10 @@ class Utils:
 
         try:
             Utils.push_info(feedback, "INFO: HTTP Post Request: ", url)
-            response = requests.post(url, files=files, verify=False, headers=headers, data=data)
+            with MultipartZipEncoder(ctl_file.zip_file_name, feedback, fields=data) as encoder:
+                headers['Content-Type'] = encoder.content_type
+                response = DdrApiClient.request("POST", url, feedback, data=encoder, headers=headers)
+            ctl_file.http_status = response.status_code
             ResponseCodes.validate_project_file(feedback, response)
 
         except requests.exceptions.RequestException as e:
@@ -953,12 +4047,12 @@ class ResponseCodes(object):
             Utils.push_info(feedback, "INFO: ", f"JSON Response: {str(response.text)}...")
 
             json_response = response.json()
-            # Store the access token in a global variable for access by other entry points
-            LoginToken.set_token(json_response["access_token"])
             expires_in = json_response["expires_in"]
             refresh_token = json_response["refresh_token"]
             refresh_expires_in = json_response["refresh_expires_in"]
             token_type = json_response["token_type"]
+            # Store the access token in a global variable for access by other entry points
+            LoginToken.set_token(json_response["access_token"], expires_in, refresh_token, refresh_expires_in)
             Utils.push_info(feedback, "INFO: ", f"Access token: {LoginToken.get_token(feedback)[0:29]}...")
             Utils.push_info(feedback, "INFO: ", f"Expire in: {expires_in}")
             Utils.push_info(feedback, "INFO: ", f"Refresh token: {refresh_token[0:29]}...")
@@ -967,11 +4061,34 @@ class ResponseCodes(object):
         elif status == 400:
             ResponseCodes._push_response(feedback, response, 400, "Bad request received on server.")
         elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Invalid credentials provided.")
+            ResponseCodes._push_response(feedback, response, 401, "Invalid credentials provided.")
+        else:
+            description = http.client.responses[status]
+            ResponseCodes._push_response(feedback, response, status, description)
+
+    @staticmethod
+    def refresh_access_token(feedback, response):
+        """This method manages the response codes for the DDR Publisher API Post /refresh
+        To get a new access token with the refresh token. Return True if the token is refreshed"""
+
+        status = response.status_code
+
+        if status == 200:
+            json_response = response.json()
+            LoginToken.set_token(json_response["access_token"], json_response["expires_in"],
+                                 json_response["refresh_token"], json_response["refresh_expires_in"])
+            Utils.push_info(feedback, "INFO: ", f"Access token refreshed; expire in: {json_response['expires_in']}")
+            return True
+        elif status == 400:
+            ResponseCodes._push_response(feedback, response, 400, "Bad request received on server.")
+        elif status == 401:
+            ResponseCodes._push_response(feedback, response, 401, "Invalid or expired refresh token.")
         else:
-            description = http.client.responses[status]
+            description = http.client.responses.get(status, "Unknown error")
             ResponseCodes._push_response(feedback, response, status, description)
 
+        return False
+
     @staticmethod
     def read_download_info(feedback, response):
         """This method manages the response codes for the DDR Publisher API Get /csz_themes
@@ -1007,7 +4124,7 @@ class ResponseCodes(object):
             msg = "Reading the available Clip Zip Ship Themes."
             Utils.push_info(feedback, f"INFO: {msg}")
             json_response = response.json()
-            DdrInfo.add_themes(json_response)
+            return json_response
         elif status == 401:
             ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
         elif status == 403:
@@ -1028,7 +4145,7 @@ class ResponseCodes(object):
             msg = "Reading the available DDR departments."
             Utils.push_info(feedback, f"INFO: {msg}")
             json_response = response.json()
-            DdrInfo.add_departments(json_response)
+            return json_response
         elif status == 401:
             ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
         elif status == 403:
@@ -1049,7 +4166,7 @@ class ResponseCodes(object):
             msg = "Reading the user email."
             Utils.push_info(feedback, f"INFO: {msg}")
             json_response = response.json()
-            DdrInfo.add_email(json_response)
+            return json_response
         elif status == 401:
             ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
         elif status == 403:
@@ -1070,7 +4187,7 @@ class ResponseCodes(object):
             msg = "The list of DDR Registry Downloads."
             Utils.push_info(feedback, f"INFO: {msg}")
             json_response = response.json()
-            DdrInfo.add_downloads(json_response)
+            return json_response
         elif status == 401:
             ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
         elif status == 403:
@@ -1091,7 +4208,7 @@ class ResponseCodes(object):
             msg = "The list of DDR Registry Servers."
             Utils.push_info(feedback, f"INFO: {msg}")
             json_response = response.json()
-            DdrInfo.add_servers(json_response)
+            return json_response
         elif status == 401:
             ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
         elif status == 403:
@@ -1157,6 +4274,93 @@ class ResponseCodes(object):
         else:
             ResponseCodes._push_response(feedback, response, status, "Unknown error")
 
+    @staticmethod
+    def compare_layer_checksums(feedback, response):
+        """This method manages the response codes for the DDR Publisher API POST /compare
+        Return the JSON response or None when the layers can't be compared"""
+
+        status = response.status_code
+
+        if status == 200:
+            try:
+                return response.json()
+            except ValueError:
+                Utils.push_info(feedback, "WARNING: The response of /compare is not a JSON document")
+        elif status in (404, 405):
+            Utils.push_info(feedback, "WARNING: The DDR does not support the comparison of the layers")
+        else:
+            description = http.client.responses.get(status, "Unknown error")
+            ResponseCodes._push_response(feedback, response, status, description)
+
+        return None
+
+    @staticmethod
+    def create_upload_session(feedback, response):
+        """This method manages the response codes for the DDR Publisher API POST /upload_sessions
+           Return the JSON response or None when the DDR does not support upload sessions"""
+
+        status = response.status_code
+
+        if status in (200, 201):
+            Utils.push_info(feedback, f"INFO: Status code: {status}")
+            return response.json()
+        elif status in (404, 405):
+            Utils.push_info(feedback, "WARNING: The DDR does not support upload sessions ==> Single upload")
+            return None
+        elif status == 401:
+            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
+        elif status == 403:
+            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
+        else:
+            description = http.client.responses.get(status, "Unknown error")
+            ResponseCodes._push_response(feedback, response, status, description)
+
+        raise UserMessageException("Unable to create the upload session")
+
+    @staticmethod
+    def read_upload_session(feedback, response):
+        """This method manages the response codes for the DDR Publisher API GET /upload_sessions/{session_id}
+           Return the JSON response or None when the upload session no longer exists"""
+
+        status = response.status_code
+
+        if status == 200:
+            Utils.push_info(feedback, f"INFO: Status code: {status}")
+            return response.json()
+        elif status == 404:
+            Utils.push_info(feedback, "WARNING: The upload session has expired ==> A new upload session is created")
+            return None
+        elif status == 401:
+            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
+        elif status == 403:
+            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
+        else:
+            description = http.client.responses.get(status, "Unknown error")
+            ResponseCodes._push_response(feedback, response, status, description)
+
+        raise UserMessageException("Unable to read the upload session")
+
+    @staticmethod
+    def upload_session_part(feedback, response, index):
+        """This method manages the response codes for the DDR Publisher API PUT /upload_sessions/{session_id}/parts
+           Return True if the part is received"""
+
+        status = response.status_code
+
+        if status in (200, 204):
+            return True
+        elif status == 409:
+            ResponseCodes._push_response(feedback, response, 409, f"Checksum mismatch for part {index}.")
+        elif status == 401:
+            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
+        elif status == 403:
+            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
+        else:
+            description = http.client.responses.get(status, "Unknown error")
+            ResponseCodes._push_response(feedback, response, status, description)
+
+        return False
+
 
 class UtilsGui():
     """Contains a list of static methods"""
@@ -1417,11 +4621,28 @@ class UtilsGui():
         parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
         self.addParameter(parameter)
 
+    @staticmethod
+    def add_profile(self):
+        """Add Timing report menu"""
+
+        parameter = QgsProcessingParameterEnum(
+            name='PROFILE',
+            description=self.tr('Write a timing report of the publication stages (for performance analysis)'),
+            options=StageProfiler.PROFILE_OPTIONS,
+            defaultValue=StageProfiler.PROFILE_OPTIONS[0],
+            usesStaticStrings=True,
+            optional=False,
+            allowMultiple=False)
+        parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(parameter)
+
     @staticmethod
     def add_environment(self):
         """Add Select environment menu"""
 
         DdrInfo.load_config_env_yaml()
+        # Fill the menus with the registries of the last login
+        RegistryCache.warm_up()
         parameter = QgsProcessingParameterEnum(
             name='ENVIRONMENT',
             description=self.tr('Select execution environment (should be production)'),
@@ -1443,10 +4664,11 @@ class UtilsGui():
         ctl_file.email = self.parameterAsString(parameters, 'EMAIL', context)
         ctl_file.qgs_server_id = self.parameterAsString(parameters, 'QGS_SERVER_ID', context)
         ctl_file.keep_files = self.parameterAsString(parameters, 'KEEP_FILES', context)
+        ctl_file.profile = self.parameterAsString(parameters, 'PROFILE', context)
         ctl_file.csz_collection_theme = self.parameterAsString(parameters, 'CSZ_THEMES', context)
         ctl_file.qgs_project_file_en = self.parameterAsString(parameters, 'QGIS_FILE_EN', context)
         ctl_file.qgs_project_file_fr = self.parameterAsString(parameters, 'QGIS_FILE_FR', context)
-        ctl_file.validate = self.parameterAsBool(parameters, 'VALIDATE', context)
+        ctl_file.validate = self.parameterAsBool(parameters, 'Validate', context)
         ctl_file.core_subject_term = self.parameterAsString(parameters, 'CORE_SUBJECT_TERM', context)
         ctl_file.download_package_file = self.parameterAsString(parameters, 'DOWNLOAD_PACKAGE', context)
         ctl_file.username = self.parameterAsString(parameters, 'USERNAME', context)
@@ -1468,6 +4690,36 @@ class UtilsGui():
         parameter.setHelp(message)
         self.addParameter(parameter)
 
+    @staticmethod
+    def add_upload_directory(self):
+        """Add Select the temporary directory of an interrupted upload"""
+
+        parameter = QgsProcessingParameterFile(
+            name='UPLOAD_DIRECTORY',
+            description=self.tr('Select the temporary directory of the interrupted upload'),
+            behavior=QgsProcessingParameterFile.Folder,
+            optional=False)
+        parameter.setHelp("The temporary directory is displayed in the log when the upload is suspended")
+        self.addParameter(parameter)
+
+    @staticmethod
+    def add_manifest(self):
+        """Add Select the manifest and the results file of a batch publication"""
+
+        parameter = QgsProcessingParameterFile(
+            name='MANIFEST',
+            description=self.tr('Select the manifest file (.csv or .json)'),
+            behavior=QgsProcessingParameterFile.File,
+            fileFilter='Manifest (*.csv *.json)',
+            optional=False)
+        parameter.setHelp("List of the services to publish, update or unpublish")
+        self.addParameter(parameter)
+
+        self.addParameter(QgsProcessingParameterFileDestination(
+            name='RESULTS',
+            description=self.tr('Results file'),
+            fileFilter='CSV (*.csv)'))
+
     @staticmethod
     def add_core_subject_term(self, message):
 
@@ -1487,56 +4739,13 @@ class UtilsGui():
 def dispatch_algorithm(self, process_type, parameters, context, feedback):
 
     # mport web_pdb; web_pdb.set_trace()
-    # Init the project files by resetting the layers structures
-    DdrInfo.init_project_file()
-
-    # Create the control file data structure
-    ctl_file = ControlFile()
-
-    # Extract the parameters
-    UtilsGui.read_parameters(self, ctl_file, parameters, context)
+    # Create the control file data structure from the parameters
+    ctl_file = Utils.create_control_file(self, parameters, context, feedback)
 
-    # Create temporary directory
-    ctl_file.control_file_dir = tempfile.mkdtemp(prefix='qgis_')
-    Utils.push_info(feedback, "INFO: Temporary directory created: ", ctl_file.control_file_dir)
+    # Run the publication pipeline
+    Utils.run_stage(process_type, ctl_file, feedback)
 
-    # Manage the project file information
-    Utils.manage_service_web(process_type, ctl_file, feedback)
-
-    # Copy the download package file in temp repository
-    Utils.copy_download_package_file(process_type, ctl_file, feedback)
-
-    # Creation of the JSON control file
-    Utils.create_json_control_file(ctl_file, feedback)
-
-    # Creation of the ZIP file
-    Utils.create_zip_file(ctl_file, feedback)
-
-    # Validate the project file
-    if ctl_file.validate:
-        # The action is executed in validate mode
-        Utils.validate_project_file(ctl_file, process_type, parameters, context, feedback)
-    elif process_type == PUBLISH:
-        # Publish the project file
-        DdrPublishService.publish_project_file(ctl_file, parameters, context, feedback)
-    elif process_type == UNPUBLISH:
-        # Unpublish the project file
-        DdrUnpublishService.unpublish_project_file(ctl_file, parameters, context, feedback)
-    elif process_type == "UPDATE":
-        # Update the project file
-        DdrUpdateService.update_project_file(ctl_file, parameters, context, feedback)
-    else:
-        raise UserMessageException(f"Internal error. Unknown Process Type: {process_type}")
-
-    if ctl_file.service_web:  # if web_service is selected
-        # Restoring original .qgs project file
-        Utils.restore_original_project_file(ctl_file, feedback)
-
-    # Deleting the temporary directory and files
-    # import web_pdb; web_pdb.set_trace()
-    Utils.delete_dir_file(ctl_file, feedback)
-
-    return
+    return ctl_file
 
 
 class DdrPublishService(QgsProcessingAlgorithm):
@@ -1574,10 +4783,11 @@ class DdrPublishService(QgsProcessingAlgorithm):
         return 'Management (second step)'
 
     def flags(self):
-        """Return the flags setting the NoThreading very important otherwise there are weird bugs...
+        """Return the flags. The publication runs in a background thread only when it runs in the worker process
         """
 
-        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading | QgsProcessingAlgorithm.FlagSupportsBatch | QgsProcessingAlgorithm.Available
+        return Utils.get_threading_flags(super().flags() | QgsProcessingAlgorithm.FlagSupportsBatch |
+                                         QgsProcessingAlgorithm.Available)
 
     def shortHelpString(self):
         """Returns a localised short help string for the algorithm.
@@ -1630,6 +4840,7 @@ class DdrPublishService(QgsProcessingAlgorithm):
         UtilsGui.add_email(self)
         UtilsGui.add_keep_files(self)
         UtilsGui.add_validate(self, action)
+        UtilsGui.add_profile(self)
 
         return
 
@@ -1688,11 +4899,8 @@ class DdrPublishService(QgsProcessingAlgorithm):
     def publish_project_file(ctl_file, parameters, context, feedback):
         """"""
 
-        url = DdrInfo.get_http_environment()
-        url += "/publish"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        url = DdrApiClient.get_url("/publish")
+        headers = {'accept': 'application/json'}
 
         Utils.push_info(feedback, f"INFO: Publishing to DDR")
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
@@ -1700,7 +4908,15 @@ class DdrPublishService(QgsProcessingAlgorithm):
         Utils.push_info(feedback, f"INFO: Zip file to publish: {ctl_file.zip_file_name}")
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
         try:
-            response = requests.put(url, files=files, verify=False, headers=headers)
+            response = None
+            if UploadSession.is_needed(ctl_file):
+                # Big zip files are sent in parts with a resumable upload session
+                response = UploadSession(ctl_file, PUBLISH, feedback).upload()
+            if response is None:
+                with MultipartZipEncoder(ctl_file.zip_file_name, feedback) as encoder:
+                    headers['Content-Type'] = encoder.content_type
+                    response = DdrApiClient.request("PUT", url, feedback, data=encoder, headers=headers)
+            ctl_file.http_status = response.status_code
             ResponseCodes.publish_project_file(feedback, response)
 
         except requests.exceptions.RequestException as e:
@@ -1756,10 +4972,11 @@ class DdrUpdateService(QgsProcessingAlgorithm):
         return 'Management (second step)'
 
     def flags(self):
-        """Return the flags setting the NoThreading very important otherwise there are weird bugs...
+        """Return the flags. The publication runs in a background thread only when it runs in the worker process
         """
 
-        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading | QgsProcessingAlgorithm.FlagSupportsBatch | QgsProcessingAlgorithm.Available
+        return Utils.get_threading_flags(super().flags() | QgsProcessingAlgorithm.FlagSupportsBatch |
+                                         QgsProcessingAlgorithm.Available)
 
     def shortHelpString(self):
         """Returns a localised short help string for the algorithm.
@@ -1809,6 +5026,7 @@ class DdrUpdateService(QgsProcessingAlgorithm):
         UtilsGui.add_email(self)
         UtilsGui.add_keep_files(self)
         UtilsGui.add_validate(self, action)
+        UtilsGui.add_profile(self)
 
     def checkParameterValues(self, parameters, context):
         """Check if the selection of the input parameters is valid"""
@@ -1859,11 +5077,8 @@ class DdrUpdateService(QgsProcessingAlgorithm):
     def update_project_file(ctl_file, parameters, context, feedback):
         """"""
 
-        url = DdrInfo.get_http_environment()
-        url += "/update"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        url = DdrApiClient.get_url("/update")
+        headers = {'accept': 'application/json'}
 
         Utils.push_info(feedback, f"INFO: Pushing updates to DDR")
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
@@ -1871,7 +5086,15 @@ class DdrUpdateService(QgsProcessingAlgorithm):
         Utils.push_info(feedback, f"INFO: Zip file to update: {ctl_file.zip_file_name}")
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
         try:
-            response = requests.patch(url, files=files, verify=False, headers=headers)
+            response = None
+            if UploadSession.is_needed(ctl_file):
+                # Big zip files are sent in parts with a resumable upload session
+                response = UploadSession(ctl_file, UPDATE, feedback).upload()
+            if response is None:
+                with MultipartZipEncoder(ctl_file.zip_file_name, feedback) as encoder:
+                    headers['Content-Type'] = encoder.content_type
+                    response = DdrApiClient.request("PATCH", url, feedback, data=encoder, headers=headers)
+            ctl_file.http_status = response.status_code
             ResponseCodes.update_project_file(feedback, response)
 
         except requests.exceptions.RequestException as e:
@@ -1927,10 +5150,11 @@ class DdrUnpublishService(QgsProcessingAlgorithm):
         return 'Management (second step)'
 
     def flags(self):
-        """Return the flags setting the NoThreading very important otherwise there are weird bugs...
+        """Return the flags. The publication runs in a background thread only when it runs in the worker process
         """
 
-        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading | QgsProcessingAlgorithm.FlagSupportsBatch | QgsProcessingAlgorithm.Available
+        return Utils.get_threading_flags(super().flags() | QgsProcessingAlgorithm.FlagSupportsBatch |
+                                         QgsProcessingAlgorithm.Available)
 
     def shortHelpString(self):
         """Returns a localised short help string for the algorithm.
@@ -1969,23 +5193,24 @@ class DdrUnpublishService(QgsProcessingAlgorithm):
         UtilsGui.add_email(self)
         UtilsGui.add_keep_files(self)
         UtilsGui.add_validate(self, action)
+        UtilsGui.add_profile(self)
 
     @staticmethod
     def unpublish_project_file(ctl_file, parameters, context, feedback):
         """Unpublish a QGIS project file """
 
-        url = DdrInfo.get_http_environment()
-        url += "/unpublish"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LoginToken.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        url = DdrApiClient.get_url("/unpublish")
+        headers = {'accept': 'application/json'}
         Utils.push_info(feedback, f"INFO: Unpublishing data from the DDR")
         Utils.push_info(feedback, f"INFO: HTTP Delete Request: {url}")
         Utils.push_info(feedback, f"INFO: HTTP Headers: {str(headers)}")
         Utils.push_info(feedback, f"INFO: Zip file sent to unpublish process: {ctl_file.zip_file_name}")
 
         try:
-            response = requests.delete(url, files=files, verify=False, headers=headers)
+            with MultipartZipEncoder(ctl_file.zip_file_name, feedback) as encoder:
+                headers['Content-Type'] = encoder.content_type
+                response = DdrApiClient.request("DELETE", url, feedback, data=encoder, headers=headers)
+            ctl_file.http_status = response.status_code
             ResponseCodes.unpublish_project_file(feedback, response)
 
         except requests.exceptions.RequestException as e:
@@ -2023,6 +5248,322 @@ class DdrUnpublishService(QgsProcessingAlgorithm):
         return {}
 
 
+class DdrResumeUpload(QgsProcessingAlgorithm):
+    """Main class defining how to resume an interrupted upload session.
+    """
+
+    def tr(self, string):  # pylint: disable=no-self-use
+        """Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):  # pylint: disable=no-self-use
+        """Returns a new copy of the algorithm.
+        """
+        return DdrResumeUpload()
+
+    def name(self):  # pylint: disable=no-self-use
+        """Returns the unique algorithm name.
+        """
+        return 'resume_upload'
+
+    def displayName(self):  # pylint: disable=no-self-use
+        """Returns the translated algorithm name.
+        """
+        return self.tr('Resume an interrupted upload')
+
+    def group(self):
+        """Returns the name of the group this algorithm belongs to.
+        """
+        return self.tr(self.groupId())
+
+    def groupId(self):  # pylint: disable=no-self-use
+        """Returns the unique ID of the group this algorithm belongs to.
+        """
+        return 'Management (second step)'
+
+    def flags(self):
+        """Return the flags. The resume only reads the zip file and sends HTTP requests (no layer nor project is
+        used) so it runs in a background thread and QGIS stays responsive
+        """
+
+        return super().flags() | QgsProcessingAlgorithm.Available
+
+    def shortHelpString(self):
+        """Returns a localised short help string for the algorithm.
+        """
+        help_str = """
+    The processing tool <i>Resume an interrupted upload</i> allows to resume the upload of a large publish or \
+    update package that was interrupted. Only the parts not yet received by the DDR are sent. The temporary \
+    directory to select is displayed in the log when the upload is suspended. The zip file is written in the \
+    temporary directory when the upload is suspended; if it can't be written (see the log), the download package \
+    must stay unchanged at the same location until the upload is resumed."""
+
+        help_str += UtilsGui.HELP_USAGE
+
+        return self.tr(help_str)
+
+    def icon(self):  # pylint: disable=no-self-use
+        """Define the logo of the algorithm.
+        """
+
+        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
+        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
+        return icon
+
+    def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
+        """Define the inputs and outputs of the algorithm.
+        """
+
+        UtilsGui.add_upload_directory(self)
+        UtilsGui.add_keep_files(self)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        """Main method that extract parameters and resume the upload session.
+        """
+
+        try:
+            ctl_file = ControlFile()
+            ctl_file.control_file_dir = self.parameterAsString(parameters, 'UPLOAD_DIRECTORY', context)
+            ctl_file.keep_files = self.parameterAsString(parameters, 'KEEP_FILES', context)
+            ctl_file.zip_file_name = os.path.join(ctl_file.control_file_dir, "ddr_publish.zip")
+            process_type = UploadSession.read_process_type(ctl_file.control_file_dir)
+
+            try:
+                response = UploadSession(ctl_file, process_type, feedback).upload()
+            except requests.exceptions.RequestException:
+                raise UserMessageException(f"Major problem with the DDR Publication API: "
+                                           f"{DdrInfo.get_http_environment()}")
+            if response is None:
+                raise UserMessageException("The DDR does not support upload sessions")
+
+            ctl_file.http_status = response.status_code
+            if process_type == PUBLISH:
+                ResponseCodes.publish_project_file(feedback, response)
+            else:
+                ResponseCodes.update_project_file(feedback, response)
+
+            # Deleting the temporary directory and files
+            Utils.delete_dir_file(ctl_file, feedback)
+
+        except UserMessageException as e:
+            Utils.push_info(feedback, f"ERROR: Resume upload process")
+            Utils.push_info(feedback, f"ERROR: {str(e)}")
+
+        return {}
+
+
+class DdrPublishManifest(QgsProcessingAlgorithm):
+    """Main class defining how to publish, update or unpublish a list of services described in a manifest.
+    """
+
+    def tr(self, string):  # pylint: disable=no-self-use
+        """Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):  # pylint: disable=no-self-use
+        """Returns a new copy of the algorithm.
+        """
+        return DdrPublishManifest()
+
+    def name(self):  # pylint: disable=no-self-use
+        """Returns the unique algorithm name.
+        """
+        return 'publish_manifest'
+
+    def displayName(self):  # pylint: disable=no-self-use
+        """Returns the translated algorithm name.
+        """
+        return self.tr('Publish a list of services (manifest)')
+
+    def group(self):
+        """Returns the name of the group this algorithm belongs to.
+        """
+        return self.tr(self.groupId())
+
+    def groupId(self):  # pylint: disable=no-self-use
+        """Returns the unique ID of the group this algorithm belongs to.
+        """
+        return 'Management (second step)'
+
+    def flags(self):
+        """Return the flags. The publications run in a background thread only when they run in the worker process
+        """
+
+        return Utils.get_threading_flags(super().flags())
+
+    def shortHelpString(self):
+        """Returns a localised short help string for the algorithm.
+        """
+        help_str = """This processing plugin logs into the DDR once and publishes, updates or unpublishes each \
+        service listed in a manifest file. The manifest is a CSV file (one service per row) or a JSON file (list of \
+        services) with the following columns: action (publish, update or unpublish), metadata_uuid, department, \
+        service_web, service_download, qgis_file_en, qgis_file_fr, qgs_server_id, csz_theme, download_package, \
+        core_subject_term, download_info_id and email (optional). The file paths are relative to the manifest. \
+        The outcome of each service is written in the results file (CSV) as soon as the service is processed. \
+        The jobs of the batch are kept in the QGIS profile (jobs.sqlite); the advanced parameter RESUME runs again \
+        the items of the last batch of the manifest that are not published (interrupted, failed or canceled).
+        The algorithm can be run from the command line:
+        qgis_process run pub_ddr_processing:publish_manifest -- USERNAME=... PASSWORD=... ENVIRONMENT=Production \
+        MANIFEST=manifest.csv RESULTS=results.csv
+        """
+
+        help_str = help_str + UtilsGui.HELP_USAGE
+
+        return self.tr(help_str)
+
+    def icon(self):  # pylint: disable=no-self-use
+        """Define the logo of the algorithm.
+        """
+
+        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
+        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
+        return icon
+
+    def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
+        """Define the inputs and outputs of the algorithm.
+        """
+
+        UtilsGui.add_username_password(self)
+        UtilsGui.add_environment(self)
+        UtilsGui.add_manifest(self)
+
+        # Advanced parameters
+        parameter = QgsProcessingParameterString(
+            name="EMAIL",
+            optional=True,
+            defaultValue="",
+            description=self.tr('Enter your email address (when not in the manifest)'))
+        parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(parameter)
+        UtilsGui.add_keep_files(self)
+        UtilsGui.add_validate(self, "manifest")
+        UtilsGui.add_profile(self)
+        parameter = QgsProcessingParameterBoolean(
+            name="RESUME",
+            description=self.tr('Resume the unfinished items of the last batch of this manifest'),
+            defaultValue=False)
+        parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(parameter)
+        for (name, description, default) in (
+                ('BUILD_JOBS', 'Number of packages built at the same time', 2),
+                ('UPLOAD_JOBS', 'Number of packages sent at the same time', 2)):
+            parameter = QgsProcessingParameterNumber(
+                name=name,
+                description=self.tr(description),
+                type=QgsProcessingParameterNumber.Integer,
+                defaultValue=DdrInfo.get_scheduler_option(name.title(), default),
+                minValue=1)
+            parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+            self.addParameter(parameter)
+
+    def login(self, parameters, context, feedback):
+        """Log into the DDR once for all the items of the manifest"""
+
+        ctl_file = ControlFile()
+        ctl_file.username = self.parameterAsString(parameters, 'USERNAME', context)
+        password = self.parameterAsString(parameters, 'PASSWORD', context)
+        environment = self.parameterAsString(parameters, 'ENVIRONMENT', context)
+        Utils.push_info(feedback, f"INFO: Execution environment: {environment}")
+        DdrInfo.add_environment(environment)
+
+        # Create the access tokens needed for the API call
+        Utils.create_access_tokens(ctl_file.username, password, ctl_file, feedback)
+
+        # Read the DDR registries concurrently
+        Utils.read_ddr_registries(ctl_file, feedback)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        """Main method that extract parameters and process the items of the manifest with the job scheduler.
+        """
+
+        results_file = self.parameterAsFileOutput(parameters, 'RESULTS', context)
+        try:
+            manifest_file = self.parameterAsString(parameters, 'MANIFEST', context)
+            job_queue = JobQueue()
+            # The batches of a manifest are identified by the path of the manifest and their start time
+            batch_prefix = f"{os.path.abspath(manifest_file)}|"
+            if self.parameterAsBool(parameters, 'RESUME', context):
+                # Run again the unfinished jobs of the last batch with the parameters they were queued with
+                batch = job_queue.get_last_batch(batch_prefix)
+                if batch is None:
+                    raise UserMessageException(f"No batch to resume for the manifest: {manifest_file}")
+                self.login(parameters, context, feedback)
+                queued_jobs = job_queue.requeue_jobs(batch)
+                Utils.push_info(feedback, f"INFO: Resuming the batch: {batch} ({len(queued_jobs)} items)")
+            else:
+                items = BatchManifest.read(manifest_file)
+                Utils.push_info(feedback, f"INFO: Number of items in the manifest: {len(items)}")
+
+                self.login(parameters, context, feedback)
+
+                email = self.parameterAsString(parameters, 'EMAIL', context)
+                if email == "":
+                    email = DdrInfo.get_email()
+                keep_files = self.parameterAsString(parameters, 'KEEP_FILES', context)
+                validate = self.parameterAsBool(parameters, 'Validate', context)
+                profile = self.parameterAsString(parameters, 'PROFILE', context)
+
+                # Queue the items of the manifest in the job queue
+                batch = f"{batch_prefix}{datetime.now().isoformat(timespec='seconds')}"
+                job_queue.add_jobs(batch, [(index, item["action"], item["metadata_uuid"],
+                                            BatchManifest.get_parameters(item, email, keep_files, validate, profile))
+                                           for (index, item) in enumerate(items, start=1)])
+                queued_jobs = job_queue.get_jobs(batch)
+            Utils.push_info(feedback, f"INFO: Jobs queued in: {job_queue.file_name} (batch: {batch})")
+
+            with open(results_file, "w", encoding="utf-8", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=BatchManifest.RESULT_COLUMNS)
+                writer.writeheader()
+                lock = threading.Lock()
+                nbr_done = [0]
+
+                def _write_result(job):
+                    # The result is written immediately so an interrupted batch keeps the results already done
+                    with lock:
+                        nbr_done[0] += 1
+                        feedback.setProgress(int(nbr_done[0] * 100 / len(queued_jobs)))
+                        duration = (datetime.fromisoformat(job["updated_at"]) -
+                                    datetime.fromisoformat(job["created_at"])).total_seconds()
+                        writer.writerow({"item": job["item"], "action": job["action"],
+                                         "metadata_uuid": job["metadata_uuid"], "status": job["status"],
+                                         "http_status": job["http_status"] or "", "message": job["message"] or "",
+                                         "duration": f"{duration:.1f}"})
+                        file.flush()
+
+                # Validate the parameters of each item before scheduling it
+                jobs = []
+                for job in queued_jobs:
+                    process_type = BatchManifest.ACTIONS[job["action"]]
+                    algorithm_class = {PUBLISH: DdrPublishService, UPDATE: DdrUpdateService,
+                                       UNPUBLISH: DdrUnpublishService}[process_type]
+                    (valid, message) = algorithm_class().create().checkParameterValues(json.loads(job["parameters"]),
+                                                                                       context)
+                    if valid:
+                        jobs.append((job["job_id"], algorithm_class, process_type))
+                    else:
+                        job_queue.update(job["job_id"], status=JobQueue.FAILED, message=message.replace("\n", " "))
+                        _write_result(job_queue.get_job(job["job_id"]))
+
+                build_jobs = self.parameterAsInt(parameters, 'BUILD_JOBS', context)
+                upload_jobs = self.parameterAsInt(parameters, 'UPLOAD_JOBS', context)
+                JobScheduler(job_queue, feedback, build_jobs, upload_jobs).run(jobs, _write_result)
+
+            if feedback.isCanceled():
+                Utils.push_info(feedback, "WARNING: The batch publication is canceled ==> Run again with RESUME "
+                                          "to publish the unfinished items")
+            nbr_failed = len(job_queue.get_jobs(batch)) - len(job_queue.get_jobs(batch, JobQueue.SUCCESS))
+            Utils.push_info(feedback, f"INFO: Number of items not published: {nbr_failed}")
+            Utils.push_info(feedback, "INFO: Results file: ", results_file)
+
+        except UserMessageException as e:
+            Utils.push_info(feedback, f"ERROR: Manifest process")
+            Utils.push_info(feedback, f"ERROR: {str(e)}")
+
+        return {'RESULTS': results_file}
+
+
 class DdrLogin(QgsProcessingAlgorithm):
     """Main class defining the DDR Login algorithm as a QGIS processing algorithm.
     """
@@ -2129,16 +5670,13 @@ class DdrLogin(QgsProcessingAlgorithm):
             # Create the control file data structure
             ctl_file = ControlFile()
             (username, password) = self.read_parameters(ctl_file, parameters, context, feedback)
+            ctl_file.username = username
 
             # Create the access tokens needed for the API call
             Utils.create_access_tokens(username, password, ctl_file, feedback)
 
-            Utils.read_csz_themes(ctl_file, feedback)
-            Utils.read_ddr_departments(ctl_file, feedback)
-            Utils.read_user_email(ctl_file, feedback)
-#            import web_pdb; web_pdb.set_trace()
-            Utils.read_downloads(ctl_file, feedback)
-            Utils.read_servers(ctl_file, feedback)
+            # Read the DDR registries concurrently
+            Utils.read_ddr_registries(ctl_file, feedback)
 
         except UserMessageException as e:
             Utils.push_info(feedback, f"ERROR: Login process")
@@ -2259,16 +5797,13 @@ class DdrLoginBatch(QgsProcessingAlgorithm):
             # Create the control file data structure
             ctl_file = ControlFile()
             (username, password) = self.read_parameters(ctl_file, parameters, context, feedback)
+            ctl_file.username = username
 
             # Create the access tokens needed for the API call
             Utils.create_access_tokens(username, password, ctl_file, feedback)
 
-            Utils.read_csz_themes(ctl_file, feedback)
-            Utils.read_ddr_departments(ctl_file, feedback)
-            Utils.read_user_email(ctl_file, feedback)
-#            import web_pdb; web_pdb.set_trace()
-            Utils.read_downloads(ctl_file, feedback)
-            Utils.read_servers(ctl_file, feedback)
+            # Read the DDR registries concurrently
+            Utils.read_ddr_registries(ctl_file, feedback)
 
         except UserMessageException as e:
             Utils.push_info(feedback, f"ERROR: Login process")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=import-outside-toplevel
+
+# /***************************************************************************
+# ddr_worker.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Headless worker process running the publication pipeline of the DDR plugin (started by DdrWorker)
+"""
+
+import json
+import os
+import sys
+import threading
+import traceback
+from dataclasses import asdict
+from qgis.core import QgsApplication
+
+
+class WorkerFeedback(object):
+    """This class sends the log lines and the progress to the QGIS process as JSON lines and receives the cancel
+       request"""
+
+    def __init__(self, out_stream):
+        self._out_stream = out_stream
+        self._lock = threading.Lock()
+        self._canceled = False
+
+    def send(self, message):
+        """Send one message to the QGIS process"""
+
+        with self._lock:
+            self._out_stream.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self._out_stream.flush()
+
+    def pushInfo(self, info):  # pylint: disable=invalid-name
+        """Send a log line"""
+
+        self.send({"type": "info", "message": info})
+
+    def setProgress(self, progress):  # pylint: disable=invalid-name
+        """Send the progress (percent)"""
+
+        self.send({"type": "progress", "value": progress})
+
+    def isCanceled(self):  # pylint: disable=invalid-name
+        """Return True when the QGIS process asked to cancel the publication"""
+
+        return self._canceled
+
+    def listen(self, in_stream):
+        """Wait for the cancel request of the QGIS process"""
+
+        for line in in_stream:
+            try:
+                if json.loads(line).get("type") == "cancel":
+                    self._canceled = True
+            except ValueError:
+                pass
+
+
+def main():
+    """Read the job, run the publication pipeline and send back the result"""
+
+    # The standard output is reserved to the messages; anything else printed goes to the standard error
+    out_stream = sys.stdout
+    sys.stdout = sys.stderr
+    feedback = WorkerFeedback(out_stream)
+
+    job = json.loads(sys.stdin.readline())
+    threading.Thread(target=feedback.listen, args=(sys.stdin,), daemon=True).start()
+
+    # Start a headless QGIS application sharing the profile directory of the QGIS desktop
+    QgsApplication.setPrefixPath(job["prefix_path"], True)
+    qgs_app = QgsApplication([], False, job["settings_dir"])
+    qgs_app.initQgis()
+    sys.path.append(os.path.join(QgsApplication.pkgDataPath(), "python", "plugins"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from ddr_algorithm import ControlFile, DdrInfo, LoginToken, UserMessageException, Utils
+
+    ctl_file = ControlFile(**job["ctl_file"])
+    error = None
+    try:
+        DdrInfo.load_config_env_yaml()
+        DdrInfo.add_environment(job["environment"])
+        DdrInfo.add_registries(*job["registries"])
+        DdrInfo.init_project_file()
+        LoginToken.set_state(job["token"])
+        Utils.run_pipeline(job["process_type"], ctl_file, feedback, job["stage"])
+    except UserMessageException as e:
+        error = str(e)
+    except Exception:  # pylint: disable=broad-except
+        error = traceback.format_exc()
+
+    ctl_file.qgs_layers_en = None
+    ctl_file.qgs_layers_fr = None
+    feedback.send({"type": "result", "ctl_file": asdict(ctl_file), "token": LoginToken.get_state(), "error": error})
+
+    qgs_app.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
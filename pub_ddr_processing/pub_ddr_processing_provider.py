@@ -27,7 +27,7 @@ __revision__ = '$Format:%H$'
 from qgis.core import QgsProcessingProvider
 #from .ddr_algorithm import DdrPublishService, DdrValidateService, DdrUpdateService, DdrUnpublishService, DdrLogin
 from .ddr_algorithm import DdrPublishService, DdrUpdateService, DdrUnpublishService, DdrLogin, DdrLoginBatch, \
-                           DdrExistingCtlFile
+                           DdrExistingCtlFile, DdrResumeUpload, DdrPublishManifest
 import os
 
 import inspect
@@ -58,6 +58,8 @@ class PubDdrProvider(QgsProcessingProvider):
         self.addAlgorithm(DdrPublishService())
         self.addAlgorithm(DdrUpdateService())
         self.addAlgorithm(DdrUnpublishService())
+        self.addAlgorithm(DdrResumeUpload())
+        self.addAlgorithm(DdrPublishManifest())
 #        self.addAlgorithm(DdrExistingCtlFile())
 
         # add additional algorithms here
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# conftest.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Fixtures of the unit tests.  The tests are run with the Python interpreter of QGIS (python-qgis on OSGeo4W):
+    python -m pytest test
+Without QGIS (ex.: continuous integration) the modules of QGIS, GDAL and requests are replaced by stubs: the tests
+of the pure Python code are run and the tests marked "qgis" (they need the data providers of QGIS) are skipped
+"""
+
+import importlib.util
+import os
+import sys
+import types
+import pytest
+
+# The module of the algorithms is imported as a top-level module like in the worker process (ddr_worker.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pub_ddr_processing"))
+
+QGIS_AVAILABLE = importlib.util.find_spec("qgis") is not None
+
+
+class _StubType(type):
+    """Metaclass of the stub classes: any class attribute (ex.: Qgis.Info) is another stub class"""
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _StubType(name, (_Stub,), {})
+
+
+class _Stub(metaclass=_StubType):
+    """Stub of a class of QGIS or GDAL: it can be subclassed and instantiated and its methods return None"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+class _StubModule(types.ModuleType):
+    """Stub of a module: any of its attributes is a stub class"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _StubType(name, (_Stub,), {})
+
+
+def _install_stubs():
+    """Install the stubs of the modules that are only available in the Python interpreter of QGIS"""
+
+    for name in ("qgis", "qgis.core", "qgis.PyQt", "qgis.PyQt.QtCore", "qgis.PyQt.QtGui", "qgis.processing",
+                 "osgeo", "osgeo.gdal", "osgeo.ogr"):
+        sys.modules[name] = _StubModule(name)
+    sys.modules["qgis"].processing = sys.modules["qgis.processing"]
+    if importlib.util.find_spec("requests") is None:
+        requests = _StubModule("requests")
+        requests.exceptions = types.SimpleNamespace(RequestException=type("RequestException", (IOError,), {}))
+        sys.modules["requests"] = requests
+        sys.modules["requests.adapters"] = _StubModule("requests.adapters")
+
+
+if not QGIS_AVAILABLE:
+    _install_stubs()
+
+import ddr_algorithm  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "qgis: the test needs the data providers of QGIS")
+
+
+def pytest_collection_modifyitems(config, items):  # pylint: disable=unused-argument
+    if not QGIS_AVAILABLE:
+        skip_qgis = pytest.mark.skip(reason="QGIS is not available (the modules of QGIS are stubs)")
+        for item in items:
+            if "qgis" in item.keywords:
+                item.add_marker(skip_qgis)
+
+
+class Feedback(object):
+    """Feedback of a processing algorithm keeping the log lines and the progress"""
+
+    def __init__(self):
+        self.infos = []
+        self.progress = []
+        self.canceled = False
+
+    def pushInfo(self, info):  # pylint: disable=invalid-name
+        self.infos.append(info)
+
+    def setProgress(self, progress):  # pylint: disable=invalid-name
+        self.progress.append(progress)
+
+    def isCanceled(self):  # pylint: disable=invalid-name
+        return self.canceled
+
+
+@pytest.fixture
+def feedback():
+    """Return a new feedback"""
+
+    return Feedback()
+
+
+@pytest.fixture(scope="session")
+def qgis_application():
+    """Start QGIS once with its data providers"""
+
+    from qgis.core import QgsApplication  # pylint: disable=import-outside-toplevel
+
+    application = QgsApplication([], False)
+    application.initQgis()
+    yield application
+    application.exitQgis()
+
+
+@pytest.fixture(autouse=True)
+def qgis_providers(request):
+    """Start QGIS before the tests that need its data providers (marker "qgis")"""
+
+    if request.node.get_closest_marker("qgis") is not None:
+        request.getfixturevalue("qgis_application")
+
+
+@pytest.fixture(autouse=True)
+def config_env():
+    """Load the default configuration (config_env.yaml) before each test"""
+
+    ddr_algorithm.DdrInfo.load_config_env_yaml()
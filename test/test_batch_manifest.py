@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# test_batch_manifest.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Unit tests of the manifest of a batch publication (BatchManifest)
+"""
+
+import json
+import os
+import pytest
+import ddr_algorithm
+
+BatchManifest = ddr_algorithm.BatchManifest
+UserMessageException = ddr_algorithm.UserMessageException
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model")
+
+
+def test_read_sample_manifest():
+    items = BatchManifest.read(os.path.join(MODEL_DIR, "manifest_sample.csv"))
+
+    assert [item["action"] for item in items] == ["publish", "publish", "unpublish"]
+    assert items[0]["qgis_file_en"] == os.path.join(MODEL_DIR, "test5_en.qgs")
+    assert (items[0]["service_web"], items[0]["service_download"]) == (True, False)
+    assert (items[1]["service_web"], items[1]["service_download"]) == (False, True)
+    assert items[1]["download_package"] == os.path.join(MODEL_DIR, "radarsat_constellation_mission_plan.zip")
+    assert items[2]["qgis_file_en"] == ""
+    assert set(items[0]) == set(BatchManifest.COLUMNS)
+
+
+def test_read_csv_with_bom_and_loose_columns(tmp_path):
+    manifest_file = tmp_path / "manifest.csv"
+    manifest_file.write_text(" Action ,METADATA_UUID,Department,Service_Web,qgis_file_en\n"
+                             "Publish ,uuid-1,nrcan,oui,projects/project_en.qgs\n", encoding="utf-8-sig")
+
+    (item,) = BatchManifest.read(str(manifest_file))
+    assert item["action"] == "publish"
+    assert item["metadata_uuid"] == "uuid-1"
+    assert item["service_web"] is True
+    assert item["qgis_file_en"] == str(tmp_path / "projects" / "project_en.qgs")
+    # The missing columns are empty
+    assert item["csz_theme"] == "" and item["email"] == ""
+
+
+def test_services_deduced_from_the_files(tmp_path):
+    manifest_file = tmp_path / "manifest.csv"
+    manifest_file.write_text("action,metadata_uuid,qgis_file_fr,download_package\n"
+                             "update,uuid-1,project_fr.qgs,\n"
+                             "update,uuid-2,,package.zip\n", encoding="utf-8")
+
+    items = BatchManifest.read(str(manifest_file))
+    assert [(item["service_web"], item["service_download"]) for item in items] == [(True, False), (False, True)]
+
+
+@pytest.mark.parametrize("content", [
+    [{"action": "publish", "metadata_uuid": "uuid-1", "service_web": True, "qgis_file_en": "a_en.qgs"}],
+    {"items": [{"action": "publish", "metadata_uuid": "uuid-1", "service_web": "Yes", "qgis_file_en": "a_en.qgs"}]}])
+def test_read_json(tmp_path, content):
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(content), encoding="utf-8")
+
+    (item,) = BatchManifest.read(str(manifest_file))
+    assert item["service_web"] is True
+    assert item["service_download"] is False
+    assert item["qgis_file_en"] == str(tmp_path / "a_en.qgs")
+
+
+def test_unknown_action(tmp_path):
+    manifest_file = tmp_path / "manifest.csv"
+    manifest_file.write_text("action,metadata_uuid\ndelete,uuid-1\n", encoding="utf-8")
+
+    with pytest.raises(UserMessageException, match="Unknown action 'delete'"):
+        BatchManifest.read(str(manifest_file))
+
+
+@pytest.mark.parametrize("file_name,content", [("manifest.csv", "action,metadata_uuid\n"),
+                                               ("manifest.json", "[]"),
+                                               ("manifest.json", "{not json")])
+def test_invalid_manifest(tmp_path, file_name, content):
+    manifest_file = tmp_path / file_name
+    manifest_file.write_text(content, encoding="utf-8")
+
+    with pytest.raises(UserMessageException):
+        BatchManifest.read(str(manifest_file))
+
+
+def test_missing_manifest(tmp_path):
+    with pytest.raises(UserMessageException, match="Unable to read the manifest file"):
+        BatchManifest.read(str(tmp_path / "missing.csv"))
+
+
+def test_get_parameters():
+    (item,) = [item for item in BatchManifest.read(os.path.join(MODEL_DIR, "manifest_sample.csv"))
+               if item["action"] == "unpublish"]
+
+    parameters = BatchManifest.get_parameters(item, "user@canada.ca", False, True, None)
+    assert parameters["METADATA_UUID"] == "3f2c1b0a-9e8d-4c7b-b6a5-4d3e2f1a0b9c"
+    assert parameters["QGS_SERVER_ID"] == "DDR_QGS1"
+    assert parameters["EMAIL"] == "user@canada.ca"
+    assert (parameters["KEEP_FILES"], parameters["Validate"]) == (False, True)
+
+    item["email"] = "item@canada.ca"
+    assert BatchManifest.get_parameters(item, "user@canada.ca", False, True, None)["EMAIL"] == "item@canada.ca"
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# test_multipart_encoder.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Unit tests of the multipart/form-data body streamed to the DDR (MultipartZipEncoder) and of the parts of an
+upload session (FilePartReader)
+"""
+
+import email.parser
+import email.policy
+import os
+import pytest
+import ddr_algorithm
+
+MultipartZipEncoder = ddr_algorithm.MultipartZipEncoder
+FilePartReader = ddr_algorithm.FilePartReader
+UserMessageException = ddr_algorithm.UserMessageException
+
+CHUNK_SIZE = MultipartZipEncoder.CHUNK_SIZE
+
+
+@pytest.fixture
+def zip_file_name(tmp_path):
+    """Return the name of a zip file bigger than a few chunks"""
+
+    file_name = tmp_path / "ddr_publish.zip"
+    file_name.write_bytes(os.urandom(3 * CHUNK_SIZE + 12345))
+    return str(file_name)
+
+
+def read_all(encoder):
+    """Read the body like requests does and check the size of the chunks"""
+
+    chunks = []
+    for chunk in iter(lambda: encoder.read(8 * CHUNK_SIZE), b""):
+        assert len(chunk) <= CHUNK_SIZE
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_body_is_a_valid_multipart(zip_file_name, feedback):
+    fields = {"email": "user@canada.ca", "metadata_only": "False"}
+    with MultipartZipEncoder(zip_file_name, feedback, fields=fields) as encoder:
+        body = read_all(encoder)
+        assert len(body) == len(encoder)
+        content_type = encoder.content_type
+
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    parts = list(message.iter_parts())
+    assert [part.get_param("name", header="content-disposition") for part in parts] == \
+           ["email", "metadata_only", "zip_file"]
+    assert parts[0].get_content().strip() == "user@canada.ca"
+    assert parts[2].get_filename() == "ddr_publish.zip"
+    assert parts[2].get_content() == open(zip_file_name, "rb").read()
+
+
+def test_rewind_sends_the_same_body(zip_file_name, feedback):
+    with MultipartZipEncoder(zip_file_name, feedback) as encoder:
+        first = read_all(encoder)
+        encoder.rewind()
+        assert read_all(encoder) == first
+
+
+def test_progress_is_reported(zip_file_name, feedback):
+    with MultipartZipEncoder(zip_file_name, feedback) as encoder:
+        read_all(encoder)
+
+    assert feedback.progress[-1] == 100
+    assert feedback.progress == sorted(feedback.progress)
+
+
+def test_cancel_stops_the_upload(zip_file_name, feedback):
+    with MultipartZipEncoder(zip_file_name, feedback) as encoder:
+        encoder.read(CHUNK_SIZE)
+        feedback.canceled = True
+        with pytest.raises(UserMessageException, match="canceled"):
+            encoder.read(CHUNK_SIZE)
+
+
+def test_file_parts_cover_the_zip_file(zip_file_name, feedback):
+    content = open(zip_file_name, "rb").read()
+    part_size = CHUNK_SIZE + 1000
+    parts = []
+    for offset in range(0, len(content), part_size):
+        size = min(part_size, len(content) - offset)
+        with FilePartReader(zip_file_name, offset, size, feedback) as reader:
+            assert len(reader) == size
+            part = read_all(reader)
+            # A part can be resent
+            reader.rewind()
+            assert read_all(reader) == part
+        parts.append(part)
+
+    assert b"".join(parts) == content
+    # The progress of the parts is reported by the upload session
+    assert feedback.progress == []
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# test_project_file_processor.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Unit tests of the reader and the rewriter of the QGIS project files (ProjectFileProcessor)
+"""
+
+import os
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+import pytest
+import ddr_algorithm
+
+ProjectFileProcessor = ddr_algorithm.ProjectFileProcessor
+DdrInfo = ddr_algorithm.DdrInfo
+UserMessageException = ddr_algorithm.UserMessageException
+QgsProviderRegistry = ddr_algorithm.QgsProviderRegistry
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model")
+QGS_FILE_NAME = os.path.join(MODEL_DIR, "test5_en.qgs")
+LAYER_ID = "coco_b5b503e2_d659_4ace_9d98_2c61b4ea6f42"
+
+
+@pytest.fixture(autouse=True)
+def project_file():
+    """Reset the layers read from the project files"""
+
+    DdrInfo.init_project_file()
+
+
+def write_project(qgs_file_name, datasource, provider):
+    """Write a copy of the model project file with another data source for its layer"""
+
+    content = open(QGS_FILE_NAME, encoding="utf-8").read()
+    content = content.replace("<datasource>./qgis_vector_layers.gpkg|layername=coco1234</datasource>",
+                              f"<datasource>{escape(datasource)}</datasource>")
+    content = content.replace('<provider encoding="UTF-8">ogr</provider>',
+                              f'<provider encoding="UTF-8">{provider}</provider>')
+    with open(qgs_file_name, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+def get_layers(qgs_file_name):
+    """Return the <maplayer> elements of a project file by layer id"""
+
+    root = ElementTree.parse(qgs_file_name).getroot()
+    return {element.findtext("id"): element for element in root.iterfind("projectlayers/maplayer")}
+
+
+@pytest.mark.qgis
+def test_read_layers():
+    (layer,) = ProjectFileProcessor.read_layers(QGS_FILE_NAME, "en")
+
+    assert (layer.layer_id, layer.short_name, layer.layer_name) == (LAYER_ID, "coco1234", "coco1234")
+    assert layer.provider == "ogr"
+    # The relative path of the data source is resolved from the directory of the project
+    assert layer.source == os.path.join(MODEL_DIR, "qgis_vector_layers.gpkg") + "|layername=coco1234"
+
+
+# Relative paths saved by QGIS within the URI of the data providers
+PROVIDER_SOURCES = [
+    ("ogr", "./qgis_vector_layers.gpkg|layername=coco1234", "qgis_vector_layers.gpkg", "layerName", "coco1234"),
+    ("ogr", "/vsizip/./layers.zip/coco.shp", "layers.zip", "vsiSuffix", "/coco.shp"),
+    ("delimitedtext", "file:./points.csv?type=csv&xField=x&yField=y&crs=EPSG:4326", "points.csv", None, None),
+    ("spatialite", "dbname='./layers.sqlite' table=\"coco\" (geometry)", "layers.sqlite", "layerName", "coco")]
+
+
+@pytest.mark.qgis
+@pytest.mark.parametrize("provider,source,file_name,key,value", PROVIDER_SOURCES)
+def test_get_absolute_source(provider, source, file_name, key, value):
+    absolute_source = ProjectFileProcessor.get_absolute_source(source, provider, QGS_FILE_NAME)
+
+    parts = QgsProviderRegistry.instance().decodeUri(provider, absolute_source)
+    assert os.path.normpath(parts["path"]) == os.path.join(MODEL_DIR, file_name)
+    if key is not None:
+        assert parts[key] == value
+
+
+@pytest.mark.qgis
+def test_get_absolute_source_unchanged():
+    # Absolute paths and sources without a file are kept as is
+    source = os.path.join(MODEL_DIR, "qgis_vector_layers.gpkg") + "|layername=coco1234"
+    assert ProjectFileProcessor.get_absolute_source(source, "ogr", QGS_FILE_NAME) == source
+    source = "dbname='ddr' host=localhost port=5432 table=\"public\".\"coco\" (geom)"
+    assert ProjectFileProcessor.get_absolute_source(source, "postgres", QGS_FILE_NAME) == source
+
+
+@pytest.mark.qgis
+@pytest.mark.parametrize("provider,source,file_name", [(provider, source, file_name) for
+                                                       (provider, source, file_name, dummy, dummy) in
+                                                       PROVIDER_SOURCES])
+def test_read_and_rewrite_provider_sources(tmp_path, provider, source, file_name):
+    qgs_file_name = str(tmp_path / "project" / "project_en.qgs")
+    os.makedirs(os.path.dirname(qgs_file_name))
+    write_project(qgs_file_name, source, provider)
+    expected_path = str(tmp_path / "project" / file_name)
+
+    (layer,) = ProjectFileProcessor.read_layers(qgs_file_name, "en")
+    assert layer.provider == provider
+    assert os.path.normpath(QgsProviderRegistry.instance().decodeUri(provider, layer.source)["path"]) == \
+           expected_path
+
+    # A layer not replaced is opened from its absolute path in the rewritten project
+    out_qgs_file_name = str(tmp_path / "project_en.qgs")
+    ProjectFileProcessor.rewrite(qgs_file_name, out_qgs_file_name, {})
+    datasource = get_layers(out_qgs_file_name)[LAYER_ID].findtext("datasource")
+    assert os.path.normpath(QgsProviderRegistry.instance().decodeUri(provider, datasource)["path"]) == \
+           expected_path
+
+
+def test_read_invalid_project(tmp_path):
+    qgs_file_name = tmp_path / "invalid.qgs"
+    qgs_file_name.write_text("<qgis><projectlayers>", encoding="utf-8")
+
+    with pytest.raises(UserMessageException, match="Unable to read the QGIS project file"):
+        ProjectFileProcessor.read_layers(str(qgs_file_name), "en")
+
+
+@pytest.mark.qgis
+def test_rewrite_data_source(tmp_path):
+    out_qgs_file_name = str(tmp_path / "project_en.qgs")
+    ProjectFileProcessor.rewrite(QGS_FILE_NAME, out_qgs_file_name,
+                                 {LAYER_ID: ("./qgis_vector_layers.gpkg|layername=coco1234", "ogr")})
+
+    root = ElementTree.parse(out_qgs_file_name).getroot()
+    layer = get_layers(out_qgs_file_name)[LAYER_ID]
+    assert layer.findtext("datasource") == "./qgis_vector_layers.gpkg|layername=coco1234"
+    assert root.findtext("properties/Paths/Absolute") == "false"
+    # The rest of the project is unchanged
+    assert set(get_layers(out_qgs_file_name)) == set(get_layers(QGS_FILE_NAME))
+    assert open(out_qgs_file_name, encoding="utf-8").read().count("<maplayer") == 1
+
+
+@pytest.mark.qgis
+def test_rewrite_absolute_paths(tmp_path):
+    qgs_file_name = tmp_path / "absolute.qgs"
+    content = open(QGS_FILE_NAME, encoding="utf-8").read()
+    qgs_file_name.write_text(content.replace('<Absolute type="bool">false</Absolute>',
+                                             '<Absolute type="bool">true</Absolute>'), encoding="utf-8")
+    out_qgs_file_name = str(tmp_path / "out" / "project_en.qgs")
+    os.makedirs(os.path.dirname(out_qgs_file_name))
+
+    ProjectFileProcessor.rewrite(str(qgs_file_name), out_qgs_file_name, {})
+
+    root = ElementTree.parse(out_qgs_file_name).getroot()
+    assert root.findtext("properties/Paths/Absolute") == "false"
+    # A layer not replaced keeps its data source resolved from the directory of the original project
+    assert get_layers(out_qgs_file_name)[LAYER_ID].findtext("datasource") == \
+           str(tmp_path / "qgis_vector_layers.gpkg") + "|layername=coco1234"
+
+
+@pytest.mark.qgis
+def test_rewrite_pyramids(tmp_path):
+    out_qgs_file_name = str(tmp_path / "project_en.qgs")
+    pyramids = {LAYER_ID: [("coco1234_g1", "./qgis_vector_layers.gpkg|layername=coco1234_g1", 50000),
+                           ("coco1234_g2", "./qgis_vector_layers.gpkg|layername=coco1234_g2", 250000)]}
+    ProjectFileProcessor.rewrite(QGS_FILE_NAME, out_qgs_file_name,
+                                 {LAYER_ID: ("./qgis_vector_layers.gpkg|layername=coco1234", "ogr")}, pyramids)
+
+    root = ElementTree.parse(out_qgs_file_name).getroot()
+    layers = get_layers(out_qgs_file_name)
+    assert list(layers) == [LAYER_ID, f"{LAYER_ID}_coco1234_g1", f"{LAYER_ID}_coco1234_g2"]
+    # Each layer is visible up to the scale of the next generalized copy
+    assert [(layer.get("maxScale"), layer.get("minScale")) for layer in layers.values()] == \
+           [("0", "50000"), ("50000", "250000"), ("250000", "0")]
+    copy = layers[f"{LAYER_ID}_coco1234_g1"]
+    assert copy.findtext("shortname") == "coco1234_g1"
+    assert copy.findtext("layername") == "coco1234 (1:50000)"
+    assert copy.findtext("datasource") == "./qgis_vector_layers.gpkg|layername=coco1234_g1"
+    # The copies are in the layer tree and in the layer order
+    tree_ids = [element.get("id") for element in root.iter("layer-tree-layer")]
+    assert tree_ids == list(layers)
+    order_ids = [element.get("id") for element in root.iterfind("layerorder/layer")]
+    assert order_ids == list(layers)
+
+
+@pytest.mark.parametrize("attrs,lower_scale,upper_scale,expected", [
+    ({"hasScaleBasedVisibilityFlag": "0"}, 0, 50000, ("0", "50000")),
+    ({"hasScaleBasedVisibilityFlag": "0"}, 50000, None, ("50000", "0")),
+    # The scale range of the user clips the levels
+    ({"hasScaleBasedVisibilityFlag": "1", "maxScale": "1000", "minScale": "500000"}, 0, 50000, ("1000", "50000")),
+    ({"hasScaleBasedVisibilityFlag": "1", "maxScale": "1000", "minScale": "500000"}, 250000, None,
+     ("250000", "500000")),
+    # A level outside the scale range of the user is never visible
+    ({"hasScaleBasedVisibilityFlag": "1", "maxScale": "1000", "minScale": "20000"}, 50000, None,
+     ("50000", "50000"))])
+def test_get_scale_attributes(attrs, lower_scale, upper_scale, expected):
+    scale_attrs = ProjectFileProcessor.get_scale_attributes(attrs, lower_scale, upper_scale)
+
+    assert scale_attrs["hasScaleBasedVisibilityFlag"] == "1"
+    assert (scale_attrs["maxScale"], scale_attrs["minScale"]) == expected
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# test_upload_session.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Unit tests of the resumable upload sessions (UploadSession) against a fake DDR
+"""
+
+import hashlib
+import json
+import os
+import pytest
+import ddr_algorithm
+
+UploadSession = ddr_algorithm.UploadSession
+ControlFile = ddr_algorithm.ControlFile
+DdrApiClient = ddr_algorithm.DdrApiClient
+DdrInfo = ddr_algorithm.DdrInfo
+UserMessageException = ddr_algorithm.UserMessageException
+
+ENVIRONMENT = "https://ddr.test/api"
+PART_SIZE = 100000
+
+
+class Response(object):
+    """HTTP response of the fake DDR"""
+
+    def __init__(self, status_code, json_doc=None):
+        self.status_code = status_code
+        self._json_doc = json_doc
+
+    def json(self):
+        if self._json_doc is None:
+            raise ValueError("No JSON document")
+        return self._json_doc
+
+
+class FakeDdr(object):
+    """Fake DDR implementing the /upload_sessions end points of openapi/ddr_publication.yaml"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.requests = []    # (method, end point) of the requests received
+        self.failing_parts = set()  # Parts whose upload fails
+
+    def request(self, method, url, feedback, authenticated=True, **kwargs):  # pylint: disable=unused-argument
+        end_point = url[len(ENVIRONMENT):]
+        self.requests.append((method, end_point))
+        path = end_point.strip("/").split("/")
+        if method == "POST" and path == ["upload_sessions"]:
+            session_id = f"session_{len(self.sessions) + 1}"
+            self.sessions[session_id] = {"create": kwargs["json"], "received_parts": {}}
+            return Response(201, {"session_id": session_id, "received_parts": []})
+        session = self.sessions.get(path[1])
+        if session is None:
+            return Response(404, {"status": 404, "title": "Upload session not found"})
+        if method == "GET" and len(path) == 2:
+            return Response(200, {"session_id": path[1], "received_parts": sorted(session["received_parts"])})
+        if method == "PUT" and path[2] == "parts":
+            index = int(path[3])
+            data = b"".join(iter(lambda: kwargs["data"].read(), b""))
+            expected = session["create"]["parts"][index]["sha256"]
+            if index in self.failing_parts or hashlib.sha256(data).hexdigest() != expected or \
+                    kwargs["headers"]["X-Part-SHA256"] != expected:
+                return Response(409, {"status": 409, "title": "Part checksum does not match"})
+            session["received_parts"][index] = data
+            return Response(204)
+        if method == "POST" and path[2] == "complete":
+            parts = session["received_parts"]
+            if len(parts) != len(session["create"]["parts"]):
+                return Response(409, {"status": 409, "title": "Upload session is missing parts"})
+            session["content"] = b"".join(parts[index] for index in sorted(parts))
+            return Response(204)
+        return Response(405)
+
+
+@pytest.fixture
+def fake_ddr(monkeypatch):
+    """Send the requests of the upload sessions to a fake DDR"""
+
+    ddr = FakeDdr()
+    monkeypatch.setattr(DdrApiClient, "request", staticmethod(ddr.request))
+    monkeypatch.setattr(DdrInfo, "get_http_environment", staticmethod(lambda: ENVIRONMENT))
+    monkeypatch.setattr(DdrInfo, "get_upload_part_size", staticmethod(lambda: PART_SIZE))
+    monkeypatch.setattr(DdrInfo, "get_upload_part_retries", staticmethod(lambda: 1))
+    monkeypatch.setattr(ddr_algorithm.time, "sleep", lambda seconds: None)
+    return ddr
+
+
+@pytest.fixture
+def ctl_file(tmp_path):
+    """Return a control file with a zip file of 2.5 parts"""
+
+    ctl_file = ControlFile(control_file_dir=str(tmp_path), zip_file_name=str(tmp_path / "ddr_publish.zip"))
+    with open(ctl_file.zip_file_name, "wb") as file:
+        file.write(os.urandom(2 * PART_SIZE + PART_SIZE // 2))
+    return ctl_file
+
+
+def get_parts_put(fake_ddr):
+    """Return the index of the parts sent to the fake DDR"""
+
+    return [int(end_point.split("/")[-1]) for (method, end_point) in fake_ddr.requests if method == "PUT"]
+
+
+def test_create_hashes_the_parts(fake_ddr, ctl_file, feedback):
+    content = open(ctl_file.zip_file_name, "rb").read()
+    session = UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback)
+
+    assert session.create()
+
+    (create,) = [session["create"] for session in fake_ddr.sessions.values()]
+    assert create["operation"] == "publish"
+    assert create["file_size"] == len(content)
+    assert create["sha256"] == hashlib.sha256(content).hexdigest()
+    assert [part["size"] for part in create["parts"]] == [PART_SIZE, PART_SIZE, PART_SIZE // 2]
+    for part in create["parts"]:
+        offset = part["index"] * PART_SIZE
+        assert part["sha256"] == hashlib.sha256(content[offset:offset + part["size"]]).hexdigest()
+    # The state of the session is saved with the offset of the parts
+    with open(session.session_file_name, "r") as file:
+        state = json.load(file)
+    assert state["session_id"] == "session_1"
+    assert [part["offset"] for part in state["parts"]] == [0, PART_SIZE, 2 * PART_SIZE]
+
+
+def test_upload(fake_ddr, ctl_file, feedback):
+    response = UploadSession(ctl_file, ddr_algorithm.UPDATE, feedback).upload()
+
+    assert response.status_code == 204
+    assert get_parts_put(fake_ddr) == [0, 1, 2]
+    assert fake_ddr.sessions["session_1"]["content"] == open(ctl_file.zip_file_name, "rb").read()
+    assert feedback.progress[-1] == 100
+
+
+def test_resume_skips_the_received_parts(fake_ddr, ctl_file, feedback):
+    # The upload is suspended when a part can't be sent
+    fake_ddr.failing_parts = {1}
+    with pytest.raises(UserMessageException, match="Unable to send part 1"):
+        UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).upload()
+    assert ctl_file.keep_files == "Yes"
+    assert get_parts_put(fake_ddr) == [0, 1, 1]
+
+    # The resume only sends the parts not yet received in the same session
+    fake_ddr.failing_parts = set()
+    fake_ddr.requests = []
+    response = UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).upload()
+
+    assert response.status_code == 204
+    assert ("POST", "/upload_sessions") not in fake_ddr.requests
+    assert get_parts_put(fake_ddr) == [1, 2]
+    assert fake_ddr.sessions["session_1"]["content"] == open(ctl_file.zip_file_name, "rb").read()
+
+
+def test_load_resets_a_session_of_another_zip_file(fake_ddr, ctl_file, feedback):
+    assert UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).create()
+    with open(ctl_file.zip_file_name, "ab") as file:
+        file.write(b"modified")
+
+    assert not UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).load()
+    assert "does not match the zip file" in feedback.infos[-1]
+
+
+def test_load_resets_a_session_of_another_operation(fake_ddr, ctl_file, feedback):
+    assert UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).create()
+
+    assert not UploadSession(ctl_file, ddr_algorithm.UPDATE, feedback).load()
+    assert UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).load()
+
+
+@pytest.mark.parametrize("content", ['{"version": 1, "session_id": "sess', "", "[]"])
+def test_load_resets_a_corrupted_session(fake_ddr, ctl_file, feedback, content):
+    session = UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback)
+    with open(session.session_file_name, "w") as file:
+        file.write(content)
+
+    assert not session.load()
+    assert "WARNING" in feedback.infos[-1]
+    # A new upload session is created
+    assert session.upload().status_code == 204
+    assert list(fake_ddr.sessions) == ["session_1"]
+
+
+def test_load_without_session(fake_ddr, ctl_file, feedback):
+    assert not UploadSession(ctl_file, ddr_algorithm.PUBLISH, feedback).load()
+    assert feedback.infos == []
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# /***************************************************************************
+# test_zip_builder.py
+# ----------
+# Date                 : October 2026
+# copyright            : (C) 2023 by Natural Resources Canada
+# email                : daniel.pilon@canada.ca
+#
+#  ***************************************************************************/
+#
+# /***************************************************************************
+#  *                                                                         *
+#  *   This program is free software; you can redistribute it and/or modify  *
+#  *   it under the terms of the GNU General Public License as published by  *
+#  *   the Free Software Foundation; either version 2 of the License, or     *
+#  *   (at your option) any later version.                                   *
+#  *                                                                         *
+#  ***************************************************************************/
+
+"""
+Unit tests of the zip writer (ZipBuilder) and of the zip file streamed from its layout (ZipStream)
+"""
+
+import os
+import struct
+import zipfile
+import pytest
+import ddr_algorithm
+
+ZipBuilder = ddr_algorithm.ZipBuilder
+ZipMember = ddr_algorithm.ZipMember
+UserMessageException = ddr_algorithm.UserMessageException
+
+# Content of the members: compressible files, a file already compressed and a non ASCII name
+MEMBERS = {"qgis_vector_layers.gpkg": os.urandom(1000) + b"x" * 500000,
+           "project_en.qgs": "<qgis>é</qgis>".encode("utf-8") * 10000,
+           "download_package.zip": os.urandom(300000),
+           "données.json": b"{}"}
+
+
+def build_zip(tmp_path, streamed, workers=2):
+    """Build the zip file of the members; return the name of the zip file (written or streamed)"""
+
+    src_dir = tmp_path / "src"
+    src_dir.mkdir(parents=True, exist_ok=True)
+    zip_builder = ZipBuilder(str(tmp_path), "deflate", 6, workers)
+    for (arcname, content) in MEMBERS.items():
+        file_name = src_dir / arcname
+        file_name.write_bytes(content)
+        # Same date and time in the headers of all the zip files built
+        os.utime(file_name, (1767225600, 1767225600))
+        zip_builder.add(str(file_name), arcname)
+    zip_builder.compress()
+    zip_file_name = str(tmp_path / ("streamed.zip" if streamed else "written.zip"))
+    if streamed:
+        zip_builder.write_layout(zip_file_name)
+    else:
+        zip_builder.write(zip_file_name)
+        zip_builder.cleanup()
+
+    return zip_file_name
+
+
+def test_write_is_readable_by_zipfile(tmp_path):
+    zip_file_name = build_zip(tmp_path, streamed=False)
+
+    with zipfile.ZipFile(zip_file_name) as zip_file:
+        assert zip_file.testzip() is None
+        assert sorted(zip_file.namelist()) == sorted(MEMBERS)
+        for (arcname, content) in MEMBERS.items():
+            assert zip_file.read(arcname) == content
+
+
+def test_compressed_files_are_stored(tmp_path):
+    zip_file_name = build_zip(tmp_path, streamed=False)
+
+    with zipfile.ZipFile(zip_file_name) as zip_file:
+        assert zip_file.getinfo("download_package.zip").compress_type == zipfile.ZIP_STORED
+        info = zip_file.getinfo("qgis_vector_layers.gpkg")
+        assert info.compress_type == zipfile.ZIP_DEFLATED
+        assert info.compress_size < info.file_size
+
+
+def test_stream_is_identical_to_written_zip(tmp_path):
+    written = open(build_zip(tmp_path / "written", streamed=False), "rb").read()
+    zip_file_name = build_zip(tmp_path / "streamed", streamed=True)
+
+    assert not os.path.isfile(zip_file_name)
+    assert ZipBuilder.get_size(zip_file_name) == len(written)
+    with ZipBuilder.open(zip_file_name) as zip_stream:
+        assert zip_stream.read() == written
+        # Any part of the stream can be read again (resent requests and upload session parts)
+        zip_stream.seek(123457)
+        assert zip_stream.read(200000) == written[123457:323457]
+
+
+def test_stream_detects_a_modified_member(tmp_path):
+    zip_file_name = build_zip(tmp_path, streamed=True)
+    # The stored member is read from its original file
+    with open(tmp_path / "src" / "download_package.zip", "ab") as file:
+        file.write(b"modified")
+
+    with pytest.raises(UserMessageException):
+        ZipBuilder.open(zip_file_name)
+
+
+def test_materialize_writes_the_streamed_zip(tmp_path):
+    written = open(build_zip(tmp_path / "written", streamed=False), "rb").read()
+    zip_file_name = build_zip(tmp_path / "streamed", streamed=True)
+
+    assert ZipBuilder.materialize(zip_file_name)
+    assert open(zip_file_name, "rb").read() == written
+    assert not os.path.isfile(zip_file_name + ddr_algorithm.ZipStream.LAYOUT_EXTENSION)
+    # The zip file is already written
+    assert not ZipBuilder.materialize(zip_file_name)
+
+
+def test_zip64_local_header():
+    member = ZipMember(arcname="big.gpkg", method=ZipBuilder.DEFLATED, date_time=(2026, 1, 1, 0, 0, 0),
+                       file_size=5 * 2 ** 32, compress_size=2 ** 33, crc=1, offset=0)
+    header = ZipBuilder.get_local_header(member)
+
+    (signature, compress_size, file_size, name_length, extra_length) = \
+        struct.unpack("<I14xII2H", header[:30])
+    assert signature == 0x04034b50
+    assert (compress_size, file_size) == (0xFFFFFFFF, 0xFFFFFFFF)
+    extra = header[30 + name_length:30 + name_length + extra_length]
+    assert struct.unpack("<HHQQ", extra) == (1, 16, 5 * 2 ** 32, 2 ** 33)
+
+
+def test_zip64_central_header_offset():
+    member = ZipMember(arcname="big.gpkg", method=ZipBuilder.STORED, date_time=(2026, 1, 1, 0, 0, 0),
+                       file_size=10, compress_size=10, crc=1, offset=5 * 2 ** 32)
+    header = ZipBuilder.get_central_header(member)
+
+    assert struct.unpack("<HHQ", header[-12:]) == (1, 8, 5 * 2 ** 32)